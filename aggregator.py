@@ -0,0 +1,108 @@
+import asyncio
+import time
+from logger import logger
+from state_store import StateStore
+
+MAX_MEDIA_GROUP_SIZE = 10  # больше элементов в альбоме Telegram не присылает
+
+
+class MediaGroupAggregator:
+    """
+    Собирает части альбома (media_group) и отдает их одним вызовом on_flush.
+
+    На каждый ключ (user_id, media_group_id) — один таймер call_later, который
+    переносится при каждой новой части. Альбом сбрасывается сразу, как только
+    пришло MAX_MEDIA_GROUP_SIZE частей, или после периода тишины. Период
+    адаптивный: втрое больше сглаженного интервала между частями альбомов,
+    но в пределах [min_quiet, max_quiet].
+
+    Сами части и время последней части лежат в state_store, таймеры и meta —
+    в памяти процесса. При нескольких воркерах с общим хранилищем части одного
+    альбома приходят в разные процессы: сработавший таймер сверяется с общим
+    временем последней части (пришла позже — ждем дальше), а забирает альбом
+    тот воркер, который первым атомарно занял ключ (set_if_absent).
+    """
+
+    def __init__(
+        self,
+        store: StateStore,
+        on_flush,
+        min_quiet: float = 0.2,
+        max_quiet: float = 1.0,
+        ttl: float = 60
+    ):
+        self.store = store
+        self.on_flush = on_flush  # async def on_flush(meta, parts)
+        self.min_quiet = min_quiet
+        self.max_quiet = max_quiet
+        self.ttl = ttl
+        self._gap = max_quiet / 3  # сглаженный интервал между частями (EWMA)
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._last_seen: dict[str, float] = {}
+        self._meta: dict[str, object] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def quiet_period(self) -> float:
+        return min(self.max_quiet, max(self.min_quiet, self._gap * 3))
+
+    async def add(self, key: str, part: dict, meta=None):
+        """
+        Добавляет часть альбома. meta (например, первое сообщение альбома)
+        передается в on_flush вместе со всеми частями.
+        """
+        now = time.monotonic()
+        last = self._last_seen.get(key)
+        if last is not None:
+            self._gap = 0.8 * self._gap + 0.2 * (now - last)
+        self._last_seen[key] = now
+        self._meta.setdefault(key, meta)
+
+        count = await self.store.append(key, part, ttl=self.ttl)
+        await self.store.set(f"{key}:seen", time.time(), ttl=self.ttl)
+
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        if count >= MAX_MEDIA_GROUP_SIZE:
+            self._start_flush(key, wait_quiet=False)
+        else:
+            loop = asyncio.get_running_loop()
+            self._timers[key] = loop.call_later(self.quiet_period, self._start_flush, key)
+
+    def _start_flush(self, key: str, wait_quiet: bool = True):
+        self._timers.pop(key, None)
+        task = asyncio.create_task(self._flush(key, wait_quiet))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key: str, wait_quiet: bool):
+        try:
+            if wait_quiet:
+                seen = await self.store.get(f"{key}:seen")
+                delay = (seen or 0) + self.quiet_period - time.time()
+                if delay > 0:
+                    # в другой воркер пришла часть позже нашей — ждем тишины от нее
+                    if key not in self._timers:
+                        loop = asyncio.get_running_loop()
+                        self._timers[key] = loop.call_later(delay, self._start_flush, key)
+                    return
+            claimed = await self.store.set_if_absent(f"{key}:flush", True, ttl=self.ttl)
+            self._last_seen.pop(key, None)
+            meta = self._meta.pop(key, None)
+            if not claimed:
+                return  # альбом уже забрал другой воркер
+            parts = await self.store.pop_list(key)
+            if parts:
+                await self.on_flush(meta, parts)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке альбома {key}: {e}")
+
+    async def close(self):
+        """Сбрасывает все недособранные альбомы и дожидается их обработки."""
+        # сброс, начатый до close, мог снова поставить таймер — повторяем, пока есть что ждать
+        while self._timers or self._tasks:
+            for key, timer in list(self._timers.items()):
+                timer.cancel()
+                self._start_flush(key, wait_quiet=False)
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,187 @@
+"""
+Архивация закрытых вопросов.
+
+Вопросы со статусом "выполнено" или "отклонено", созданные раньше чем
+ARCHIVE_AFTER_DAYS дней назад, переносятся из questions в questions_archive
+(тот же файл базы) вместе со своими повторами. Горячая таблица и ее индексы
+остаются маленькими, а архивный вопрос по-прежнему находится по номеру
+(helpers.get_question) и поиском (у архива свой FTS-индекс).
+
+Перенос идет пачками по ARCHIVE_BATCH строк — каждая пачка отдельная
+короткая транзакция с паузой после нее, чтобы хендлеры не ждали блокировку
+записи. Освободившиеся страницы возвращаются файлу через
+PRAGMA incremental_vacuum (тоже порциями). Для базы, созданной до включения
+auto_vacuum=INCREMENTAL, нужен один полный VACUUM (python archive.py --vacuum,
+бот лучше остановить).
+
+В боте задача запускается раз в ARCHIVE_INTERVAL секунд (только воркер 0).
+Вручную:
+    python archive.py                 # один проход с ARCHIVE_AFTER_DAYS из config.json
+    python archive.py --days 90
+    python archive.py --vacuum        # перевести базу на incremental vacuum (полный VACUUM)
+"""
+import argparse
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select
+from models import ArchivedQuestion, Question, CLOSED_STATUSES
+from logger import logger
+
+ARCHIVE_BATCH = 200     # вопросов в одной транзакции
+BATCH_PAUSE = 0.05      # пауза между пачками, сек — окно для записи хендлерам
+VACUUM_PAGES = 2000     # страниц за один PRAGMA incremental_vacuum
+START_DELAY = 60        # первый проход — не в момент старта бота
+
+# полнотекстовый индекс архива: как FTS_DDL в database.py, но строки архива не меняются
+ARCHIVE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS questions_archive_fts USING fts5(
+        text, username, content='questions_archive', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_archive_fts_ai AFTER INSERT ON questions_archive BEGIN
+        INSERT INTO questions_archive_fts (rowid, text, username) VALUES (new.id, new.text, new.username);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_archive_fts_ad AFTER DELETE ON questions_archive BEGIN
+        INSERT INTO questions_archive_fts (questions_archive_fts, rowid, text, username)
+        VALUES ('delete', old.id, old.text, old.username);
+    END
+    """,
+]
+
+_COLUMNS = [column.name for column in Question.__table__.columns]
+
+
+async def _archive_batch(db_engine, cutoff: datetime, batch_size: int) -> int:
+    async with db_engine.begin() as conn:
+        # вопрос с наибольшим id не трогаем: без AUTOINCREMENT SQLite выдал бы
+        # его номер следующему новому вопросу, и номера в архиве и в работе совпали бы
+        max_id = await conn.scalar(select(func.max(Question.id)))
+        ids = (await conn.scalars(
+            select(Question.id)
+            .where(
+                Question.status.in_(CLOSED_STATUSES),
+                Question.created_at < cutoff,
+                Question.duplicate_of.is_(None),
+                Question.id < max_id
+            )
+            .order_by(Question.id)
+            .limit(batch_size)
+        )).all()
+        if not ids:
+            return 0
+        # повторы уходят в архив вместе с оригиналом
+        ids += (await conn.scalars(
+            select(Question.id).where(Question.duplicate_of.in_(ids), Question.id < max_id)
+        )).all()
+
+        columns = [Question.__table__.c[name] for name in _COLUMNS]
+        await conn.execute(
+            insert(ArchivedQuestion).from_select(
+                _COLUMNS + ["archived_at"],
+                select(*columns, literal(datetime.utcnow())).where(Question.id.in_(ids))
+            )
+        )
+        await conn.execute(delete(Question).where(Question.id.in_(ids)))
+    return len(ids)
+
+
+async def archive_closed_questions(
+    db_engine,
+    older_than_days: int,
+    batch_size: int = ARCHIVE_BATCH,
+    pause: float = BATCH_PAUSE
+) -> int:
+    """Переносит закрытые вопросы старше older_than_days дней в архив. Возвращает число строк."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        moved = await _archive_batch(db_engine, cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+        await asyncio.sleep(pause)
+
+
+async def compact(db_engine, pages: int = VACUUM_PAGES, pause: float = BATCH_PAUSE) -> int:
+    """
+    Возвращает свободные страницы файлу порциями по pages (только при auto_vacuum=INCREMENTAL).
+    Возвращает число освобожденных страниц.
+    """
+    freed = 0
+    async with db_engine.connect() as conn:
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+            return 0
+        # incremental_vacuum освобождает по странице на шаг, а execute() делает один шаг —
+        # executescript выполняет прагму до конца
+        raw = (await conn.get_raw_connection()).driver_connection
+        while True:
+            free = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            if not free:
+                return freed
+            await raw.executescript(f"PRAGMA incremental_vacuum({pages})")
+            freed += min(free, pages)
+            await asyncio.sleep(pause)
+
+
+async def run_archive(db_engine, older_than_days: int):
+    """Один проход: архивация и возврат места."""
+    moved = await archive_closed_questions(db_engine, older_than_days)
+    freed = await compact(db_engine) if moved else 0
+    if moved:
+        logger.info(f"Архивация: перенесено {moved} вопросов, освобождено {freed} страниц.")
+    return moved, freed
+
+
+async def archive_loop(db_engine, older_than_days: int, interval: float, start_delay: float = START_DELAY):
+    """Фоновая задача бота: архивация раз в interval секунд."""
+    await asyncio.sleep(start_delay)
+    while True:
+        try:
+            await run_archive(db_engine, older_than_days)
+        except Exception as e:
+            logger.error(f"Ошибка архивации: {e}")
+        await asyncio.sleep(interval)
+
+
+def enable_incremental_vacuum(path: str):
+    """Переключает существующую базу на auto_vacuum=INCREMENTAL (полный VACUUM, блокирует базу)."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def main():
+    import config
+    from database import DATABASE_PATH, engine, init_db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=config.ARCHIVE_AFTER_DAYS, help="архивировать закрытые вопросы старше")
+    parser.add_argument("--vacuum", action="store_true", help="полный VACUUM с переводом на incremental vacuum")
+    args = parser.parse_args()
+
+    if args.vacuum:
+        enable_incremental_vacuum(DATABASE_PATH)
+        print("База переведена на auto_vacuum=INCREMENTAL.")
+        return
+    if not args.days:
+        print("Архивация выключена (ARCHIVE_AFTER_DAYS = 0), укажите --days.")
+        return
+
+    async def run():
+        try:
+            await init_db()
+            moved, freed = await run_archive(engine, args.days)
+            print(f"Перенесено в архив: {moved}, освобождено страниц: {freed}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Назначение вопросов менеджерам.
+
+Менеджер берет вопрос кнопкой "🙋 Взять" (или сменой статуса) — в базе это
+сравнение-с-обменом по (status, assignee), см. helpers.update_assignment:
+из двух одновременных нажатий проходит одно, второй менеджер видит, кто
+уже ведет вопрос. Статус чужого вопроса поменять нельзя, снять исполнителя
+можно командой /release.
+
+При AUTO_ASSIGN новые вопросы сразу назначаются наименее загруженному
+менеджеру из MANAGERS. Нагрузка — число активных вопросов менеджера; она
+ведется в памяти и раз в SYNC_INTERVAL секунд сверяется с базой (другие
+воркеры тоже назначают вопросы).
+"""
+import heapq
+import itertools
+import time
+
+SYNC_INTERVAL = 60  # сек между сверками нагрузки с базой
+
+# подписи менеджеров для карточек: запоминаются по нажатиям кнопок
+manager_names: dict[int, str] = {}
+
+
+def remember_manager(user) -> None:
+    """Запоминает подпись менеджера (aiogram User) для карточек вопросов."""
+    manager_names[user.id] = f"@{user.username}" if user.username else user.full_name
+
+
+def manager_label(manager_id: int) -> str:
+    return manager_names.get(manager_id, f"id {manager_id}")
+
+
+class WorkloadRouter:
+    """
+    Наименее загруженный менеджер за O(log n): куча (нагрузка, порядок, id).
+    Изменение нагрузки добавляет новую запись, устаревшие (порядок не совпадает
+    с последним для менеджера) выбрасываются при выборе — ленивое удаление.
+    При равной нагрузке первым идет тот, чья запись старше, — вопросы
+    расходятся по кругу.
+    """
+
+    def __init__(self, managers=()):
+        self._loads: dict[int, int] = {}
+        self._current: dict[int, int] = {}  # порядковый номер актуальной записи менеджера
+        self._heap: list[tuple[int, int, int]] = []
+        self._order = itertools.count()
+        self.sync({}, managers)
+        self.synced_at = 0.0  # с базой еще не сверялись — первое назначение начнет со сверки
+
+    def sync(self, loads: dict, managers=None):
+        """Задает нагрузку по данным базы; managers — новый состав (по умолчанию прежний)."""
+        managers = list(self._loads) if managers is None else managers
+        self._loads = {manager_id: loads.get(manager_id, 0) for manager_id in managers}
+        self._current = {}
+        self._heap = []
+        for manager_id in self._loads:
+            self._push(manager_id)
+        self.synced_at = time.monotonic()
+
+    def set_managers(self, managers):
+        """Новый состав менеджеров (смена MANAGERS на лету); нагрузку новых сверим с базой."""
+        self.sync(self._loads, managers)
+        self.synced_at = 0.0
+
+    def stale(self) -> bool:
+        return time.monotonic() - self.synced_at > SYNC_INTERVAL
+
+    def _push(self, manager_id: int):
+        order = self._current[manager_id] = next(self._order)
+        heapq.heappush(self._heap, (self._loads[manager_id], order, manager_id))
+        # устаревшие записи копятся между выборами; если их много — оставляем только актуальные
+        if len(self._heap) > 4 * len(self._loads) + 64:
+            self._heap = [entry for entry in self._heap if self._current.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def adjust(self, manager_id: int, delta: int):
+        """Изменение нагрузки менеджера; менеджеры не из списка не учитываются."""
+        if manager_id not in self._loads:
+            return
+        self._loads[manager_id] = max(0, self._loads[manager_id] + delta)
+        self._push(manager_id)
+
+    def pick(self):
+        """Менеджер с наименьшей нагрузкой или None, если список пуст. Нагрузку не меняет."""
+        while self._heap:
+            _, order, manager_id = self._heap[0]
+            if self._current.get(manager_id) == order:
+                return manager_id
+            heapq.heappop(self._heap)
+        return None
+
+    def loads(self) -> dict:
+        return dict(self._loads)
+
+    def __len__(self):
+        return len(self._loads)
@@ -0,0 +1,52 @@
+"""
+Общая подготовка окружения для бенчмарков: корень проекта в sys.path,
+фиктивный токен (если config.json не заполнен) и временная база вместо questions.db.
+"""
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+
+# Bot() проверяет формат токена при создании (первое обращение к loader.bot)
+config.BOT_TOKEN = config.BOT_TOKEN or "123456:BENCHMARK"
+
+
+async def use_database(path: Path):
+    """Перенаправляет database.SessionLocal на временную базу и создает схему."""
+    import database
+
+    engine = database.build_engine(f"sqlite+aiosqlite:///{path}")
+    database.SessionLocal.configure(bind=engine)
+    await database.init_db(engine)
+    return engine
+
+
+def seed_questions(path: Path, count: int, statuses: list[int], chunk: int = 50_000, make_text=None):
+    """
+    Быстро наполняет таблицу questions синтетическими строками через sqlite3.
+    make_text(i) — генератор текста вопроса (по умолчанию однотипный текст).
+    """
+    make_text = make_text or (lambda i: f"Синтетический вопрос номер {i}")
+    started = datetime(2024, 1, 1)
+    with sqlite3.connect(path) as conn:
+        for offset in range(0, count, chunk):
+            rows = [
+                (
+                    i % 10_000,
+                    f"user{i % 10_000}",
+                    make_text(i),
+                    int(statuses[i % len(statuses)]),
+                    started + timedelta(seconds=i),
+                )
+                for i in range(offset, min(offset + chunk, count))
+            ]
+            conn.executemany(
+                "INSERT INTO questions (user_id, username, text, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        conn.commit()
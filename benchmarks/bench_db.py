@@ -0,0 +1,103 @@
+"""
+Нагрузочный бенчмарк слоя БД: сколько апдейтов в секунду успевает обработать бот.
+
+"До" — синхронная сессия SQLAlchemy (как было раньше), каждый commit блокирует
+event loop. "После" — асинхронный движок из database.py (aiosqlite + WAL).
+Схема у обоих одна — из init_db, с триггерами счетчиков, истории и FTS.
+Каждый апдейт = сохранение вопроса + имитация ответа Telegram API.
+
+Запуск:
+    python benchmarks/bench_db.py --updates 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import _bootstrap  # noqa: F401
+from _bootstrap import use_database
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models import Question
+
+API_LATENCY = 0.005  # имитация сетевого запроса к Telegram
+
+
+async def _loop_lag_probe(stop: asyncio.Event, lags: list):
+    """Замеряет, насколько event loop опаздывает с пробуждением."""
+    interval = 0.001
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _run(handler, updates: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(_loop_lag_probe(stop, lags))
+
+    async def one(i):
+        async with semaphore:
+            await handler(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return updates / elapsed, max(lags, default=0.0)
+
+
+async def bench_sync(path: Path, updates: int, concurrency: int):
+    # схема как у бота: без триггеров и FTS синхронная запись была бы дешевле настоящей
+    await (await use_database(path)).dispose()
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(bind=engine)
+
+    async def handler(i):
+        with session_factory() as session:
+            session.add(Question(user_id=i, username="bench", text=f"вопрос {i}"))
+            session.commit()
+        await asyncio.sleep(API_LATENCY)
+
+    result = await _run(handler, updates, concurrency)
+    engine.dispose()
+    return result
+
+
+async def bench_async(path: Path, updates: int, concurrency: int):
+    engine = await use_database(path)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def handler(i):
+        async with session_factory() as session:
+            session.add(Question(user_id=i, username="bench", text=f"вопрос {i}"))
+            await session.commit()
+        await asyncio.sleep(API_LATENCY)
+
+    result = await _run(handler, updates, concurrency)
+    await engine.dispose()
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for name, bench in (("sync (до)", bench_sync), ("async (после)", bench_async)):
+            rate, max_lag = await bench(tmp / f"{bench.__name__}.db", args.updates, args.concurrency)
+            print(f"{name:15} {rate:10.1f} апдейтов/с   макс. задержка loop: {max_lag * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
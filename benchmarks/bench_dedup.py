@@ -0,0 +1,72 @@
+"""
+Бенчмарк поиска повторов (dedup.DuplicateIndex).
+
+Заполняет индекс N вопросами и замеряет: построение отпечатка текста,
+поиск точного повтора, почти точного повтора (опечатки, пунктуация)
+и отсутствие совпадения. Поиск не должен расти вместе с N.
+
+Запуск:
+    python benchmarks/bench_dedup.py --sizes 1000 100000
+"""
+import argparse
+import random
+import time
+
+import _bootstrap  # noqa: F401
+
+from dedup import DuplicateIndex, Fingerprint
+
+SYLLABLES = "ка ро ми ла ту не до за ви пе со ры ба ле гу ко на ти мо да".split()
+
+
+def make_vocabulary(rng: random.Random, size: int = 20_000) -> list[str]:
+    """Псевдослова из слогов: словарь как у живых вопросов, а не из двух десятков слов."""
+    return ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)]
+
+
+def make_text(rng: random.Random, words: list[str]) -> str:
+    return " ".join(rng.choices(words, k=rng.randint(8, 30))) + f" номер {rng.randint(1, 10**9)}"
+
+
+def mutate(text: str) -> str:
+    """Почти тот же вопрос: другой регистр, пунктуация и одна опечатка."""
+    words = text.split()
+    words[len(words) // 2] = words[len(words) // 2][:-1]
+    return (" ".join(words) + "?!").upper()
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rng = random.Random(size)
+        words = make_vocabulary(rng)
+        index = DuplicateIndex(window=10**9)
+        texts = [make_text(rng, words) for _ in range(size)]
+        for question_id, text in enumerate(texts, 1):
+            index.add(question_id, Fingerprint(text))
+
+        sample = texts[size // 2]
+        exact = Fingerprint(sample.lower() + "...")
+        near = Fingerprint(mutate(sample))
+        missing = Fingerprint(make_text(rng, words))
+
+        print(f"Индекс на {size} вопросов:")
+        print(f"  отпечаток текста        {timed(lambda: Fingerprint(sample), 500):8.1f} мкс")
+        print(f"  точный повтор           {timed(lambda: index.find(exact), 5000):8.1f} мкс -> #{index.find(exact)}")
+        print(f"  почти точный повтор     {timed(lambda: index.find(near), 5000):8.1f} мкс -> #{index.find(near)}")
+        print(f"  нет совпадения          {timed(lambda: index.find(missing), 5000):8.1f} мкс -> {index.find(missing)}")
+        print(f"  (ожидаемый id: #{size // 2 + 1})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Микробенчмарки inline-клавиатур (keyboards.py).
+
+Сравнивает прежнюю сборку через pydantic CallbackData.pack() с предсобранными
+шаблонами callback_data; для клавиатуры страницы — без кеша (промах) и с
+LRU-кешем (попадание).
+
+Запуск:
+    python benchmarks/bench_keyboards.py
+"""
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+
+import _bootstrap  # noqa: F401
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from keyboards import (
+    StatusCallback,
+    TakeCallback,
+    PageQuestionCallback,
+    PaginationCallback,
+    generate_status_buttons,
+    generate_question_list_page,
+    question_list_keyboard,
+)
+from models import STATUSES, STATUS_LABELS
+
+
+def status_buttons_pydantic(question_id: int) -> InlineKeyboardMarkup:
+    """Прежняя реализация: модель CallbackData на каждую кнопку (с той же кнопкой "Взять")."""
+    rows = [[InlineKeyboardButton(text="🙋 Взять", callback_data=TakeCallback(question_id=question_id).pack())]]
+    row = []
+    for i, status in enumerate(STATUSES, 1):
+        row.append(InlineKeyboardButton(
+            text=STATUS_LABELS[status],
+            callback_data=StatusCallback(question_id=question_id, new_status=status).pack()
+        ))
+        if i % 3 == 0:
+            rows.append(row)
+            row = []
+    if row:
+        rows.append(row)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def page_keyboard_pydantic(ids, page):
+    rows, row = [], []
+    for i, question_id in enumerate(ids):
+        row.append(InlineKeyboardButton(
+            text=str(i + 1),
+            callback_data=PageQuestionCallback(page=page, question_id=question_id).pack()
+        ))
+        if len(row) == 4:
+            rows.append(row)
+            row = []
+    if row:
+        rows.append(row)
+    rows.append([
+        InlineKeyboardButton(text="◀ Назад", callback_data=PaginationCallback(page=page - 1, before_id=ids[0]).pack()),
+        InlineKeyboardButton(text="Вперед ▶", callback_data=PaginationCallback(page=page + 1, after_id=ids[-1]).pack()),
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def bench(name: str, func, number: int = 20_000):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print(f"{name:45} {seconds / number * 1e6:8.2f} мкс/вызов")
+
+
+def main():
+    counter = iter(range(10**9))
+    rows = [
+        SimpleNamespace(id=1000 + i, status=STATUSES[0], username="user", created_at=datetime.now(), text="вопрос")
+        for i in range(8)
+    ]
+    ids = tuple(q.id for q in rows)
+
+    print("Клавиатура статусов:")
+    # без кеша: номер вопроса у каждой карточки свой
+    bench("  pydantic pack (до)", lambda: status_buttons_pydantic(next(counter)))
+    bench("  шаблоны", lambda: generate_status_buttons(next(counter)))
+
+    print("Клавиатура страницы списка (8 вопросов):")
+    bench("  pydantic pack (до)", lambda: page_keyboard_pydantic(ids, 2))
+    bench("  шаблоны, промах кеша", lambda: question_list_keyboard.__wrapped__(ids, 2, "active", True, True))
+    bench("  шаблоны, попадание в LRU", lambda: question_list_keyboard(ids, 2, "active", True, True))
+    bench("  страница целиком (текст + клавиатура)", lambda: generate_question_list_page(rows, 2, "active", True, True))
+
+    longest = max(
+        [b.callback_data for r in generate_status_buttons(2**31 - 1).inline_keyboard for b in r]
+        + [b.callback_data for r in question_list_keyboard((2**31 - 1,), 99999, "active", True, True).inline_keyboard for b in r],
+        key=lambda data: len(data.encode()),
+    )
+    print(f"Самый длинный callback_data: {longest!r} — {len(longest.encode())} из 64 байт")
+
+
+if __name__ == "__main__":
+    main()
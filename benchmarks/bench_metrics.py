@@ -0,0 +1,87 @@
+"""
+Накладные расходы метрик и проверка эндпоинта без сети.
+
+Прогоняет одинаковые апдейты через два отдельных Dispatcher с пустым
+хендлером — без middleware и с HandlerMetricsMiddleware — и сравнивает
+время на апдейт. Затем вызывает обработчик /metrics на фиктивном запросе
+(aiohttp make_mocked_request) и печатает начало ответа.
+
+Запуск:
+    python benchmarks/bench_metrics.py --updates 20000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import _bootstrap  # noqa: F401
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Chat, Message, Update, User
+from aiohttp.test_utils import make_mocked_request
+
+from metrics import HandlerMetricsMiddleware, Metrics, create_metrics_app
+
+
+def make_dispatcher(registry: Metrics = None) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def echo_handler(message: Message):
+        return None
+
+    if registry is not None:
+        dp.message.middleware(HandlerMetricsMiddleware(registry))
+    return dp
+
+
+def make_update(update_id: int) -> Update:
+    user = User(id=1, is_bot=False, first_name="bench")
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=1, type="private"),
+        from_user=user,
+        text="вопрос"
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def feed(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bot = Bot(token="123456:BENCHMARK")
+    updates = [make_update(i) for i in range(args.updates)]
+    registry = Metrics()
+    plain, measured = make_dispatcher(), make_dispatcher(registry)
+
+    # прогрев, затем замеры вперемешку, чтобы шум машины делился поровну
+    await feed(plain, bot, updates[:1000])
+    await feed(measured, bot, updates[:1000])
+    base, with_metrics = float("inf"), float("inf")
+    for _ in range(5):
+        base = min(base, await feed(plain, bot, updates))
+        with_metrics = min(with_metrics, await feed(measured, bot, updates))
+    print(f"без метрик   {base:8.2f} мкс/апдейт")
+    print(f"с метриками  {with_metrics:8.2f} мкс/апдейт (+{with_metrics - base:.2f})")
+
+    app = create_metrics_app(registry)
+    handler = next(route.handler for route in app.router.routes() if route.method == "GET")
+    for query in ("", "?format=json"):
+        response = await handler(make_mocked_request("GET", f"/metrics{query}", app=app))
+        print(f"\nGET /metrics{query} -> {response.status}")
+        print("\n".join(response.text.splitlines()[:6]))
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""
+Бенчмарк keyset-пагинации списка вопросов (helpers.get_questions_page).
+
+Наполняет временную базу N вопросами со смешанными статусами и замеряет
+время первой, средней и последней страницы, вперед и назад.
+
+Запуск:
+    python benchmarks/bench_pagination.py --rows 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import seed_questions, use_database
+
+from models import STATUSES, ACTIVE_STATUSES  # noqa: E402
+
+ALL_STATUSES = ACTIVE_STATUSES + [s for s in STATUSES if s not in ACTIVE_STATUSES]
+
+
+async def _measure(call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from helpers import get_questions_page
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = await use_database(path)
+        print(f"Наполняем базу: {args.rows} строк...")
+        seed_questions(path, args.rows, ALL_STATUSES)
+
+        cases = {
+            "active, первая страница": dict(status_filter=ACTIVE_STATUSES),
+            "active, середина вперед": dict(status_filter=ACTIVE_STATUSES, after_id=args.rows // 2),
+            "active, середина назад": dict(status_filter=ACTIVE_STATUSES, before_id=args.rows // 2),
+            "active, последняя страница": dict(status_filter=ACTIVE_STATUSES, before_id=args.rows + 1),
+            "all, первая страница": dict(),
+            "all, середина вперед": dict(after_id=args.rows // 2),
+        }
+        for name, kwargs in cases.items():
+            ms = await _measure(lambda: get_questions_page(limit=8, **kwargs), args.repeat)
+            print(f"{name:30} {ms:8.3f} мс (медиана)")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
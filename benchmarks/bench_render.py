@@ -0,0 +1,63 @@
+"""
+Бенчмарк рендера страницы списка вопросов (keyboards.render_question_page).
+
+Сравнивает прежнюю сборку через text += без учета лимита с текущим рендером
+на страницах из коротких, смешанных и очень длинных вопросов, и проверяет,
+что текст всегда помещается в одно сообщение Telegram.
+
+Запуск:
+    python benchmarks/bench_render.py
+"""
+import random
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+
+import _bootstrap  # noqa: F401
+
+from models import Status, status_label
+from keyboards import MESSAGE_LIMIT, generate_question_list_page, render_question_page, text_length
+
+
+def render_concat(questions):
+    """Прежняя реализация: конкатенация без ограничения длины."""
+    text = ""
+    for i, q in enumerate(questions, 1):
+        date_str = q.created_at.strftime("%d.%m.%Y %H:%M")
+        text += f"{i}. #{q.id} | {status_label(q.status)} | @{q.username or 'пользователь'} | {date_str}\n"
+        text += f"   {q.text}\n\n"
+    return text
+
+
+def make_page(lengths):
+    return [
+        SimpleNamespace(
+            id=1000 + i, status=Status.IN_PROGRESS, username=f"user{i}", created_at=datetime.now(),
+            text=("Вопрос с эмодзи 🙂 " * (length // 18 + 1))[:length],
+        )
+        for i, length in enumerate(lengths)
+    ]
+
+
+def main():
+    random.seed(1)
+    pages = {
+        "короткие (8 × 80)": make_page([80] * 8),
+        "смешанные (8 × 50..3000)": make_page([random.randint(50, 3000) for _ in range(8)]),
+        "очень длинные (8 × 4000)": make_page([4000] * 8),
+        "огромные (8 × 100000)": make_page([100_000] * 8),
+    }
+    number = 2000
+    for name, questions in pages.items():
+        old = min(timeit.repeat(lambda: render_concat(questions), number=number, repeat=3)) / number
+        new = min(timeit.repeat(lambda: render_question_page(questions), number=number, repeat=3)) / number
+        old_length = text_length(render_concat(questions))
+        text, _ = generate_question_list_page(questions, 1, "active", False, False)
+        _, shown = render_question_page(questions)
+        print(f"{name:28} до: {old * 1e6:8.1f} мкс, {old_length:>7} симв. | "
+              f"после: {new * 1e6:8.1f} мкс, {text_length(text):>5} симв., вопросов {shown}, "
+              f"влезает: {text_length(text) <= MESSAGE_LIMIT}")
+
+
+if __name__ == "__main__":
+    main()
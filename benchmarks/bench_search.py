@@ -0,0 +1,72 @@
+"""
+Бенчмарк полнотекстового поиска (helpers.search_questions, FTS5).
+
+Наполняет временную базу N вопросами из случайных слов (индекс FTS
+заполняется триггерами при вставке) и замеряет задержку поиска по редким,
+частым и префиксным запросам, а также перелистывание результатов.
+
+Запуск:
+    python benchmarks/bench_search.py --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import seed_questions, use_database
+
+from models import STATUSES  # noqa: E402
+
+VOCABULARY = [
+    "оплата", "доставка", "возврат", "заказ", "карта", "счет", "пароль", "аккаунт", "приложение",
+    "ошибка", "скидка", "курьер", "адрес", "телефон", "подписка", "тариф", "чек", "бонус",
+    "принтер", "роутер", "монитор", "клавиатура", "гарантия", "ремонт", "склад", "накладная",
+]
+RARE_WORDS = [f"артикул{i}" for i in range(10_000)]
+
+
+def make_text(i: int) -> str:
+    rng = random.Random(i)
+    words = rng.choices(VOCABULARY, k=rng.randint(5, 25))
+    words.append(RARE_WORDS[i % len(RARE_WORDS)])
+    return " ".join(words)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from helpers import search_questions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = await use_database(path)
+        started = time.perf_counter()
+        seed_questions(path, args.rows, STATUSES, make_text=make_text)
+        print(f"Наполнено {args.rows} строк (с индексацией FTS) за {time.perf_counter() - started:.1f} с")
+
+        cases = {
+            "редкое слово": dict(query="артикул4242"),
+            "два частых слова": dict(query="оплата доставка"),
+            "префикс": dict(query="клав"),
+            "частое слово, стр. 50": dict(query="гарантия ремонт", offset=8 * 49),
+            "username": dict(query="user42"),
+        }
+        for name, kwargs in cases.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                rows, _, has_next = await search_questions(limit=8, **kwargs)
+                timings.append(time.perf_counter() - started)
+            print(f"{name:25} {statistics.median(timings) * 1000:9.2f} мс (медиана), найдено на странице: {len(rows)}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Проверка и бенчмарк очереди отправки (sender.SendQueue) на фейковом Bot.
+
+FakeBot ничего не отправляет в сеть: записывает время и порядок вызовов,
+а иногда отвечает TelegramRetryAfter, как настоящий Telegram при флуде.
+Скрипт проверяет порядок сообщений внутри вопроса, глобальный лимит
+сообщений в секунду (по всем запросам, включая отбитые flood control) и
+отсутствие ошибок, печатает статистику очереди. Если проверка не прошла,
+код выхода 1.
+
+Запуск:
+    python benchmarks/bench_send_queue.py --chats 200 --questions 3
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+import _bootstrap  # noqa: F401
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from sender import SendQueue
+
+
+class FakeBot:
+    def __init__(self, flood_probability: float = 0.02):
+        self.flood_probability = flood_probability
+        self.calls = []     # доставленные: (time, chat_id, text)
+        self.requests = []  # время каждого запроса, в том числе отбитого: лимит Telegram считает и их
+
+    async def send_message(self, chat_id, text, **kwargs):
+        sent_at = time.monotonic()
+        self.requests.append(sent_at)
+        await asyncio.sleep(0.002)  # сетевой запрос
+        if random.random() < self.flood_probability:
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Too Many Requests", 1)
+        self.calls.append((sent_at, chat_id, text))
+        return text
+
+
+def check_order(calls):
+    sequence = defaultdict(list)
+    for _, chat_id, text in calls:
+        question, part = text.split(":")
+        sequence[(chat_id, question)].append(int(part))
+    return all(parts == sorted(parts) for parts in sequence.values())
+
+
+def max_per_second(times):
+    times = sorted(times)
+    best, left = 0, 0
+    for right, t in enumerate(times):
+        while t - times[left] >= 1.0:
+            left += 1
+        best = max(best, right - left + 1)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=3, help="вопросов на чат")
+    parser.add_argument("--parts", type=int, default=3, help="сообщений в вопросе")
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--private-rate", type=float, default=10)
+    args = parser.parse_args()
+
+    bot = FakeBot()
+    queue = SendQueue(global_rate=args.global_rate, private_rate=args.private_rate)
+
+    started = time.monotonic()
+    futures = []
+    for q in range(args.questions):
+        for chat_id in range(1, args.chats + 1):
+            calls = [
+                (lambda chat_id=chat_id, text=f"{q}:{part}": bot.send_message(chat_id, text))
+                for part in range(args.parts)
+            ]
+            futures.append(queue.submit(chat_id, *calls))
+
+    print(f"В очереди: {queue.stats()['queue_depth']} пачек")
+    await asyncio.gather(*futures)
+    elapsed = time.monotonic() - started
+    stats = queue.stats()
+    await queue.close()
+
+    total = args.chats * args.questions * args.parts
+    order_kept = check_order(bot.calls)
+    peak = max_per_second(bot.requests)
+    print(f"Отправлено {len(bot.calls)}/{total} сообщений за {elapsed:.1f} с ({len(bot.calls) / elapsed:.1f} msg/s)")
+    print(f"Порядок внутри вопросов сохранен: {order_kept}")
+    print(f"Макс. запросов за 1 с: {peak} (лимит {args.global_rate:g})")
+    print(f"Повторов после flood control: {stats['retries']}, ошибок: {stats['failed']}")
+    print(f"Задержка в очереди: p50 {stats['latency_p50']:.2f} с, p99 {stats['latency_p99']:.2f} с")
+
+    failures = []
+    if len(bot.calls) != total:
+        failures.append(f"доставлено {len(bot.calls)} из {total}")
+    if not order_kept:
+        failures.append("нарушен порядок сообщений внутри вопроса")
+    if peak > args.global_rate:
+        failures.append(f"превышен глобальный лимит: {peak} за 1 с")
+    if stats["failed"]:
+        failures.append(f"ошибок отправки: {stats['failed']}")
+    if failures:
+        print("\nПроверка не пройдена:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Время холодного старта бота до готовности принимать апдейты.
+
+Запускает бота в отдельном процессе с python -X importtime и останавливает
+его сразу после bot.startup() — в точке, где main() переходит к
+start_polling (сеть не нужна: база временная, метрики и архивация выключены). По каждому
+запуску печатает время от старта процесса до готовности и его фазы, по
+лучшему запуску — самые долгие импорты и сводку по пакетам.
+
+Если лучшее время больше --target, код выхода 1 — так скрипт можно
+использовать как проверку после изменений. Что компоненты создаются
+лениво, проверяет tests/test_loader.py.
+
+Запуск:
+    python benchmarks/bench_startup.py --runs 5 --target 5.0
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECT_MODULES = {path.stem for path in ROOT.glob("*.py")} | {"handlers"}
+
+
+# =========================
+# Дочерний процесс: сам старт
+# =========================
+async def child_startup(started: float, imported: float):
+    import config
+    import database
+
+    config.METRICS_PORT = 0
+    config.ARCHIVE_AFTER_DAYS = 0
+    config.HEARTBEAT_FILE = ""
+    with tempfile.TemporaryDirectory() as tmp:
+        database.engine = database.build_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'startup.db'}")
+        database.SessionLocal.configure(bind=database.engine)
+
+        import bot
+        import loader
+
+        await bot.startup()
+        ready = time.perf_counter()
+        print(json.dumps({
+            "imports": imported - started,
+            "startup": ready - imported,
+            "ready": ready - started,
+        }), flush=True)
+
+        # фоновые задачи (прогрев индекса, слежение за config.json) останавливаем, как bot.main()
+        for task in list(bot.background_tasks):
+            task.cancel()
+        await asyncio.gather(*bot.background_tasks, return_exceptions=True)
+        await bot.drain()
+        await loader.bot.session.close()
+        await loader.state_store.close()
+        await database.engine.dispose()
+
+
+def child():
+    started = time.perf_counter()
+    import _bootstrap  # noqa: F401
+    import bot  # noqa: F401 — импорты самого бота, как при python bot.py
+    imported = time.perf_counter()
+    asyncio.run(child_startup(started, imported))
+
+
+# =========================
+# Родительский процесс: замеры и отчет
+# =========================
+def run_once() -> tuple[float, dict, str]:
+    # вывод importtime большой: через PIPE дочерний процесс встал бы на записи в stderr
+    with tempfile.TemporaryFile("w+") as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", __file__, "--child"],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            text=True,
+            cwd=ROOT,
+        )
+        ready_line = process.stdout.readline()
+        wall = time.perf_counter() - started
+        process.communicate()
+        stderr.seek(0)
+        importtime = stderr.read()
+    if process.returncode or not ready_line:
+        sys.exit(f"процесс бота завершился с кодом {process.returncode}:\n{importtime[-2000:]}")
+    return wall, json.loads(ready_line), importtime
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """Строки -X importtime -> [(модуль, self мкс, cumulative мкс)]."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        rows.append((name.strip(), int(head.split(":")[1]), int(cumulative_us)))
+    return rows
+
+
+def report_imports(rows: list, top: int):
+    print("\nсамые долгие импорты (self, мс):")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"  {self_us / 1000:8.1f}  (всего {cumulative_us / 1000:8.1f})  {name}")
+
+    # собственное время модулей по корневому пакету; модули проекта — одной строкой
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        root = name.split(".")[0]
+        packages["(проект)" if root in PROJECT_MODULES else root] += self_us
+    print("\nпо пакетам (self, мс):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:8.1f}  {package}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=5.0, help="допустимое время до готовности, сек")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    best = None
+    for i in range(args.runs):
+        wall, phases, importtime = run_once()
+        print(
+            f"запуск {i + 1}: до готовности {wall:.3f} сек "
+            f"(импорты {phases['imports']:.3f}, старт {phases['startup']:.3f})"
+        )
+        if best is None or wall < best[0]:
+            best = (wall, phases, importtime)
+
+    wall, phases, importtime = best
+    report_imports(parse_importtime(importtime), args.top)
+    verdict = "OK" if wall <= args.target else "ПРЕВЫШЕНО"
+    print(f"\nлучшее время до готовности: {wall:.3f} сек, цель {args.target:.3f} сек — {verdict}")
+    sys.exit(0 if wall <= args.target else 1)
+
+
+if __name__ == "__main__":
+    main()
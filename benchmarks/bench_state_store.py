@@ -0,0 +1,76 @@
+"""
+Бенчмарк памяти и скорости хранилищ состояния (state_store.py).
+
+Имитирует кулдаун-проверку для N разных пользователей:
+  - dict       — старый вариант, словарь user_id -> datetime без очистки;
+  - memory     — MemoryStateStore с ограничением по числу ключей;
+  - sqlite     — SqliteStateStore во временном файле (память процесса + размер файла).
+
+Запуск:
+    python benchmarks/bench_state_store.py --users 1000000 --sqlite-users 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import _bootstrap  # noqa: F401
+
+from state_store import MemoryStateStore, SqliteStateStore
+
+
+def report(name: str, users: int, elapsed: float, peak: int, extra: str = ""):
+    print(f"{name:28} {users:>9} польз.  {users / elapsed:>10.0f} оп/с  "
+          f"пик памяти {peak / 2**20:8.1f} МБ {extra}")
+
+
+def bench_dict(users: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    user_last_message = {}
+    for user_id in range(users):
+        user_last_message[user_id] = datetime.now()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report("dict (до)", users, elapsed, peak)
+
+
+async def bench_store(name: str, store, users: int, extra=lambda: ""):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for user_id in range(users):
+        await store.set_if_absent(f"cooldown:{user_id}", time.time(), ttl=60)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report(name, users, elapsed, peak, extra())
+    await store.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--sqlite-users", type=int, default=100_000)
+    parser.add_argument("--max-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bench_dict(args.users)
+
+    store = MemoryStateStore(max_size=args.max_size)
+    await bench_store(f"memory (max_size={args.max_size})", store, args.users,
+                      lambda: f"ключей: {len(store)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.db"
+        store = SqliteStateStore(str(path))
+        await bench_store("sqlite", store, args.sqlite_users,
+                          lambda: f"файл: {os.path.getsize(path) / 2**20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Бенчмарк записи новых вопросов: commit на каждый вопрос против пачек QuestionWriter.
+
+Запуск:
+    python benchmarks/bench_writer.py --questions 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from _bootstrap import use_database
+
+import database  # noqa: E402
+from models import Question  # noqa: E402
+from writer import QuestionWriter  # noqa: E402
+
+
+async def run(questions: int, concurrency: int, save):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            question = await save(user_id=i, username="bench", text=f"вопрос {i}")
+            assert question.id is not None
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(questions)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return questions / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def commit_per_question(**fields):
+    async with database.SessionLocal() as session:
+        question = Question(**fields)
+        session.add(question)
+        await session.commit()
+    return question
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = await use_database(Path(tmp) / "per_question.db")
+        result = await run(args.questions, args.concurrency, commit_per_question)
+        await engine.dispose()
+        print("commit на вопрос   {:8.0f} вопросов/с  p50 {:6.1f} мс  p99 {:6.1f} мс".format(
+            result[0], result[1] * 1000, result[2] * 1000))
+
+        engine = await use_database(Path(tmp) / "batched.db")
+        writer = QuestionWriter(database.SessionLocal, args.batch_size, args.batch_delay_ms / 1000)
+        result = await run(args.questions, args.concurrency, writer.add)
+        await writer.close()
+        await engine.dispose()
+        print("пачками            {:8.0f} вопросов/с  p50 {:6.1f} мс  p99 {:6.1f} мс  ({} транзакций)".format(
+            result[0], result[1] * 1000, result[2] * 1000, writer.batches))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,332 @@
+"""
+Нагрузочный тест горячих путей бота на фейковом Bot API.
+
+Поднимает локальный aiohttp-сервер, который отвечает как api.telegram.org,
+направляет на него сессию бота и прогоняет синтетический трафик через
+Dispatcher.feed_update — так же, как апдейты приходят при polling:
+
+    text        текстовые вопросы от разных пользователей (до карточки в рабочем чате)
+    album       альбомы из 3 фото с подписью (до карточки в рабочем чате)
+    pagination  кнопки "Вперед" по списку вопросов (до ответа на callback)
+    status      смена статуса кнопкой (до ответа менеджеру на callback)
+
+Каждый сценарий запускается в отдельном процессе со своей временной базой,
+поэтому пиковая память (ru_maxrss) относится только к нему. Лимиты Telegram
+в очереди отправки сняты: измеряется сам бот, а не token bucket.
+
+Результаты сравниваются с benchmarks/baselines.json: рост p99 или падение
+пропускной способности больше чем на --tolerance считается регрессией
+(код выхода 1). --save-baseline записывает текущие результаты как эталон.
+
+Запуск:
+    python benchmarks/load_test.py                      # все сценарии, сравнение с эталоном
+    python benchmarks/load_test.py --scenarios text album --count 500
+    python benchmarks/load_test.py --save-baseline
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import _bootstrap
+from _bootstrap import seed_questions, use_database
+
+import config
+
+WORK_CHAT_ID = -1001234567890
+config.WORK_CHAT_ID = WORK_CHAT_ID  # хендлеры читают config.WORK_CHAT_ID на каждом апдейте
+
+from aiohttp import web  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import CallbackQuery, Chat, Message, PhotoSize, Update, User  # noqa: E402
+
+SCENARIOS = ("text", "album", "pagination", "status")
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+MARKER = re.compile(r"\[m(\d+)\]")
+SEED_ROWS = 20_000
+
+
+# =========================
+# Фейковый Bot API
+# =========================
+class FakeTelegram:
+    """
+    Отвечает на методы Bot API правдоподобными объектами. Если в тексте, подписи
+    или id callback встречается маркер [mN], завершает future ожидающего сценария.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.message_ids = itertools.count(1)
+        self.waiters: dict[int, asyncio.Future] = {}
+        self.requests = 0
+
+    def wait_for(self, marker: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[marker] = future
+        return future
+
+    def _message(self, chat_id, **fields) -> dict:
+        chat_id = int(chat_id)
+        return {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+            **fields,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        await asyncio.sleep(self.latency)
+
+        if method == "sendmediagroup":
+            result = [self._message(params["chat_id"]) for _ in json.loads(params["media"])]
+        elif method in ("answercallbackquery", "deletewebhook", "setwebhook"):
+            result = True
+        elif method == "getme":
+            result = {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        else:
+            result = self._message(params.get("chat_id", WORK_CHAT_ID), text=params.get("text", ""))
+
+        for value in (params.get("text"), params.get("caption"), params.get("callback_query_id")):
+            for match in MARKER.finditer(value or ""):
+                future = self.waiters.pop(int(match.group(1)), None)
+                if future and not future.done():
+                    future.set_result(time.perf_counter())
+        return web.json_response({"ok": True, "result": result})
+
+
+async def start_fake_telegram(latency: float):
+    fake = FakeTelegram(latency)
+    app = web.Application(client_max_size=10 * 1024 * 1024)
+    app.router.add_post("/bot{token}/{method}", fake.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return fake, runner, f"http://127.0.0.1:{port}"
+
+
+# =========================
+# Синтетические апдейты
+# =========================
+update_ids = itertools.count(1)
+SYLLABLES = "ка ро ми ла ту не до за ви пе со ры ба ле гу ко на ти мо да".split()
+
+
+def question_text(rng: random.Random, marker: int) -> str:
+    words = ["".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(rng.randint(8, 40))]
+    return " ".join(words) + f" [m{marker}]"
+
+
+def user(user_id: int) -> User:
+    return User(id=user_id, is_bot=False, first_name=f"user{user_id}", username=f"user{user_id}")
+
+
+def message_update(user_id: int, **fields) -> Update:
+    message = Message(
+        message_id=next(update_ids),
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=user(user_id),
+        **fields
+    )
+    return Update(update_id=next(update_ids), message=message)
+
+
+def callback_update(marker: int, data: str) -> Update:
+    card = Message(message_id=next(update_ids), date=datetime.now(), chat=Chat(id=WORK_CHAT_ID, type="supergroup"), text="…")
+    callback = CallbackQuery(
+        id=f"[m{marker}]",
+        from_user=user(42),
+        chat_instance="bench",
+        message=card,
+        data=data
+    )
+    return Update(update_id=next(update_ids), callback_query=callback)
+
+
+def photo(n: int) -> list:
+    return [PhotoSize(file_id=f"photo-{n}", file_unique_id=f"unique-{n}", width=800, height=600, file_size=50_000)]
+
+
+# =========================
+# Сценарии
+# =========================
+async def run_items(make_item, count: int, concurrency: int, fake: FakeTelegram, feed, timeout: float = 30):
+    """make_item(i) -> список апдейтов; задержка — от первого апдейта до маркера на сервере."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            waiter = fake.wait_for(i)
+            started = time.perf_counter()
+            for update in make_item(i):
+                await feed(update)
+            finished = await asyncio.wait_for(waiter, timeout)
+            latencies.append(finished - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_scenario(name: str, count: int, concurrency: int, api_latency: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = await use_database(path)
+        if name in ("pagination", "status"):
+            seed_questions(path, SEED_ROWS, [0, 1, 2, 3])
+
+        # как в bot.py: запись логов через очередь входит в измеряемый путь
+        from logger import setup_logging
+        setup_logging()
+        import loader
+        dp = loader.create_app()
+        from loader import bot, send_queue, question_writer, status_events
+        from handlers import user as user_handlers
+        from keyboards import PaginationCallback, StatusCallback
+        from sender import RateLimiter
+
+        # сами лимиты Telegram здесь не измеряем
+        send_queue.private_rate = send_queue.group_rate = 10_000
+        send_queue.group_burst = 10_000
+        send_queue._global = RateLimiter(100_000)
+
+        fake, runner, url = await start_fake_telegram(api_latency)
+        bot.session.api = TelegramAPIServer.from_base(url)
+        rng = random.Random(name)
+
+        async def feed(update: Update):
+            await dp.feed_update(bot, update)
+
+        if name == "text":
+            def make_item(i):
+                return [message_update(10_000 + i, text=question_text(rng, i))]
+        elif name == "album":
+            def make_item(i):
+                group = f"album-{i}"
+                return [
+                    message_update(10_000 + i, photo=photo(i * 3 + part), media_group_id=group,
+                                   caption=question_text(rng, i) if part == 0 else None)
+                    for part in range(3)
+                ]
+        elif name == "pagination":
+            def make_item(i):
+                after_id = rng.randint(1, SEED_ROWS)
+                data = PaginationCallback(page=2, filter_status="active", after_id=after_id).pack()
+                return [callback_update(i, data)]
+        else:
+            def make_item(i):
+                data = StatusCallback(question_id=rng.randint(1, SEED_ROWS), new_status=rng.choice([1, 2, 3])).pack()
+                return [callback_update(i, data)]
+
+        latencies, elapsed = await run_items(make_item, count, concurrency, fake, feed)
+
+        await user_handlers.media_group_aggregator.close()
+        await question_writer.close()
+        await status_events.close()
+        await send_queue.close()
+        await bot.session.close()
+        await loader.state_store.close()
+        await runner.cleanup()
+        await engine.dispose()
+
+    latencies.sort()
+    return {
+        "count": count,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "throughput": count / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "api_requests": fake.requests,
+    }
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+# =========================
+# Запуск и сравнение с эталоном
+# =========================
+def run_in_subprocess(name: str, args) -> dict:
+    command = [
+        sys.executable, __file__, "--child", name,
+        "--count", str(args.count), "--concurrency", str(args.concurrency),
+        "--api-latency", str(args.api_latency),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + tolerance):
+        problems.append(f"p99 {result['p99_ms']:.1f} мс против {baseline['p99_ms']:.1f} мс")
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        problems.append(f"пропускная способность {result['throughput']:.0f}/с против {baseline['throughput']:.0f}/с")
+    return [f"{name}: {problem}" for problem in problems]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--count", type=int, default=300, help="элементов трафика на сценарий")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--api-latency", type=float, default=0.005, help="задержка ответа фейкового API, сек")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое ухудшение (0.3 = 30%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_scenario(args.child, args.count, args.concurrency, args.api_latency))
+        print(json.dumps(result))
+        return
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    results, regressions = {}, []
+    print(f"{'сценарий':12} {'p50, мс':>9} {'p99, мс':>9} {'в сек':>8} {'пик RSS, МБ':>12}")
+    for name in args.scenarios:
+        result = results[name] = run_in_subprocess(name, args)
+        print(
+            f"{name:12} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} "
+            f"{result['throughput']:8.0f} {result['peak_rss_mb']:12.1f}"
+        )
+        if name in baselines and not args.save_baseline:
+            regressions += compare(name, result, baselines[name], args.tolerance)
+
+    if args.save_baseline:
+        baselines.update(results)
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, ensure_ascii=False) + "\n")
+        print(f"Эталон сохранен в {BASELINE_FILE}")
+    elif regressions:
+        print("\nРегрессии:")
+        print("\n".join(f"  {line}" for line in regressions))
+        sys.exit(1)
+    elif baselines:
+        print("\nРегрессий относительно эталона нет.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Локальный стенд для webhook: отправляет синтетические апдейты POST-запросами
+и замеряет пропускную способность без участия Telegram.
+
+    # против запущенного бота (MODE=webhook в config.json)
+    python benchmarks/webhook_harness.py --url http://127.0.0.1:8080/webhook --secret <WEBHOOK_SECRET>
+
+    # самодостаточный режим: webhook-сервер из webhook.py в этом же процессе,
+    # диспетчер с пустым хендлером — меряется только накладной расход приема
+    python benchmarks/webhook_harness.py --local
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import _bootstrap  # noqa: F401
+import aiohttp
+from aiogram import Bot, Dispatcher
+
+
+def make_update(update_id: int) -> dict:
+    user_id = 100_000 + update_id % 5_000
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench", "username": f"user{user_id}"},
+            "text": f"Синтетический вопрос {update_id}",
+        },
+    }
+
+
+async def fire(url: str, secret: str, total: int, concurrency: int):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json=make_update(i), headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(1, total + 1)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Отправлено {total} апдейтов за {elapsed:.2f} с: {total / elapsed:.0f} апдейтов/с")
+    print(f"Задержка ответа: p50 {statistics.median(latencies) * 1000:.2f} мс, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} мс")
+    print(f"Коды ответов: {statuses}")
+
+
+async def run_local(args):
+    from aiohttp import web
+    from webhook import create_webhook_app
+
+    # aiogram пишет INFO-строку на каждый апдейт — в замерах это только шум
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    dp = Dispatcher()
+    bot = Bot(token="123456:BENCHMARK")
+    handled = 0
+
+    @dp.message()
+    async def count(message):
+        nonlocal handled
+        handled += 1
+
+    app = create_webhook_app(dp, bot, path="/webhook", secret_token=args.secret)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    try:
+        await fire(f"http://127.0.0.1:{args.port}/webhook", args.secret, args.updates, args.concurrency)
+    finally:
+        # cleanup вызывает drain — все принятые апдейты успеют обработаться
+        await runner.cleanup()
+    print(f"Обработано хендлером: {handled}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default="bench-secret")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--local", action="store_true", help="поднять webhook-сервер в этом процессе")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    if args.local:
+        await run_local(args)
+    else:
+        await fire(args.url, args.secret, args.updates, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
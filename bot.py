@@ -1,34 +1,170 @@
 import asyncio
-import logging
-from loader import dp, bot
-from database import init_db
-
-# логирование в консоль и файл
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler("logs/bot.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# инициализация базы
-init_db()
-
-# регистрация хендлеров
-from handlers import user, manager  # noqa
+import signal
+from pathlib import Path
+
+# SIGHUP от bot_cli.py (перечитать config.json) до установки обработчика не должен убить процесс:
+# пока бот стартует, он и так читает свежий конфиг
+if hasattr(signal, "SIGHUP"):
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+import loader
+from database import init_db, engine
+import config
+from metrics import start_metrics_server
+from logger import logger, setup_logging  # очередь + ротация, см. logger.py
+
+# фоновые задачи (ссылки держим, чтобы задачи не собрал GC); при остановке отменяются
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def drain():
+    from handlers import user
+
+    # недособранные альбомы сохраняем, а не теряем
+    await user.media_group_aggregator.close()
+    # дописываем в базу вопросы, которые еще в очереди записи
+    await loader.question_writer.close()
+    # доотправляем уведомления о сменах статуса
+    await loader.status_events.close()
+    # дожидаемся отправки уже поставленных в очередь сообщений
+    await loader.send_queue.close()
+
+HEARTBEAT_INTERVAL = 5  # см. supervisor.py: нет обновления дольше HEARTBEAT_TIMEOUT — перезапуск
+
+async def heartbeat(path: str):
+    """Обновляет файл heartbeat, пока event loop не заблокирован."""
+    heartbeat_path = Path(path)
+    while True:
+        heartbeat_path.touch()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+CONFIG_POLL_INTERVAL = 2  # как часто проверять mtime config.json, сек
+
+async def watch_config(interval: float = CONFIG_POLL_INTERVAL):
+    """
+    Применяет правки config.json без перезапуска: сразу по SIGHUP (его шлет
+    bot_cli.py через супервизор) или при изменении mtime файла (Windows, ручная правка).
+    """
+    reload_requested = asyncio.Event()
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_requested.set)
+    while True:
+        try:
+            await asyncio.wait_for(reload_requested.wait(), interval)
+        except asyncio.TimeoutError:
+            if not config.changed_on_disk():
+                continue
+        reload_requested.clear()
+        try:
+            changes, pending, errors = config.reload()
+        except Exception:
+            logger.exception("Ошибка при применении config.json:")
+            continue
+        if errors:
+            logger.error(f"config.json не применен: {'; '.join(errors)}")
+        if changes:
+            logger.info(f"Настройки обновлены без перезапуска: {', '.join(f'{k}={v}' for k, v in changes.items())}")
+        if pending:
+            logger.warning(f"Для {', '.join(pending)} нужен перезапуск бота.")
+
+async def drain_polling(timeout: float = None):
+    """
+    start_polling возвращается, не дожидаясь обработчиков уже полученных апдейтов
+    (в webhook их ждет DrainingRequestHandler.drain). Без ожидания drain() закрыл бы
+    очереди записи и отправки прямо под ними: вопрос сохранен, но не переслан.
+    """
+    from webhook import DRAIN_TIMEOUT
+
+    timeout = DRAIN_TIMEOUT if timeout is None else timeout
+    tasks = set(loader.dp._handle_update_tasks)
+    if not tasks:
+        return
+    logger.info(f"Ждем завершения {len(tasks)} обработчиков...")
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        logger.warning(f"{len(pending)} обработчиков не успели завершиться за {timeout} сек.")
+
+async def start_webhook():
+    from webhook import create_webhook_app, run_webhook
+
+    app = create_webhook_app(
+        loader.dp,
+        loader.bot,
+        path=config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET,
+        on_drained=drain
+    )
+    await run_webhook(
+        app,
+        host=config.WEBHOOK_HOST,
+        port=config.WEBHOOK_PORT,
+        bot=loader.bot,
+        # за одним портом несколько воркеров — webhook регистрирует только первый
+        url=config.WEBHOOK_URL if config.WEBHOOK_SET and config.WORKER_ID == 0 else None,
+        secret_token=config.WEBHOOK_SECRET
+    )
+
+async def startup():
+    """
+    Все, что нужно до приема апдейтов: диспетчер с роутерами, схема базы,
+    слежение за config.json, эндпоинт метрик. Возвращает runner метрик (None, если METRICS_PORT = 0).
+    """
+    loader.create_app()
+    await init_db()
+    # индекс повторов заполняется в фоне: первые апдейты его не ждут,
+    # в худшем случае повтор из первых секунд после старта не будет замечен
+    from helpers import warm_up_duplicate_index
+    run_in_background(warm_up_duplicate_index())
+    if config.ARCHIVE_AFTER_DAYS and config.WORKER_ID == 0:
+        # база общая — архивирует только первый воркер
+        from archive import archive_loop
+        run_in_background(archive_loop(engine, config.ARCHIVE_AFTER_DAYS, config.ARCHIVE_INTERVAL))
+
+    run_in_background(watch_config())
+
+    metrics_runner = None
+    if config.METRICS_PORT:
+        # у каждого воркера свой порт метрик: METRICS_PORT + номер воркера
+        metrics_port = config.METRICS_PORT + config.WORKER_ID
+        metrics_runner = await start_metrics_server(config.METRICS_HOST, metrics_port)
+        logger.info(f"Метрики: http://{config.METRICS_HOST}:{metrics_port}/metrics")
+    return metrics_runner
 
 async def main():
-    logger.info("Запуск бота...")
+    logger.info(f"Запуск бота в режиме {config.MODE} (воркер {config.WORKER_ID})...")
+    metrics_runner = await startup()
+    heartbeat_task = asyncio.create_task(heartbeat(config.HEARTBEAT_FILE)) if config.HEARTBEAT_FILE else None
     try:
-        await dp.start_polling(bot, skip_updates=True)
+        if config.MODE == "webhook":
+            await start_webhook()
+        else:
+            # при переходе с webhook на polling Telegram не отдаст getUpdates, пока webhook задан;
+            # накопившиеся за время перезапуска апдейты не отбрасываются
+            await loader.bot.delete_webhook(drop_pending_updates=False)
+            # сессию закрываем сами в конце: после polling еще досылается очередь
+            await loader.dp.start_polling(loader.bot, close_bot_session=False)
     except Exception as e:
-        logger.exception("Ошибка при polling бота:")
+        logger.exception("Ошибка при работе бота:")
     finally:
-        await bot.session.close()
+        if config.MODE != "webhook":
+            await drain_polling()
+        for task in list(background_tasks):
+            task.cancel()
+        await drain()
+        if heartbeat_task:
+            heartbeat_task.cancel()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await loader.bot.session.close()
+        await loader.state_store.close()
+        await engine.dispose()
         logger.info("Бот остановлен.")
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(main())
@@ -1,32 +1,42 @@
 import os
 import json
+import urllib.request
 import subprocess
 import signal
 import sys
+import time
 import platform
-from pathlib import Path
 
-CONFIG_FILE = "config.json"
-LOG_DIR = Path("logs")
-PID_FILE = Path("bot.pid")
+import config as bot_config
+from logger import LOG_DIR, log_file
+# пути — от папки бота, как у самого бота и супервизора: CLI запускают откуда угодно
+from supervisor import BASE_DIR, CONSOLE_LOG_FILE, STATUS_FILE as SUPERVISOR_STATUS_FILE
 
-DEFAULT_CONFIG = {
-    "BOT_TOKEN": "",
-    "WORK_CHAT_ID": 0
-}
+PID_FILE = BASE_DIR / "bot.pid"
+LOG_FILE = log_file(0)  # пишет сам бот (воркер 0), с ротацией; остальные — bot-<номер>.log
+TAIL_BLOCK_SIZE = 64 * 1024
+STOP_WAIT = 45  # супервизор сам ждет воркеры до 35 сек (STOP_TIMEOUT), даем запас
 
-LOG_DIR.mkdir(exist_ok=True)
+# все ключи config.json с значениями по умолчанию — из config.py, там же их типы
+DEFAULT_CONFIG = dict(bot_config.DEFAULTS)
+
+MODES = bot_config.CHOICES["MODE"]
 
 # -------- Работа с конфигом --------
 def load_config():
-    if not os.path.exists(CONFIG_FILE) or os.path.getsize(CONFIG_FILE) == 0:
+    config_file = bot_config.CONFIG_FILE
+    if not config_file.exists() or config_file.stat().st_size == 0:
         save_config(DEFAULT_CONFIG)
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    with open(config_file, "r") as f:
+        # новые ключи из DEFAULT_CONFIG появляются и в старых конфигах
+        return {**DEFAULT_CONFIG, **json.load(f)}
 
 def save_config(config):
-    with open(CONFIG_FILE, "w") as f:
+    # атомарно: бот следит за файлом и не должен прочитать его наполовину записанным
+    tmp = bot_config.CONFIG_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
         json.dump(config, f, indent=4)
+    tmp.replace(bot_config.CONFIG_FILE)
 
 def show_config():
     config = load_config()
@@ -36,20 +46,63 @@ def show_config():
 
 def set_config(key, value):
     config = load_config()
-    if key not in config:
+    if key not in bot_config.SETTINGS:
         print(f"Ключ {key} не существует")
         return
-    if key == "WORK_CHAT_ID":
-        value = int(value)
-    elif key == "Managers":
-        value = value.split(",")
+    # тип и допустимые значения — как при чтении config.json ботом
+    try:
+        value = bot_config.parse(key, value)
+    except ValueError as e:
+        print(f"Неверное значение для {key}: {e}")
+        return
     config[key] = value
     save_config(config)
     print(f"{key} обновлён!")
 
+    pid = running_pid()
+    if not pid:
+        return
+    if key in bot_config.RESTART_REQUIRED:
+        print("Изменение вступит в силу после перезапуска бота")
+        return
+    # супервизор передаст SIGHUP воркерам; без сигналов (Windows) бот заметит новый mtime файла
+    if hasattr(signal, "SIGHUP"):
+        os.kill(pid, signal.SIGHUP)
+    print("Бот применит настройку без перезапуска")
+
 # -------- Работа с процессом бота --------
+def pid_alive(pid):
+    if platform.system() != "Windows":
+        # супервизор, запущенный из этого же CLI, после выхода остается зомби, пока его не подберут
+        try:
+            if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                return False
+        except ChildProcessError:
+            pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        # на Windows os.kill(pid, 0) для несуществующего процесса — OSError
+        return False
+    return True
+
+def running_pid():
+    """pid супервизора из PID_FILE или None; файл от упавшего процесса удаляется."""
+    if not PID_FILE.exists():
+        return None
+    pid = int(PID_FILE.read_text())
+    if pid_alive(pid):
+        return pid
+    print(f"Процесс {pid} из {PID_FILE} уже не существует, удаляем файл")
+    PID_FILE.unlink()
+    return None
+
 def run_bot():
-    if PID_FILE.exists():
+    if running_pid():
         print("Бот уже запущен!")
         return
 
@@ -58,11 +111,12 @@ def run_bot():
         print("Не задан BOT_TOKEN или WORK_CHAT_ID!")
         return
 
-    log_file = LOG_DIR / "bot.log"
-    print(f"Запускаем бота, логи в {log_file}")
+    print(f"Запускаем бота ({config['WORKERS']} воркер.), логи в {LOG_FILE}")
 
+    # в bot*.log пишут только воркеры, каждый в свой файл: второй дескриптор на файл сломал бы ротацию
+    LOG_DIR.mkdir(exist_ok=True)
     kwargs = {
-        "stdout": open(log_file, "a"),
+        "stdout": open(CONSOLE_LOG_FILE, "a"),
         "stderr": subprocess.STDOUT,
     }
 
@@ -70,43 +124,246 @@ def run_bot():
     if platform.system() != "Windows":
         kwargs["preexec_fn"] = os.setsid
 
-    proc = subprocess.Popen([sys.executable, "bot.py"], **kwargs)
+    # supervisor.py запускает воркеры bot.py и перезапускает их при падении
+    proc = subprocess.Popen([sys.executable, str(BASE_DIR / "supervisor.py")], **kwargs)
     PID_FILE.write_text(str(proc.pid))
 
 def stop_bot():
-    if not PID_FILE.exists():
+    pid = running_pid()
+    if not pid:
         print("Бот не запущен!")
         return
 
-    pid = int(PID_FILE.read_text())
-    print(f"Останавливаем процесс {pid}")
-
+    print(f"Останавливаем процесс {pid}, ждем завершения обработчиков...")
     try:
-        if platform.system() == "Windows":
-            os.kill(pid, signal.SIGTERM)
-        else:
-            os.killpg(os.getpgid(pid), signal.SIGTERM)
+        # супервизор передаст SIGTERM воркерам и дождется, пока они доработают
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.time() + STOP_WAIT
+        while pid_alive(pid) and time.time() < deadline:
+            time.sleep(0.5)
+        if pid_alive(pid) and platform.system() != "Windows":
+            print(f"Процесс не завершился за {STOP_WAIT} сек, SIGKILL")
+            os.killpg(os.getpgid(pid), signal.SIGKILL)
     except ProcessLookupError:
         print("Процесс уже не существует")
     finally:
-        PID_FILE.unlink()
+        PID_FILE.unlink(missing_ok=True)
         print("Бот остановлен")
 
+def process_memory(pid):
+    """Резидентная память процесса в МБ (из /proc, только Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def format_uptime(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}д {hours:02}:{minutes:02}:{seconds:02}" if days else f"{hours:02}:{minutes:02}:{seconds:02}"
+
+def show_status():
+    pid = running_pid()
+    if not pid:
+        print("Бот не запущен")
+        return
+    if not SUPERVISOR_STATUS_FILE.exists():
+        print(f"Супервизор {pid} запускается...")
+        return
+    status = json.loads(SUPERVISOR_STATUS_FILE.read_text())
+    print(f"Супервизор: pid {status['pid']}, обновлено {time.time() - status['updated_at']:.0f} сек назад")
+    print(f"{'воркер':>6} {'pid':>8} {'аптайм':>12} {'перезап.':>9} {'память, МБ':>11}  последний выход")
+    for worker in status["workers"]:
+        if worker["pid"]:
+            uptime = format_uptime(time.time() - worker["started_at"])
+            memory = process_memory(worker["pid"])
+            memory = f"{memory:.1f}" if memory is not None else "н/д"
+        else:
+            uptime, memory = "ожидает", "-"
+        print(
+            f"{worker['worker_id']:>6} {worker['pid'] or '-':>8} {uptime:>12} {worker['restarts']:>9} "
+            f"{memory:>11}  {worker['last_exit'] or '-'}"
+        )
+
+def set_mode():
+    config = load_config()
+    print(f"Текущий режим: {config['MODE']}")
+    mode = input(f"Режим ({'/'.join(MODES)}): ").strip()
+    if mode not in MODES:
+        print("Неверный режим")
+        return
+    set_config("MODE", mode)
+    if mode == "webhook":
+        for key in ("WEBHOOK_URL", "WEBHOOK_SECRET", "WEBHOOK_HOST", "WEBHOOK_PORT"):
+            value = input(f"{key} [{config[key]}]: ").strip()
+            if value:
+                set_config(key, value)
+
 def restart_bot():
     stop_bot()
     run_bot()
 
+def tail_lines(path, lines):
+    """
+    Последние lines строк файла: читаем блоками с конца через seek,
+    поэтому время не зависит от размера лога.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # строк нужно на одну больше — первая в блоке может быть обрезана
+        while position > 0 and data.count(b"\n") <= lines:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return data.decode("utf-8", errors="replace").splitlines()[-lines:]
+
+def format_log_line(line):
+    """JSON-записи (LOG_FORMAT = json) показываем в том же виде, что и текстовые."""
+    if not line.startswith("{"):
+        return line
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return line
+    text = f"{entry.get('time')} [{entry.get('level')}] {entry.get('message')}"
+    if entry.get("exc_info"):
+        text += "\n" + entry["exc_info"]
+    return text
+
 def show_logs(lines=50):
-    log_file = LOG_DIR / "bot.log"
-    if not log_file.exists():
+    if not LOG_FILE.exists():
         print("Логи отсутствуют")
         return
-    with open(log_file) as f:
-        content = f.readlines()
-    print("".join(content[-lines:]))
+    print("\n".join(format_log_line(line) for line in tail_lines(LOG_FILE, lines)))
+    others = sorted(LOG_DIR.glob("bot-*.log"))
+    if others:
+        print(f"Логи остальных воркеров: {', '.join(str(path) for path in others)}")
+
+def follow_logs(lines=20):
+    """Показывает хвост лога и новые строки по мере появления (Ctrl+C — выход)."""
+    show_logs(lines)
+    if not LOG_FILE.exists():
+        return
+    print("--- Следим за логом, Ctrl+C — выход ---")
+    f = open(LOG_FILE, "rb")
+    f.seek(0, os.SEEK_END)
+    inode = os.fstat(f.fileno()).st_ino
+    buffer = b""
+    try:
+        while True:
+            chunk = f.read()
+            if chunk:
+                buffer += chunk
+                *complete, buffer = buffer.split(b"\n")
+                for line in complete:
+                    print(format_log_line(line.decode("utf-8", errors="replace")))
+                continue
+            time.sleep(0.5)
+            # после ротации bot.log — уже новый файл: переоткрываем его с начала
+            try:
+                rotated = os.stat(LOG_FILE).st_ino != inode or os.stat(LOG_FILE).st_size < f.tell()
+            except FileNotFoundError:
+                continue
+            if rotated:
+                f.close()
+                f = open(LOG_FILE, "rb")
+                inode = os.fstat(f.fileno()).st_ino
+    except KeyboardInterrupt:
+        print()
+    finally:
+        f.close()
+
+def fetch_stats(url):
+    with urllib.request.urlopen(url, timeout=3) as response:
+        return json.load(response)
+
+def bucket_quantile(buckets, counts, q):
+    """Квантиль по счетчикам корзин — так же, как Histogram.quantile в metrics.py."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    seen = 0
+    for bound, count in zip(buckets, counts):
+        seen += count
+        if seen >= q * total:
+            return bound
+    return float("inf")
+
+def merge_stats(snapshots):
+    """Складывает сводки воркеров: гистограммы — по корзинам, счетчики — суммой."""
+    histograms, counters = {}, {}
+    for stats in snapshots:
+        for name, h in stats["histograms"].items():
+            merged = histograms.setdefault(name, {"count": 0, "sum": 0.0, "counts": [0] * len(h["counts"])})
+            merged["count"] += h["count"]
+            merged["sum"] += h["sum"]
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], h["counts"])]
+        for name, value in stats["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+    buckets = snapshots[0]["buckets"]
+    for h in histograms.values():
+        h["avg"] = h["sum"] / h["count"] if h["count"] else 0.0
+        h["p50"] = bucket_quantile(buckets, h["counts"], 0.5)
+        h["p99"] = bucket_quantile(buckets, h["counts"], 0.99)
+    return {"histograms": histograms, "counters": counters}
+
+def show_stats():
+    config = load_config()
+    if not config["METRICS_PORT"]:
+        print("Метрики выключены (METRICS_PORT = 0)")
+        return
+    # у каждого воркера свой эндпоинт: METRICS_PORT + номер воркера
+    snapshots = {}
+    for worker_id in range(config["WORKERS"]):
+        url = f"http://{config['METRICS_HOST']}:{config['METRICS_PORT'] + worker_id}/metrics?format=json"
+        try:
+            snapshots[worker_id] = fetch_stats(url)
+        except OSError as e:
+            print(f"Не удалось получить метрики воркера {worker_id} ({url}): {e}")
+    if not snapshots:
+        print("Метрики недоступны. Бот запущен?")
+        return
+    stats = merge_stats(list(snapshots.values()))
+
+    print(f"Воркеров в сводке: {len(snapshots)} из {config['WORKERS']}\n")
+    print(f"{'Задержки':60} {'число':>8} {'сред, мс':>9} {'p50, мс':>8} {'p99, мс':>8}")
+    for name, h in sorted(stats["histograms"].items()):
+        print(f"{name:60} {h['count']:8} {h['avg'] * 1000:9.1f} {h['p50'] * 1000:8.0f} {h['p99'] * 1000:8.0f}")
+    if stats["counters"]:
+        print("\nОшибки:")
+        for name, value in sorted(stats["counters"].items()):
+            print(f"  {name}: {value:g}")
+    # состояние (очереди, аптайм) у каждого процесса свое — не складываем
+    for worker_id, worker_stats in snapshots.items():
+        print(f"\nСостояние воркера {worker_id}:")
+        for name, value in sorted(worker_stats["gauges"].items()):
+            print(f"  {name}: {value:g}")
+
+def show_report(rebuild=False):
+    """Сводка по вопросам из счетчиков базы (stats.py); бот для нее не нужен."""
+    command = [sys.executable, str(BASE_DIR / "stats.py")] + (["--rebuild"] if rebuild else [])
+    # база — в папке бота, как у воркеров
+    subprocess.run(command, cwd=BASE_DIR)
+
+def transfer(args):
+    """Выгрузка и загрузка вопросов (transfer.py) — бот можно не останавливать."""
+    # рабочая папка — текущая: пути к файлам в args указаны относительно нее
+    subprocess.run([sys.executable, str(BASE_DIR / "transfer.py")] + args)
 
 # -------- CLI --------
 def main():
+    # python bot_cli.py export|import ... — без меню, аргументы как у transfer.py
+    if len(sys.argv) > 1 and sys.argv[1] in ("export", "import"):
+        transfer(sys.argv[1:])
+        return
     while True:
         print("\n=== Telegram Bot CLI ===")
         print("1. Показать настройки")
@@ -115,6 +372,14 @@ def main():
         print("4. Остановить бота")
         print("5. Перезапустить бота")
         print("6. Показать логи")
+        print("7. Режим работы (polling/webhook)")
+        print("8. Статистика")
+        print("9. Следить за логами")
+        print("10. Состояние процессов")
+        print("11. Отчет по вопросам")
+        print("12. Пересчитать отчет по истории")
+        print("13. Выгрузить вопросы в файл")
+        print("14. Загрузить вопросы из файла")
         print("0. Выход")
 
         choice = input("> ").strip()
@@ -132,6 +397,26 @@ def main():
             restart_bot()
         elif choice == "6":
             show_logs()
+        elif choice == "7":
+            set_mode()
+        elif choice == "8":
+            show_stats()
+        elif choice == "9":
+            follow_logs()
+        elif choice == "10":
+            show_status()
+        elif choice == "11":
+            show_report()
+        elif choice == "12":
+            show_report(rebuild=True)
+        elif choice == "13":
+            path = input("Файл (.jsonl, .csv или .parquet): ").strip()
+            since = input("Начиная с даты (YYYY-MM-DD, пусто — все): ").strip()
+            transfer(["export", path] + (["--since", since] if since else []))
+        elif choice == "14":
+            path = input("Файл выгрузки: ").strip()
+            db = input("База (пусто — questions.db): ").strip()
+            transfer(["import", path] + (["--db", db] if db else []))
         elif choice == "0":
             print("Выход")
             break
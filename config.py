@@ -1,14 +1,250 @@
+"""
+Настройки бота из config.json.
+
+Значения — глобальные переменные модуля с аннотацией типа: код читает их
+как config.X в момент использования. Бот следит за config.json (по mtime и
+по SIGHUP, который шлет bot_cli.py) и вызывает reload(): новые значения
+проверяются по типам целиком и применяются все сразу или не применяются
+вовсе. Ключи из RESTART_REQUIRED (токен, рабочий чат, режим, порты, логи) меняются только
+перезапуском.
+"""
 import json
+import os
+import sys
 from pathlib import Path
+from typing import get_args, get_origin
 
 CONFIG_FILE = Path(__file__).parent / "config.json"
 
 # значения по умолчанию на случай, если файла нет
-BOT_TOKEN = ""
-WORK_CHAT_ID = 0
-
-if CONFIG_FILE.exists():
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        BOT_TOKEN = data.get("BOT_TOKEN", BOT_TOKEN)
-        WORK_CHAT_ID = data.get("WORK_CHAT_ID", WORK_CHAT_ID)
+BOT_TOKEN: str = ""
+WORK_CHAT_ID: int = 0
+
+# режим получения апдейтов: "polling" или "webhook"
+MODE: str = "polling"
+WEBHOOK_URL: str = ""        # публичный адрес, например https://example.com/webhook
+WEBHOOK_PATH: str = "/webhook"
+WEBHOOK_SECRET: str = ""     # сверяется с заголовком X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_HOST: str = "127.0.0.1"
+WEBHOOK_PORT: int = 8080
+WEBHOOK_SET: bool = True     # регистрировать webhook при старте (за балансировщиком — только одному экземпляру)
+
+# хранилище кулдаунов и частей альбомов: "memory" (один процесс) или "sqlite" (общее для процессов)
+STATE_BACKEND: str = "memory"
+STATE_DB: str = "state.db"
+STATE_MAX_SIZE: int = 100_000  # максимум ключей в memory-хранилище
+
+# эндпоинт метрик (Prometheus и пункт "Статистика" в bot_cli.py); 0 — выключен
+METRICS_HOST: str = "127.0.0.1"
+METRICS_PORT: int = 9100
+
+# число процессов бота под supervisor.py (больше одного — только для webhook)
+WORKERS: int = 1
+# задаются супервизором через окружение: номер воркера и файл heartbeat
+WORKER_ID = int(os.environ.get("BOT_WORKER_ID", 0))
+HEARTBEAT_FILE = os.environ.get("BOT_HEARTBEAT_FILE", "")
+
+# логи в logs/bot.log: "text" или "json" (одна запись — одна строка JSON)
+LOG_LEVEL: str = "INFO"
+LOG_FORMAT: str = "text"
+LOG_ROTATION: str = "size"           # "size" — по LOG_MAX_BYTES, "time" — каждую полночь
+LOG_MAX_BYTES: int = 10 * 1024 * 1024
+LOG_BACKUP_COUNT: int = 5
+
+# архивация закрытых вопросов (см. archive.py): старше скольких дней; 0 — выключена
+ARCHIVE_AFTER_DAYS: int = 30
+ARCHIVE_INTERVAL: int = 3600  # как часто запускать, сек
+
+# менеджеры (Telegram id) для автоматического назначения вопросов (см. assignment.py)
+MANAGERS: list[int] = []
+AUTO_ASSIGN: bool = False     # назначать новые вопросы наименее загруженному менеджеру
+
+# пользователи и менеджеры
+MIN_INTERVAL: int = 60              # сек между вопросами одного пользователя
+MEDIA_GROUP_TIMEOUT: float = 1.0    # максимальный период тишины, после которого альбом считается полным
+QUESTIONS_PER_PAGE: int = 8
+
+# производительность: лимиты отправки (сообщений в секунду), пачки записи, задержки
+SEND_GLOBAL_RATE: float = 30        # на всего бота (лимит Telegram)
+SEND_PRIVATE_RATE: float = 1.0      # в один личный чат
+SEND_GROUP_RATE: float = 20 / 60    # в одну группу: 20 сообщений в минуту
+WRITER_BATCH_SIZE: int = 100        # вопросов в одной транзакции записи
+WRITER_BATCH_DELAY: float = 0.02    # сколько ждать добора пачки, сек
+STATUS_COALESCE_DELAY: float = 0.5  # склейка быстрых смен статуса одного вопроса, сек
+
+# допустимые значения строковых настроек
+CHOICES = {
+    "MODE": ("polling", "webhook"),
+    "STATE_BACKEND": ("memory", "sqlite"),
+    "LOG_LEVEL": ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"),
+    "LOG_FORMAT": ("text", "json"),
+    "LOG_ROTATION": ("size", "time"),
+}
+# числа, которые должны быть больше нуля; остальные, кроме SIGNED, — не меньше нуля
+SIGNED = {"WORK_CHAT_ID"}  # id группы отрицательный
+POSITIVE = {
+    "WORKERS", "LOG_MAX_BYTES", "STATE_MAX_SIZE", "ARCHIVE_INTERVAL", "MEDIA_GROUP_TIMEOUT", "QUESTIONS_PER_PAGE",
+    "SEND_GLOBAL_RATE", "SEND_PRIVATE_RATE", "SEND_GROUP_RATE", "WRITER_BATCH_SIZE",
+}
+
+# ключи, которые можно задать в config.json, и их типы
+SETTINGS = {name: kind for name, kind in __annotations__.items()}
+# значения по умолчанию (до чтения config.json) — от них же строится конфиг в bot_cli.py
+DEFAULTS = {name: globals()[name] for name in SETTINGS}
+# меняются только перезапуском: используются один раз при старте процесса
+RESTART_REQUIRED = {
+    # WORK_CHAT_ID: карточки вопросов и их message_id (work_message_id, медиа) принадлежат старому чату
+    "BOT_TOKEN", "WORK_CHAT_ID", "MODE",
+    "WEBHOOK_URL", "WEBHOOK_PATH", "WEBHOOK_SECRET", "WEBHOOK_HOST", "WEBHOOK_PORT", "WEBHOOK_SET",
+    "STATE_BACKEND", "STATE_DB", "STATE_MAX_SIZE",
+    "METRICS_HOST", "METRICS_PORT", "WORKERS",
+    "LOG_FORMAT", "LOG_ROTATION", "LOG_MAX_BYTES", "LOG_BACKUP_COUNT",
+    "ARCHIVE_AFTER_DAYS", "ARCHIVE_INTERVAL",
+}
+
+_mtime = None  # mtime config.json при последнем чтении
+_subscribers = []
+_reported_pending = {}  # значения ключей RESTART_REQUIRED, о которых reload уже сообщил
+
+
+def _convert(name: str, value):
+    """Значение из JSON к типу настройки; ValueError — если не подходит."""
+    kind = SETTINGS[name]
+    if get_origin(kind) is list:
+        item = get_args(kind)[0]
+        if not isinstance(value, list):
+            raise ValueError("нужен список")
+        return [_convert_scalar(item, element) for element in value]
+    value = _convert_scalar(kind, value)
+    if name in CHOICES and value not in CHOICES[name]:
+        raise ValueError(f"допустимо: {', '.join(CHOICES[name])}")
+    if kind in (int, float) and name not in SIGNED and (value <= 0 if name in POSITIVE else value < 0):
+        raise ValueError("нужно число больше нуля" if name in POSITIVE else "число не может быть отрицательным")
+    return value
+
+
+def _convert_scalar(kind, value):
+    # bool в Python — тоже int, но true вместо числа в config.json — скорее ошибка
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ValueError("нужно true или false")
+        return value
+    if kind is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("нужно целое число")
+        return value
+    if kind is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("нужно число")
+        return float(value)
+    if not isinstance(value, str):
+        raise ValueError("нужна строка")
+    return value
+
+
+def validate(data: dict) -> tuple[dict, list]:
+    """Проверяет настройки из config.json. Возвращает (значения, ошибки); неизвестные ключи пропускаются."""
+    values, errors = {}, []
+    for name in SETTINGS:
+        if name not in data:
+            continue
+        try:
+            values[name] = _convert(name, data[name])
+        except ValueError as e:
+            errors.append(f"{name} = {data[name]!r}: {e}")
+    return values, errors
+
+
+def parse(name: str, text: str):
+    """Значение настройки из строки (ввод в bot_cli.py). ValueError — если не подходит."""
+    kind = SETTINGS[name]
+    text = text.strip()
+    if kind is bool:
+        value = text.lower() in ("1", "true", "yes", "да")
+    elif kind is int:
+        value = int(text)
+    elif kind is float:
+        value = float(text)
+    elif get_origin(kind) is list:
+        # список Telegram id через запятую
+        value = [int(part) for part in text.split(",") if part.strip()]
+    else:
+        value = text
+    return _convert(name, value)
+
+
+def _mtime_of(path: Path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read(path: Path):
+    """Данные config.json; файла нет — {}, файл пустой — None."""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return json.loads(text) if text.strip() else None
+
+
+def load(path: Path = CONFIG_FILE):
+    """
+    Накладывает значения из config.json на значения по умолчанию (вызывается при импорте).
+    Неподходящие значения пропускаются с сообщением в stderr — остаются значения по умолчанию.
+    """
+    global _mtime
+    _mtime = _mtime_of(path)
+    values, errors = validate(_read(path) or {})
+    for error in errors:
+        print(f"config.json: {error} — используется значение по умолчанию", file=sys.stderr)
+    globals().update(values)
+
+
+def subscribe(callback):
+    """Регистрирует callback(changes: dict) — вызывается после применения новых значений."""
+    _subscribers.append(callback)
+    return callback
+
+
+def changed_on_disk(path: Path = CONFIG_FILE) -> bool:
+    return _mtime_of(path) != _mtime
+
+
+def reload(path: Path = CONFIG_FILE) -> tuple[dict, dict, list]:
+    """
+    Перечитывает config.json и применяет изменения разом.
+    Возвращает (примененные изменения, изменения, которым нужен перезапуск, ошибки);
+    о правке, которой нужен перезапуск, сообщается один раз. При любой ошибке не применяется ничего.
+    """
+    global _mtime
+    # эту версию файла больше не перечитываем, даже если в ней ошибка: ждем следующей правки
+    _mtime = _mtime_of(path)
+    try:
+        data = _read(path)
+    except (OSError, json.JSONDecodeError) as e:
+        return {}, {}, [f"{path.name}: {e}"]
+    if data is None:
+        # файл пишут прямо сейчас — иначе все настройки вернулись бы к значениям по умолчанию
+        return {}, {}, [f"{path.name} пуст"]
+    values, errors = validate(data)
+    if errors:
+        return {}, {}, errors
+    # ключ, удаленный из файла, возвращается к значению по умолчанию
+    values = {**DEFAULTS, **values}
+    current = globals()
+    changes = {name: value for name, value in values.items() if current[name] != value and name not in RESTART_REQUIRED}
+    waiting = {name: value for name, value in values.items() if current[name] != value and name in RESTART_REQUIRED}
+    # живые значения этих ключей до перезапуска не меняются: сообщаем только о новых правках
+    pending = {name: value for name, value in waiting.items() if _reported_pending.get(name) != value}
+    _reported_pending.clear()
+    _reported_pending.update(waiting)
+    current.update(changes)
+    if changes:
+        for callback in _subscribers:
+            callback(changes)
+    return changes, pending, []
+
+
+load()
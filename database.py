@@ -1,9 +1,144 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base
+from sqlalchemy import Integer, event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from models import Base, Question, ArchivedQuestion, Status, STATUS_BY_LABEL
+from logger import logger
+from metrics import instrument_engine
+from stats import STATS_DDL, rebuild_counters
+from archive import ARCHIVE_FTS_DDL
 
-engine = create_engine("sqlite:///questions.db")
-SessionLocal = sessionmaker(bind=engine)
+DATABASE_PATH = "questions.db"
+DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
 
-def init_db():
-    Base.metadata.create_all(engine)
+
+def build_engine(url: str = DATABASE_URL, pool_size: int = 5):
+    """
+    Создает асинхронный движок SQLite (aiosqlite) с пулом соединений.
+    На каждом новом соединении включаем WAL, чтобы чтение не ждало запись.
+    """
+    async_engine = create_async_engine(url, pool_size=pool_size, max_overflow=pool_size * 2)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # действует только для новой базы (до первой таблицы); старую переводит archive.py --vacuum
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    instrument_engine(async_engine)
+    return async_engine
+
+
+engine = build_engine()
+# expire_on_commit=False — объекты остаются доступны после закрытия сессии
+SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+# Полнотекстовый индекс FTS5 по тексту вопроса и username (external content — данные не дублируются).
+# Триггеры держат индекс в синхронизации с таблицей questions; смена статуса его не трогает.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        text, username, content='questions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts (rowid, text, username) VALUES (new.id, new.text, new.username);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO questions_fts (questions_fts, rowid, text, username)
+        VALUES ('delete', old.id, old.text, old.username);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF text, username ON questions BEGIN
+        INSERT INTO questions_fts (questions_fts, rowid, text, username)
+        VALUES ('delete', old.id, old.text, old.username);
+        INSERT INTO questions_fts (rowid, text, username) VALUES (new.id, new.text, new.username);
+    END
+    """,
+]
+
+
+def _migrate_status_codes(sync_conn):
+    """
+    Переводит status из строк с эмодзи ("новый 🆕") в числовые коды Status.
+    SQLite не меняет тип колонки, поэтому таблица пересоздается: старая
+    переименовывается, данные копируются с заменой подписей на коды.
+    id сохраняются, так что полнотекстовый индекс остается валидным.
+    """
+    inspector = inspect(sync_conn)
+    old_columns = [column["name"] for column in inspector.get_columns("questions")]
+    # индексы переезжают вместе со старой таблицей — освобождаем имена для новых
+    for index in inspector.get_indexes("questions"):
+        sync_conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+    sync_conn.execute(text("ALTER TABLE questions RENAME TO questions_old"))
+    Question.__table__.create(sync_conn)
+
+    columns = [c.name for c in Question.__table__.columns if c.name in old_columns and c.name != "status"]
+    cases = " ".join(f"WHEN :label{int(code)} THEN {int(code)}" for code in STATUS_BY_LABEL.values())
+    params = {f"label{int(code)}": label for label, code in STATUS_BY_LABEL.items()}
+    unknown = sync_conn.execute(
+        text(f"SELECT COUNT(*) FROM questions_old WHERE status IS NULL OR status NOT IN ({', '.join(':' + k for k in params)})"),
+        params
+    ).scalar()
+    column_list = ", ".join(columns)
+    sync_conn.execute(
+        text(
+            f"INSERT INTO questions ({column_list}, status) "
+            f"SELECT {column_list}, CASE status {cases} ELSE {int(Status.NEW)} END FROM questions_old"
+        ),
+        params
+    )
+    # вместе со старой таблицей удаляются и ее триггеры FTS, _migrate создаст их заново
+    sync_conn.execute(text("DROP TABLE questions_old"))
+    if unknown:
+        logger.warning(f"Миграция статусов: {unknown} вопросов с неизвестным статусом получили статус NEW.")
+    logger.info("Миграция статусов: колонка status переведена на числовые коды.")
+
+
+def _migrate(sync_conn):
+    status_column = next(c for c in inspect(sync_conn).get_columns("questions") if c["name"] == "status")
+    if not isinstance(status_column["type"], Integer):
+        _migrate_status_codes(sync_conn)
+
+    # create_all не добавляет колонки и индексы в уже существующие таблицы
+    for table in (Question.__table__, ArchivedQuestion.__table__):
+        existing = {column["name"] for column in inspect(sync_conn).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+    # полнотекстовый поиск: при первом создании индексируем уже накопленные вопросы
+    fts_exists = inspect(sync_conn).has_table("questions_fts")
+    for statement in FTS_DDL:
+        sync_conn.execute(text(statement))
+    if not fts_exists:
+        sync_conn.execute(text("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')"))
+    # у архива закрытых вопросов свой индекс (см. archive.py)
+    for statement in ARCHIVE_FTS_DDL:
+        sync_conn.execute(text(statement))
+
+    # счетчики дашборда и история статусов (триггеры, см. stats.py);
+    # они появились позже вопросов — для старой базы счетчики строятся по истории
+    for statement in STATS_DDL:
+        sync_conn.execute(text(statement))
+    counters_empty = sync_conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM stat_counters)")).scalar()
+    questions_exist = sync_conn.execute(text("SELECT EXISTS (SELECT 1 FROM questions)")).scalar()
+    if counters_empty and questions_exist:
+        questions = rebuild_counters(sync_conn)
+        logger.info(f"Статистика: счетчики построены по истории ({questions} вопросов).")
+
+
+async def init_db(db_engine=None):
+    async with (db_engine or engine).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate)
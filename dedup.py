@@ -0,0 +1,170 @@
+import hashlib
+import re
+import time
+from collections import deque
+
+NUM_PERM = 32          # длина MinHash-сигнатуры
+BANDS = 8              # LSH: 8 полос по 4 значения — кандидаты от сходства ~0.6
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5       # символьные n-граммы нормализованного текста
+NEAR_DUP_THRESHOLD = 0.8
+MIN_WORDS = 3          # короче (слов после нормализации) — не повтор: "Здравствуйте", "помогите", эмодзи
+DEDUP_WINDOW = 24 * 60 * 60  # ищем повторы среди вопросов за последние сутки
+
+MAX_CANDIDATES = 16    # сколько кандидатов из LSH сравниваем полностью
+_MASK64 = (1 << 64) - 1
+_BIN_BITS = NUM_PERM.bit_length() - 1  # NUM_PERM — степень двойки
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё→е, без пунктуации и лишних пробелов."""
+    text = text.lower().replace("ё", "е")
+    return " ".join(re.findall(r"\w+", text))
+
+
+class Fingerprint:
+    """Точный хеш нормализованного текста и MinHash-сигнатура для поиска похожих."""
+
+    __slots__ = ("exact", "signature", "words", "numbers")
+
+    def __init__(self, text: str):
+        normalized = normalize(text)
+        words = normalized.split()
+        self.words = len(words)
+        # "заказ 5" и "заказ 7" почти совпадают по шинглам, но это разные вопросы
+        self.numbers = tuple(word for word in words if word.isdigit())
+        self.exact = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+        if len(normalized) <= SHINGLE_SIZE:
+            shingles = {normalized}
+        else:
+            shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+        self.signature = self._one_permutation_minhash(shingles)
+
+    @staticmethod
+    def _one_permutation_minhash(shingles) -> tuple:
+        """
+        MinHash одной хеш-функцией (one permutation hashing): младшие биты хеша
+        выбирают ячейку, старшие — значение, в ячейке храним минимум.
+        O(число шинглов) вместо O(число шинглов × NUM_PERM) у классического MinHash.
+        Пустые ячейки заполняются из ближайшей непустой справа (densification).
+        """
+        bins = [None] * NUM_PERM
+        for shingle in shingles:
+            h = hash(shingle) & _MASK64
+            index = h & (NUM_PERM - 1)
+            value = h >> _BIN_BITS
+            current = bins[index]
+            if current is None or value < current:
+                bins[index] = value
+        for i in range(NUM_PERM):
+            if bins[i] is None:
+                for step in range(1, NUM_PERM):
+                    donor = bins[(i + step) % NUM_PERM]
+                    if donor is not None:
+                        bins[i] = donor + step  # сдвиг, чтобы заимствованные ячейки не совпадали случайно
+                        break
+        return tuple(bins)
+
+    @property
+    def matchable(self) -> bool:
+        """Достаточно ли текста, чтобы искать повторы (пустой после нормализации — нет)."""
+        return self.words >= MIN_WORDS
+
+    def bands(self):
+        return [(i, self.signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def similarity(self, other: "Fingerprint") -> float:
+        """Оценка коэффициента Жаккара по совпадающим позициям сигнатур; разные числа в тексте — 0."""
+        if self.numbers != other.numbers:
+            return 0.0
+        same = sum(1 for x, y in zip(self.signature, other.signature) if x == y)
+        return same / NUM_PERM
+
+
+class DuplicateIndex:
+    """
+    Индекс недавних вопросов в памяти для поиска точных и почти точных повторов.
+
+    Точные повторы — словарь по хешу нормализованного текста, похожие — LSH
+    по полосам MinHash-сигнатуры: поиск стоит O(BANDS) обращений к словарям
+    и не зависит от числа вопросов. Вопросы старше window вытесняются,
+    закрытые убирает discard(). Короткие тексты (см. MIN_WORDS) не индексируются.
+    """
+
+    def __init__(self, window: float = DEDUP_WINDOW, threshold: float = NEAR_DUP_THRESHOLD):
+        self.window = window
+        self.threshold = threshold
+        self._exact: dict[str, set] = {}
+        self._buckets: dict[tuple, set] = {}
+        self._entries: dict[int, Fingerprint] = {}
+        self._owners: dict[int, int] = {}  # id вопроса -> id пользователя
+        self._order = deque()  # (timestamp, question_id) в порядке добавления
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now: float):
+        while self._order and self._order[0][0] < now - self.window:
+            _, question_id = self._order.popleft()
+            self.discard(question_id)
+
+    def discard(self, question_id: int):
+        """Убирает вопрос из индекса (закрыт или ушел в архив): его повтор — уже новый вопрос."""
+        fingerprint = self._entries.pop(question_id, None)
+        if fingerprint is None:
+            return
+        del self._owners[question_id]
+        same_text = self._exact.get(fingerprint.exact)
+        if same_text is not None:
+            same_text.discard(question_id)
+            if not same_text:
+                del self._exact[fingerprint.exact]
+        for band in fingerprint.bands():
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def find(self, fingerprint: Fingerprint, now: float = None, user_id: int = None):
+        """
+        id самого раннего похожего вопроса в окне или None.
+        user_id — искать только среди вопросов этого пользователя.
+        """
+        self._expire(now or time.time())
+        if not fingerprint.matchable:
+            return None
+
+        def own(candidate):
+            return user_id is None or self._owners[candidate] == user_id
+
+        exact = [candidate for candidate in self._exact.get(fingerprint.exact, ()) if own(candidate)]
+        if exact:
+            return min(exact)
+
+        # чем больше полос совпало, тем вероятнее сходство — полностью сверяем только лучших
+        hits = {}
+        for band in fingerprint.bands():
+            for candidate in self._buckets.get(band, ()):
+                if own(candidate):
+                    hits[candidate] = hits.get(candidate, 0) + 1
+        if not hits:
+            return None
+        best = None
+        for candidate in sorted(hits, key=hits.get, reverse=True)[:MAX_CANDIDATES]:
+            if fingerprint.similarity(self._entries[candidate]) >= self.threshold:
+                if best is None or candidate < best:
+                    best = candidate
+        return best
+
+    def add(self, question_id: int, fingerprint: Fingerprint, timestamp: float = None, user_id: int = None):
+        timestamp = timestamp or time.time()
+        self._expire(time.time())
+        if timestamp < time.time() - self.window or not fingerprint.matchable:
+            return
+        self._entries[question_id] = fingerprint
+        self._owners[question_id] = user_id
+        self._exact.setdefault(fingerprint.exact, set()).add(question_id)
+        for band in fingerprint.bands():
+            self._buckets.setdefault(band, set()).add(question_id)
+        self._order.append((timestamp, question_id))
@@ -0,0 +1,133 @@
+import asyncio
+from aiogram.exceptions import TelegramBadRequest
+from logger import logger
+
+COALESCE_DELAY = 0.5   # сколько ждать следующей смены статуса того же вопроса, сек
+MAX_CONCURRENCY = 20   # одновременно обрабатываемых событий
+MAX_RETRIES = 3
+RETRY_DELAY = 1.0      # пауза перед первым повтором, дальше удваивается
+
+
+class StatusChange:
+    """
+    Смена статуса вопроса.
+    messages — сообщения менеджеров (chat_id, message_id) с карточкой, которые надо перерисовать;
+    send_card — отправить в рабочий чат новую карточку (смена через /status).
+    """
+
+    __slots__ = ("question", "previous_status", "manager_id", "messages", "send_card")
+
+    def __init__(self, question, previous_status: int, manager_id: int = None, message=None, send_card: bool = False):
+        self.question = question
+        self.previous_status = previous_status
+        self.manager_id = manager_id
+        self.messages = [message] if message else []
+        self.send_card = send_card
+
+    @property
+    def reverted(self) -> bool:
+        """Склеенные смены вернули исходный статус: пользователю сообщать не о чем."""
+        return self.question.status == self.previous_status
+
+    def merge(self, newer: "StatusChange") -> "StatusChange":
+        """Склеивает с более поздней сменой: статус — последний, исходный статус — первый."""
+        newer.previous_status = self.previous_status
+        newer.messages = self.messages + [m for m in newer.messages if m not in self.messages]
+        newer.send_card = self.send_card or newer.send_card
+        return newer
+
+
+class StatusEventBus:
+    """
+    Фоновая обработка побочных эффектов смены статуса: уведомления, карточки, логи.
+
+    publish() не ждет обработчиков, поэтому менеджер получает ответ на кнопку сразу.
+    Смены одного вопроса в пределах COALESCE_DELAY склеиваются в одно событие
+    (после быстрого переключения туда-обратно пользователь уведомления не получает,
+    но карточки перерисовываются — мог смениться исполнитель), события
+    одного вопроса обрабатываются строго по порядку, всего одновременно — не больше
+    max_concurrency. Упавший обработчик повторяется с экспоненциальной паузой.
+    """
+
+    def __init__(
+        self,
+        delay: float = COALESCE_DELAY,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        retry_delay: float = RETRY_DELAY
+    ):
+        self.delay = delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._handlers = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: dict[int, StatusChange] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._running: dict[int, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.published = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def subscribe(self, handler):
+        """Регистрирует async def handler(event); можно использовать как декоратор."""
+        self._handlers.append(handler)
+        return handler
+
+    def publish(self, event: StatusChange):
+        key = event.question.id
+        self.published += 1
+        pending = self._pending.get(key)
+        if pending is not None:
+            event = pending.merge(event)
+            self.coalesced += 1
+        self._pending[key] = event
+
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers[key] = loop.call_later(self.delay, self._start, key)
+
+    def _start(self, key: int):
+        self._timers.pop(key, None)
+        event = self._pending.pop(key, None)
+        if event is None:
+            return
+        task = asyncio.create_task(self._dispatch(event, self._running.get(key)))
+        self._running[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda t: self._running.pop(key) if self._running.get(key) is t else None)
+
+    async def _dispatch(self, event: StatusChange, previous: asyncio.Task = None):
+        # предыдущее событие этого вопроса должно закончиться раньше — иначе уведомления перепутаются
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        async with self._semaphore:
+            for handler in self._handlers:
+                await self._run(handler, event)
+
+    async def _run(self, handler, event: StatusChange):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await handler(event)
+                return
+            except TelegramBadRequest as e:
+                # сообщение удалено, не изменилось и т.п. — повтор не поможет
+                logger.warning(f"{handler.__name__} для вопроса #{event.question.id}: {e}")
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error(f"{handler.__name__} для вопроса #{event.question.id} не выполнен: {e}")
+                    return
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    async def close(self):
+        """Сразу запускает отложенные события и дожидается всех обработчиков."""
+        for key, timer in list(self._timers.items()):
+            timer.cancel()
+            self._start(key)
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
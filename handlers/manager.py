@@ -1,32 +1,64 @@
-import asyncio
-from aiogram import types
+import hashlib
+from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
-from aiogram.exceptions import TelegramRetryAfter
-from loader import dp
-from helpers import send_user_question_to_managers, get_questions, notify_user_status_change
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from loader import send_queue, state_store, status_events
+from helpers import (
+    post_question_to_managers,
+    get_question,
+    get_questions_page,
+    search_questions,
+    update_assignment
+)
 from database import SessionLocal
-from models import Question, STATUSES
+from models import (
+    ArchivedQuestion,
+    Status,
+    STATUSES,
+    STATUS_LABELS,
+    STATUS_BY_LABEL,
+    LEGACY_STATUS_CODES,
+    ACTIVE_STATUSES,
+    status_label
+)
 from keyboards import (
     generate_question_list_page,
     generate_status_buttons,
+    render_question_card,
     StatusCallback,
+    LegacyStatusCallback,
+    TakeCallback,
     PageQuestionCallback,
     PaginationCallback,
     QuestionCallback
 )
-from config import WORK_CHAT_ID
+from events import StatusChange
+from assignment import remember_manager, manager_label
+from stats import get_dashboard, format_dashboard
+import config
 from logger import logger
 
-QUESTIONS_PER_PAGE = 8
+SEARCH_FILTER_PREFIX = "s_"  # filter_status результатов поиска: s_<token>
+SEARCH_TTL = 24 * 60 * 60   # сколько помнить запрос для кнопок пагинации
+
+# подключается к диспетчеру в loader.create_app()
+router = Router(name="manager")
+
+
+class SearchStates(StatesGroup):
+    query = State()
 
 # -------------------------
 # Меню "Список вопросов" для менеджера
 # -------------------------
-@dp.message(lambda m: m.chat.id == WORK_CHAT_ID and m.text == "📋 Список вопросов")
+@router.message(lambda m: m.chat.id == config.WORK_CHAT_ID and m.text == "📋 Список вопросов")
 async def manager_list_btn(message: types.Message):
-    # активные вопросы
-    active_statuses = ["новый 🆕", "в работе ⚙️"]
-    questions = get_questions(status_filter=active_statuses)  # get_questions сортирует по id.asc()
+    # первая страница активных вопросов
+    questions, has_prev, has_next = await get_questions_page(
+        status_filter=ACTIVE_STATUSES,
+        limit=config.QUESTIONS_PER_PAGE
+    )
 
     if not questions:
         await message.answer("Активных вопросов нет.")
@@ -35,7 +67,8 @@ async def manager_list_btn(message: types.Message):
     text, markup = generate_question_list_page(
         questions,
         page=1,
-        per_page=QUESTIONS_PER_PAGE
+        has_prev=has_prev,
+        has_next=has_next
     )
     await message.answer(text, reply_markup=markup)
     logger.info(f"Менеджер {message.from_user.id} открыл список вопросов.")
@@ -43,118 +76,313 @@ async def manager_list_btn(message: types.Message):
 # -------------------------
 # Пагинация вопросов
 # -------------------------
-@dp.callback_query(PaginationCallback.filter())
+@router.callback_query(PaginationCallback.filter())
 async def paginate_questions(callback: types.CallbackQuery, callback_data: PaginationCallback):
-    # Маппим filter_status
-    if callback_data.filter_status == "active":
-        status_filter_list = ["новый 🆕", "в работе ⚙️"]
+    offset = None
+    backward = bool(callback_data.before_id or callback_data.before_offset)
+    if callback_data.filter_status.startswith(SEARCH_FILTER_PREFIX):
+        # результаты поиска: запрос не влезает в callback_data, он лежит в state_store
+        token = callback_data.filter_status[len(SEARCH_FILTER_PREFIX):]
+        query = await state_store.get(f"search:{token}")
+        if query is None:
+            await callback.answer("Результаты поиска устарели, повторите поиск.", show_alert=True)
+            return
+        offset, limit = callback_data.offset, config.QUESTIONS_PER_PAGE
+        if backward:
+            # страница, которая заканчивается перед before_offset
+            offset = max(0, callback_data.before_offset - limit)
+            limit = callback_data.before_offset - offset
+        questions, has_prev, has_next = await search_questions(query, offset=offset, limit=limit)
     else:
-        status_filter_list = None
+        # Маппим filter_status
+        if callback_data.filter_status == "active":
+            status_filter_list = ACTIVE_STATUSES
+        else:
+            status_filter_list = None
 
-    questions = get_questions(status_filter=status_filter_list)
+        # 0 в курсоре означает "нет курсора"
+        questions, has_prev, has_next = await get_questions_page(
+            status_filter=status_filter_list,
+            after_id=callback_data.after_id or None,
+            before_id=callback_data.before_id or None,
+            limit=config.QUESTIONS_PER_PAGE
+        )
+
+    if not questions:
+        await callback.answer("Вопросов больше нет", show_alert=True)
+        return
 
     # Генерируем всё в одном месте
     text, reply_markup = generate_question_list_page(
         questions,
         page=callback_data.page,
-        per_page=QUESTIONS_PER_PAGE,
-        filter_status=callback_data.filter_status
+        filter_status=callback_data.filter_status,
+        has_prev=has_prev,
+        has_next=has_next,
+        offset=offset,
+        backward=backward
     )
 
-    try:
-        await callback.message.edit_text(text, reply_markup=reply_markup)
-    except TelegramRetryAfter as e:
-        logger.warning(f"Flood control: ждем {e.timeout} сек.")
-        await asyncio.sleep(e.timeout)
-        await callback.message.edit_text(text, reply_markup=reply_markup)
-
+    # отвечаем на callback сразу: лимит рабочего чата общий с пересылкой вопросов,
+    # и при всплеске правка может ждать в очереди дольше, чем живет callback query
     await callback.answer()
+    # очередь сама ждет retry_after при flood control
+    await send_queue.send(
+        callback.message.chat.id,
+        lambda: callback.message.edit_text(text, reply_markup=reply_markup)
+    )
     logger.info(
         f"Менеджер {callback.from_user.id} открыл страницу {callback_data.page}."
     )
 
+# -------------------------
+# Полнотекстовый поиск: /search <слова> или кнопка "🔍 Поиск"
+# -------------------------
+async def answer_search(message: types.Message, query: str):
+    token = hashlib.sha1(query.encode()).hexdigest()[:10]
+    await state_store.set(f"search:{token}", query, ttl=SEARCH_TTL)
+
+    questions, has_prev, has_next = await search_questions(query, limit=config.QUESTIONS_PER_PAGE)
+    if not questions:
+        await message.answer("Ничего не найдено.")
+        return
+
+    text, markup = generate_question_list_page(
+        questions,
+        page=1,
+        filter_status=f"{SEARCH_FILTER_PREFIX}{token}",
+        has_prev=has_prev,
+        has_next=has_next,
+        offset=0
+    )
+    await message.answer(text, reply_markup=markup)
+    logger.info(f"Менеджер {message.from_user.id} искал '{query}'.")
+
+@router.message(Command("search"))
+async def search_command(message: types.Message, command: CommandObject):
+    if message.chat.id != config.WORK_CHAT_ID:
+        return
+    if not command.args:
+        await message.answer("Использование: /search <слова>")
+        return
+    await answer_search(message, command.args)
+
+@router.message(lambda m: m.chat.id == config.WORK_CHAT_ID and m.text == "🔍 Поиск")
+async def search_button(message: types.Message, state: FSMContext):
+    await state.set_state(SearchStates.query)
+    await message.answer("Введите слова для поиска по тексту вопроса или username:")
+
+@router.message(SearchStates.query)
+async def search_query_entered(message: types.Message, state: FSMContext):
+    await state.clear()
+    if not message.text:
+        await message.answer("Нужен текстовый запрос.")
+        return
+    await answer_search(message, message.text)
+
 # -------------------------
 # Изменение статуса вопроса через кнопки
 # -------------------------
-@dp.callback_query(StatusCallback.filter())
+@router.callback_query(StatusCallback.filter())
 async def change_status_callback(callback: types.CallbackQuery, callback_data: StatusCallback):
-    with SessionLocal() as session:
-        question = session.query(Question).filter_by(id=callback_data.question_id).first()
-        if not question:
-            await callback.answer("Вопрос не найден", show_alert=True)
-            logger.warning(f"Вопрос {callback_data.question_id} не найден для смены статуса.")
-            return
-        question.status = callback_data.new_status
-        session.commit()
-        session.refresh(question)  # Добавьте эту строку здесь
+    if callback_data.new_status not in STATUS_LABELS:
+        await callback.answer("Неизвестный статус", show_alert=True)
+        return
+    await apply_status_callback(callback, callback_data.question_id, Status(callback_data.new_status))
 
-    await notify_user_status_change(question)
 
-    # Обновляем сообщение с новой клавиатурой
-    await callback.message.edit_text(
-        f"#{question.id} | {question.status} | @{question.username or 'пользователь'}:\n{question.text}",
-        reply_markup=generate_status_buttons(question.id)
-    )
+@router.callback_query(LegacyStatusCallback.filter())
+async def change_status_legacy_callback(callback: types.CallbackQuery, callback_data: LegacyStatusCallback):
+    # старые кнопки в чате еще несут букву или полный текст статуса
+    new_status = LEGACY_STATUS_CODES.get(callback_data.new_status, STATUS_BY_LABEL.get(callback_data.new_status))
+    if new_status is None:
+        await callback.answer("Неизвестный статус", show_alert=True)
+        return
+    await apply_status_callback(callback, callback_data.question_id, new_status)
 
-    await callback.answer(f"Статус обновлён на '{question.status}'")
-    logger.info(f"Статус вопроса #{question.id} обновлён на {question.status} менеджером {callback.from_user.id}.")
+
+async def answer_not_in_work(callback: types.CallbackQuery, question_id: int):
+    """Ответ на кнопку вопроса, которого нет в questions: он в архиве или не существует."""
+    if await get_question(question_id):
+        await callback.answer("Вопрос в архиве, статус не меняется", show_alert=True)
+        return
+    await callback.answer("Вопрос не найден", show_alert=True)
+    logger.warning(f"Вопрос {question_id} не найден для смены статуса.")
+
+
+async def apply_status_callback(callback: types.CallbackQuery, question_id: int, new_status: Status):
+    remember_manager(callback.from_user)
+    # смена статуса ничейного вопроса назначает его нажавшему; чужой вопрос не меняется
+    question, previous_status, holder = await update_assignment(question_id, callback.from_user.id, new_status)
+    if question is None:
+        await answer_not_in_work(callback, question_id)
+        return
+    if holder is not None:
+        await callback.answer(f"Вопрос ведет {manager_label(holder)}", show_alert=True)
+        return
+
+    # сначала отвечаем менеджеру, уведомления и перерисовка карточки — в фоне
+    await callback.answer(f"Статус обновлён на '{status_label(new_status)}'")
+    status_events.publish(StatusChange(
+        question,
+        previous_status,
+        manager_id=callback.from_user.id,
+        message=(callback.message.chat.id, callback.message.message_id)
+    ))
+
+# -------------------------
+# Кнопка "Взять": менеджер назначает вопрос себе
+# -------------------------
+@router.callback_query(TakeCallback.filter())
+async def take_question_callback(callback: types.CallbackQuery, callback_data: TakeCallback):
+    remember_manager(callback.from_user)
+    question_id = callback_data.question_id
+    # новый вопрос при взятии переходит в работу, у остальных статус не меняется
+    question, previous_status, holder = await update_assignment(question_id, callback.from_user.id, take=True)
+    if question is None:
+        await answer_not_in_work(callback, question_id)
+        return
+    if holder is not None:
+        await callback.answer(f"Вопрос уже ведет {manager_label(holder)}", show_alert=True)
+        return
+
+    await callback.answer(f"Вопрос #{question_id} ваш")
+    logger.info(f"Менеджер {callback.from_user.id} взял вопрос #{question_id}.")
+    if question.status != previous_status:
+        # пользователь узнает о переходе в работу, карточку перерисует обработчик события
+        status_events.publish(StatusChange(
+            question,
+            previous_status,
+            manager_id=callback.from_user.id,
+            message=(callback.message.chat.id, callback.message.message_id)
+        ))
+        return
+    # статус не изменился — события не будет, карточку обновляем сами
+    text = render_question_card(question)
+    reply_markup = generate_status_buttons(question.id)
+    await send_queue.send(
+        callback.message.chat.id,
+        lambda: callback.message.edit_text(text, reply_markup=reply_markup)
+    )
 
 # -------------------------
 # Выбор вопроса на странице
 # -------------------------
-@dp.callback_query(PageQuestionCallback.filter())
+@router.callback_query(PageQuestionCallback.filter())
 async def select_question_callback(callback: types.CallbackQuery, callback_data: PageQuestionCallback):
-    questions = get_questions()
-    start = (callback_data.page - 1) * QUESTIONS_PER_PAGE
-    try:
-        q = questions[start + callback_data.index]
-    except IndexError:
+    q = await get_question(callback_data.question_id)
+    if not q:
         await callback.answer("Вопрос не найден", show_alert=True)
-        logger.warning(f"Менеджер {callback.from_user.id} выбрал несуществующий вопрос на странице {callback_data.page}.")
+        logger.warning(f"Менеджер {callback.from_user.id} выбрал несуществующий вопрос #{callback_data.question_id}.")
         return
 
-    await send_user_question_to_managers(
-        text=f"#{q.id} | {q.status} | @{q.username or 'пользователь'}:\n{q.text}",
-        media_list = q.media if q.media else [],
-        reply_markup=generate_status_buttons(q.id)
-    )
+    # уже опубликованный вопрос не отправляем заново — карточка отвечает на исходное сообщение;
+    # у архивного вопроса кнопок статуса нет
+    archived = isinstance(q, ArchivedQuestion)
+    # как в пагинации: отправка в рабочий чат может ждать в очереди, ответ на callback — нет
     await callback.answer()
+    await post_question_to_managers(
+        q,
+        text=render_question_card(q, footer="\n\n🗄 в архиве" if archived else ""),
+        reply_markup=None if archived else generate_status_buttons(q.id)
+    )
     logger.info(f"Менеджер {callback.from_user.id} выбрал вопрос #{q.id}.")
 
 # -------------------------
 # Команда /status — ручная смена статуса
 # -------------------------
-@dp.message(Command("status"))
+def parse_status(value: str):
+    """Статус из аргумента /status: числовой код или подпись (можно без эмодзи)."""
+    value = value.strip()
+    if value.isdigit():
+        return Status(int(value)) if int(value) in STATUS_LABELS else None
+    for label, status in STATUS_BY_LABEL.items():
+        if value.lower() in (label.lower(), label.rsplit(" ", 1)[0].lower()):
+            return status
+    return None
+
+@router.message(Command("status"))
 async def change_status(message: types.Message, command: CommandObject):
-    if message.chat.id != WORK_CHAT_ID:
+    if message.chat.id != config.WORK_CHAT_ID:
         return
 
     try:
         parts = message.text.split(maxsplit=2)
         q_id = int(parts[1])
-        new_status = parts[2]
+        new_status = parse_status(parts[2])
     except (IndexError, ValueError):
         await message.answer("Использование: /status <номер> <статус>")
         return
 
     if new_status not in STATUSES:
-        await message.answer(f"Допустимые статусы: {', '.join(STATUSES)}")
+        allowed = ", ".join(f"{int(status)} — {STATUS_LABELS[status]}" for status in STATUSES)
+        await message.answer(f"Допустимые статусы: {allowed}")
         return
 
-    with SessionLocal() as session:
-        question = session.query(Question).filter_by(id=q_id).first()
-        if not question:
+    question, previous_status, holder = await update_assignment(q_id, message.from_user.id, new_status)
+    if question is None:
+        if await get_question(q_id):
+            await message.answer("Вопрос в архиве, статус не меняется.")
+        else:
             await message.answer("Вопрос с таким номером не найден.")
-            return
-        question.status = new_status
-        session.commit()
+        return
+    if holder is not None:
+        await message.answer(f"Вопрос #{q_id} ведет {manager_label(holder)}, статус может менять только он (или /release {q_id} force).")
+        return
 
-    await notify_user_status_change(question)
+    # уведомления и новая карточка в рабочем чате — в фоне
+    status_events.publish(StatusChange(
+        question,
+        previous_status,
+        manager_id=message.from_user.id,
+        send_card=True
+    ))
 
-    await send_user_question_to_managers(
-        text=f"#{question.id} | {question.status} | @{question.username or 'пользователь'}:\n{question.text}",
-        media_list=[],
-        reply_markup=generate_status_buttons(question.id)
+# -------------------------
+# Команда /release — снять исполнителя: свой вопрос — просто, чужой (менеджер в отпуске) — с force
+# -------------------------
+@router.message(Command("release"))
+async def release_command(message: types.Message, command: CommandObject):
+    if message.chat.id != config.WORK_CHAT_ID:
+        return
+    args = command.args.split() if command.args else []
+    if not args or not args[0].isdigit() or args[1:] not in ([], ["force"]):
+        await message.answer("Использование: /release <номер> [force]")
+        return
+    q_id, force = int(args[0]), args[1:] == ["force"]
+    current = await get_question(q_id)
+    if current is None or isinstance(current, ArchivedQuestion):
+        await message.answer("Вопрос с таким номером не найден или уже в архиве.")
+        return
+    previous_assignee = current.assignee
+    if previous_assignee is None:
+        await message.answer(f"Вопрос #{q_id} и так ничей.")
+        return
+
+    question, _, holder = await update_assignment(q_id, None, force=force, caller=message.from_user.id)
+    if question is None:
+        await message.answer("Вопрос с таким номером не найден или уже в архиве.")
+        return
+    if holder is not None:
+        await message.answer(
+            f"Вопрос #{q_id} ведет {manager_label(holder)}. Снять чужой вопрос: /release {q_id} force"
+        )
+        return
+    await message.answer(f"Вопрос #{q_id} снова ничей, его можно взять.")
+    logger.info(
+        f"Менеджер {message.from_user.id} снял исполнителя {previous_assignee} с вопроса #{q_id}"
+        f"{' (force)' if force else ''}."
     )
 
-    logger.info(f"Менеджер {message.from_user.id} изменил статус вопроса #{q_id} на '{new_status}'.")
+# -------------------------
+# Команда /stats — сводка по вопросам
+# -------------------------
+@router.message(Command("stats"))
+async def stats_command(message: types.Message):
+    if message.chat.id != config.WORK_CHAT_ID:
+        return
+    # только счетчики stat_counters — время ответа не зависит от размера базы
+    async with SessionLocal() as session:
+        dashboard = await get_dashboard(session)
+    await message.answer(format_dashboard(dashboard))
+    logger.info(f"Менеджер {message.from_user.id} запросил статистику.")
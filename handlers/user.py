@@ -1,28 +1,62 @@
-import asyncio
-from aiogram import types
+from aiogram import Router, types
 from aiogram.filters import Command
-from loader import dp, bot
-from database import SessionLocal
-from models import Question
-from config import WORK_CHAT_ID
-from keyboards import user_main_keyboard, manager_main_keyboard, generate_status_buttons
+from loader import state_store, question_writer, duplicate_index
+import config
+from keyboards import (
+    user_main_keyboard,
+    manager_main_keyboard,
+    generate_status_buttons,
+    elide,
+    text_length,
+    MESSAGE_LIMIT
+)
 from logger import logger  # наш логгер
 from datetime import datetime
-from collections import defaultdict
-from helpers import send_user_question_to_managers
+from helpers import post_question_to_managers, register_media, media_refs, auto_assign, find_duplicate
+from aggregator import MediaGroupAggregator
+from dedup import Fingerprint
+from assignment import manager_label
+
+# кулдауны и части альбомов хранятся в state_store (см. loader.py)
+MEDIA_GROUP_TTL = 60  # сколько хранить части альбома, если их никто не забрал
+
+# подключается к диспетчеру в loader.create_app()
+router = Router(name="user")
+
+
+def extract_message_part(message: types.Message) -> dict:
+    """
+    Достает из сообщения текст и файлы в JSON-совместимом виде,
+    чтобы части альбома можно было хранить вне процесса.
+    """
+    files = []
+    if message.photo:
+        files.append(("photo", message.photo[-1]))
+    if message.video:
+        files.append(("video", message.video))
+    if message.document:
+        files.append(("document", message.document))
+    if message.audio:
+        files.append(("audio", message.audio))
+    media = [
+        {
+            "type": media_type,
+            "file_id": file.file_id,
+            # file_unique_id одинаков у одного и того же файла от любого пользователя
+            "file_unique_id": file.file_unique_id,
+            "file_size": file.file_size
+        }
+        for media_type, file in files
+    ]
+    return {"text": message.text or message.caption, "media": media}
 
-# словарь для хранения последнего времени отправки вопроса пользователем
-user_last_message = {}
-MIN_INTERVAL = 60  # секунды
-media_groups = defaultdict(list)
-MEDIA_GROUP_TIMEOUT = 1.0
 
 # =========================
 # Команда /start
 # =========================
-@dp.message(Command("start"))
+@router.message(Command("start"))
 async def start_handler(message: types.Message):
-    if message.chat.id == WORK_CHAT_ID:
+    if message.chat.id == config.WORK_CHAT_ID:
         # Меню для менеджера
         await message.answer(
             "Меню менеджера:",
@@ -41,7 +75,7 @@ async def start_handler(message: types.Message):
 # =========================
 # Кнопка "Задать вопрос"
 # =========================
-@dp.message(lambda m: m.chat.type == "private" and m.text == "Задать вопрос")
+@router.message(lambda m: m.chat.type == "private" and m.text == "Задать вопрос")
 async def ask_question_button(message: types.Message):
     await message.answer("Напишите ваш вопрос одним сообщением.")
     logger.info(f"Пользователь {message.from_user.id} нажал кнопку 'Задать вопрос'.")
@@ -50,68 +84,88 @@ async def ask_question_button(message: types.Message):
 # =========================
 # Получение обычного текстового сообщения от пользователя
 # =========================
-@dp.message(lambda m: m.chat.type == "private" and not (m.text and m.text.startswith("/")))
+@router.message(lambda m: m.chat.type == "private" and not (m.text and m.text.startswith("/")))
 async def receive_question(message: types.Message):
+    # части альбома собирает агрегатор и передает в process_question одним вызовом
+    if message.media_group_id:
+        await media_group_aggregator.add(
+            f"album:{message.from_user.id}:{message.media_group_id}",
+            extract_message_part(message),
+            meta=message
+        )
+        return
+
+    await process_question(message, [extract_message_part(message)])
+
+
+async def process_question(message: types.Message, parts: list[dict]):
+    """
+    Сохраняет вопрос из одного сообщения или собранного альбома и пересылает менеджерам.
+    message — первое сообщение вопроса, на него отвечаем пользователю.
+    """
     user_id = message.from_user.id
-    user_id = message.from_user.id 
     now = datetime.now()
 
-    # собираем все сообщения группы, если есть media_group
-    if message.media_group_id:
-        key = (user_id, message.media_group_id)
-        media_groups[key].append(message)
-        await asyncio.sleep(MEDIA_GROUP_TIMEOUT)  # ждем остальные сообщения группы
-        messages = media_groups.pop(key)
-    else:
-        messages = [message]
-
     # собираем текст и медиа
     text = None
     media_list = []
-    for msg in messages:
-        if msg.text or msg.caption:
-            text = msg.text or msg.caption
-        if msg.photo:
-            media_list.append({"type": "photo", "file_id": msg.photo[-1].file_id})
-        if msg.video:
-            media_list.append({"type": "video", "file_id": msg.video.file_id})
-        if msg.document:
-            media_list.append({"type": "document", "file_id": msg.document.file_id})
-        if msg.audio:
-            media_list.append({"type": "audio", "file_id": msg.audio.file_id})
+    for part in parts:
+        if part["text"]:
+            text = part["text"]
+        media_list.extend(part["media"])
 
     # если текст отсутствует — просим пользователя написать вопрос
     if not text:
-        await messages[0].answer("Пожалуйста, отправьте вопрос вместе с файлом.")
+        await message.answer("Пожалуйста, отправьте вопрос вместе с файлом.")
         return
 
-    last_time = user_last_message.get(user_id) 
-    if last_time and (now - last_time).total_seconds() < MIN_INTERVAL: 
-        await message.answer(f"⏳ Пожалуйста, подождите {MIN_INTERVAL} секунд перед следующим вопросом.") 
-        return 
-    
-    user_last_message[user_id] = now
+    # атомарно ставим кулдаун: не получилось — предыдущий вопрос был меньше MIN_INTERVAL назад
+    min_interval = config.MIN_INTERVAL
+    if not await state_store.set_if_absent(f"cooldown:{user_id}", now.timestamp(), ttl=min_interval):
+        await message.answer(f"⏳ Пожалуйста, подождите {min_interval} секунд перед следующим вопросом.")
+        return
+
+    # ищем такой же или почти такой же активный вопрос за последние сутки: повтор своего
+    # вопроса привязываем к нему, похожий вопрос другого пользователя только помечаем для менеджеров
+    fingerprint = Fingerprint(text)
+    original_id, own = await find_duplicate(fingerprint, user_id)
 
     # сохраняем вопрос в базу
     try:
-        with SessionLocal() as session:
-            q = Question(
-                user_id=user_id,
-                username=message.from_user.username,
-                text=text,
-                media=media_list or None
+        # файлы — в общий реестр, в вопросе только ссылки на них
+        await register_media(media_list)
+        # запись идет пачкой с другими вопросами, id известен сразу после коммита пачки
+        q = await question_writer.add(
+            user_id=user_id,
+            username=message.from_user.username,
+            text=text,
+            media=media_refs(media_list) or None,
+            duplicate_of=original_id if own else None
+        )
+
+        if own:
+            # повтор не пересылаем менеджерам — он привязан к исходному вопросу
+            await message.answer(
+                f"Такой вопрос уже задан (#{original_id}). Ваш вопрос #{q.id} привязан к нему — "
+                f"мы сообщим, когда статус изменится."
             )
-            session.add(q)
-            session.commit()
-            session.refresh(q)
+            logger.info(f"Вопрос #{q.id} пользователя {user_id} — повтор #{original_id}.")
+            return
 
-        await messages[0].answer(f"Ваш вопрос принят! Номер: {q.id}")
+        duplicate_index.add(q.id, fingerprint, user_id=user_id)
+        await message.answer(f"Ваш вопрос принят! Номер: {q.id}")
         logger.info(f"Пользователь {user_id} создал вопрос #{q.id}.")
 
-        # пересылаем в чат менеджеров через универсальную функцию
-        await send_user_question_to_managers(
-            text=f"Новый вопрос #{q.id} от @{q.username or 'пользователь'}:\n{text}",
-            media_list=media_list,
+        # при AUTO_ASSIGN вопрос сразу получает исполнителя — он виден в карточке
+        await auto_assign(q)
+
+        # пересылаем в чат менеджеров; файлы, которые там уже есть, не дублируются
+        assignee = f" → 👤 {manager_label(q.assignee)}" if q.assignee else ""
+        similar = f" (возможно, повтор #{original_id})" if original_id else ""
+        header = f"Новый вопрос #{q.id} от @{q.username or 'пользователь'}{similar}{assignee}:\n"
+        await post_question_to_managers(
+            q,
+            text=header + elide(text, MESSAGE_LIMIT - text_length(header)),
             reply_markup=generate_status_buttons(q.id)
         )
 
@@ -119,3 +173,17 @@ async def receive_question(message: types.Message):
     except Exception as e:
         logger.error(f"Ошибка при создании вопроса от пользователя {user_id}: {e}")
 
+
+media_group_aggregator = MediaGroupAggregator(
+    state_store,
+    on_flush=process_question,
+    max_quiet=config.MEDIA_GROUP_TIMEOUT,
+    ttl=MEDIA_GROUP_TTL
+)
+
+
+@config.subscribe
+def apply_config(changes: dict):
+    # альбом ждет частей не дольше MEDIA_GROUP_TIMEOUT — новое значение действует со следующего альбома
+    if "MEDIA_GROUP_TIMEOUT" in changes:
+        media_group_aggregator.max_quiet = config.MEDIA_GROUP_TIMEOUT
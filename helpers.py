@@ -1,33 +1,43 @@
-from aiogram.types import InputMediaPhoto, InputMediaVideo
-from loader import dp, bot
-from config import WORK_CHAT_ID
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMediaPhoto, InputMediaVideo, ReplyParameters
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, update, union_all, exists, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from loader import bot, send_queue, duplicate_index, status_events, workload
+import config
 from database import SessionLocal
-from models import Question, STATUSES
+from models import Question, ArchivedQuestion, MediaFile, Status, ACTIVE_STATUSES, status_label
+from keyboards import render_question_card, generate_status_buttons
 from logger import logger
+from dedup import Fingerprint
+from events import StatusChange
 
 async def send_user_question_to_managers(
     text: str,
     media_list: list,
-    reply_markup=None
+    reply_markup=None,
+    reply_to: int = None
 ):
     """
     Универсальный метод для пересылки вопроса пользователя в чат менеджеров
     с поддержкой media_group и кнопок.
+    Все сообщения вопроса ставятся в очередь одной пачкой, поэтому
+    приходят по порядку и с учетом лимитов Telegram.
+    reply_to — message_id в рабочем чате, на который отвечает текст (если сообщение
+    удалено, текст уходит без ответа).
+    Возвращает (сообщение с текстом, {file_unique_id: message_id отправленного файла}).
     """
-    from aiogram.types import InputMediaPhoto, InputMediaVideo
-    from loader import bot
-    from config import WORK_CHAT_ID
-
-    if not media_list:
-        await bot.send_message(WORK_CHAT_ID, text, reply_markup=reply_markup)
-        return
+    chat_id = config.WORK_CHAT_ID
+    calls = []
+    sent_media = []  # элементы media_list для каждого вызова — чтобы сопоставить их с message_id
 
     # 1 Сначала разделяем медиа
     photos_videos = [m for m in media_list if m["type"] in ("photo", "video")]
     other_media = [m for m in media_list if m["type"] not in ("photo", "video")]
 
-    # 2 Отправляем фото/видео группой без caption
-    if photos_videos:
+    # 2 Фото/видео группой без caption (в группе должно быть от 2 элементов)
+    if len(photos_videos) > 1:
         input_media = []
         for m in photos_videos:
             if m["type"] == "photo":
@@ -35,30 +45,459 @@ async def send_user_question_to_managers(
             elif m["type"] == "video":
                 input_media.append(InputMediaVideo(media=m["file_id"]))
 
-        await bot.send_media_group(WORK_CHAT_ID, input_media)
+        calls.append(lambda: bot.send_media_group(chat_id, input_media))
+        sent_media.append(photos_videos)
+    elif photos_videos:
+        single = photos_videos[0]
+        send = bot.send_photo if single["type"] == "photo" else bot.send_video
+        calls.append(lambda: send(chat_id, single["file_id"]))
+        sent_media.append(photos_videos)
 
     # 3 Остальные файлы
     for m in other_media:
         if m["type"] == "document":
-            await bot.send_document(WORK_CHAT_ID, m["file_id"])
+            calls.append(lambda file_id=m["file_id"]: bot.send_document(chat_id, file_id))
         elif m["type"] == "audio":
-            await bot.send_audio(WORK_CHAT_ID, m["file_id"])
-    
+            calls.append(lambda file_id=m["file_id"]: bot.send_audio(chat_id, file_id))
+        else:
+            continue
+        sent_media.append([m])
+
     # 4 Текст с кнопками
-    await bot.send_message(WORK_CHAT_ID, text, reply_markup=reply_markup)
+    reply_parameters = ReplyParameters(message_id=reply_to, allow_sending_without_reply=True) if reply_to else None
+    calls.append(lambda: bot.send_message(
+        chat_id, text, reply_markup=reply_markup, reply_parameters=reply_parameters
+    ))
+
+    results = await send_queue.send(chat_id, *calls)
+
+    media_message_ids = {}
+    for items, result in zip(sent_media, results):
+        messages = result if isinstance(result, list) else [result]
+        for m, message in zip(items, messages):
+            if m.get("file_unique_id"):
+                media_message_ids[m["file_unique_id"]] = message.message_id
+    return results[-1], media_message_ids
+
+
+# =========================
+# Реестр файлов (media_files)
+# =========================
+async def register_media(media_list: list):
+    """Записывает файлы вопроса в реестр: новые добавляются, у известных обновляется file_id."""
+    rows = [
+        {"file_unique_id": m["file_unique_id"], "file_id": m["file_id"], "type": m["type"], "file_size": m.get("file_size")}
+        for m in media_list if m.get("file_unique_id")
+    ]
+    if not rows:
+        return
+    statement = sqlite_insert(MediaFile)
+    statement = statement.on_conflict_do_update(
+        index_elements=[MediaFile.file_unique_id],
+        set_={"file_id": statement.excluded.file_id}
+    )
+    async with SessionLocal() as session:
+        await session.execute(statement, rows)
+        await session.commit()
+
+
+def media_refs(media_list: list) -> list:
+    """То, что хранится в Question.media: тип и file_unique_id, без file_id и размера."""
+    return [
+        {"type": m["type"], "file_unique_id": m["file_unique_id"]} if m.get("file_unique_id") else m
+        for m in media_list
+    ]
+
+
+async def resolve_media(media_list: list) -> tuple[list, dict]:
+    """
+    По ссылкам из Question.media возвращает (файлы с file_id, {file_unique_id: work_message_id})
+    одним запросом к реестру. Старые записи без file_unique_id возвращаются как есть.
+    """
+    unique_ids = [m["file_unique_id"] for m in media_list if m.get("file_unique_id")]
+    if not unique_ids:
+        return list(media_list), {}
+    async with SessionLocal() as session:
+        rows = {
+            row.file_unique_id: row
+            for row in (await session.execute(
+                select(MediaFile.file_unique_id, MediaFile.file_id, MediaFile.work_message_id)
+                .where(MediaFile.file_unique_id.in_(unique_ids))
+            ))
+        }
+    resolved = []
+    for m in media_list:
+        row = rows.get(m.get("file_unique_id"))
+        if row is not None:
+            resolved.append({**m, "file_id": row.file_id})
+        elif m.get("file_id"):
+            resolved.append(m)
+    posted = {uid: row.work_message_id for uid, row in rows.items() if row.work_message_id}
+    return resolved, posted
+
+
+async def post_question_to_managers(question: Question, text: str, reply_markup=None):
+    """
+    Показывает вопрос в рабочем чате, не дублируя файлы, которые там уже есть.
+    Если карточка вопроса уже публиковалась — отвечаем на нее одним текстом.
+    Иначе отправляем только новые файлы, а текст — ответом на сообщение с уже
+    опубликованным файлом (тот же файл мог прийти от другого пользователя).
+    Запоминает message_id карточки и отправленных файлов.
+    """
+    if question.work_message_id:
+        message, _ = await send_user_question_to_managers(text, [], reply_markup, reply_to=question.work_message_id)
+        return message
+
+    media_list, posted = await resolve_media(question.media or [])
+    new_media = [m for m in media_list if m.get("file_unique_id") not in posted]
+    reply_to = next((posted[m["file_unique_id"]] for m in media_list if m.get("file_unique_id") in posted), None)
+    message, media_message_ids = await send_user_question_to_managers(text, new_media, reply_markup, reply_to=reply_to)
+
+    async with SessionLocal() as session:
+        await session.execute(
+            update(Question).where(Question.id == question.id).values(work_message_id=message.message_id)
+        )
+        for file_unique_id, message_id in media_message_ids.items():
+            await session.execute(
+                update(MediaFile).where(MediaFile.file_unique_id == file_unique_id).values(work_message_id=message_id)
+            )
+        await session.commit()
+    question.work_message_id = message.message_id
+    return message
+
+async def get_question(question_id: int):
+    """Вопрос по номеру; если его уже нет в работе — из архива (ArchivedQuestion)."""
+    async with SessionLocal() as session:
+        question = await session.get(Question, question_id)
+        if question is None:
+            question = await session.get(ArchivedQuestion, question_id)
+        return question
+
+
+# =========================
+# Назначение вопросов менеджерам (см. assignment.py)
+# =========================
+async def update_assignment(
+    question_id: int,
+    manager_id,
+    new_status=None,
+    take: bool = False,
+    force: bool = False,
+    caller: int = None
+):
+    """
+    Ставит вопросу исполнителя manager_id (None — снять) и, если задан, новый статус;
+    take — новый вопрос переходит в работу.
+    Запись — сравнение-с-обменом: UPDATE проходит, только если status и assignee
+    не изменились с момента чтения, поэтому из одновременных нажатий выигрывает одно.
+    Без force чужой вопрос (assignee — не caller, по умолчанию caller = manager_id) не меняется.
+
+    Возвращает (вопрос, прежний статус, кто ведет вопрос, если он занят);
+    вопрос None — его нет в работе (удален или в архиве).
+    """
+    async with SessionLocal() as session:
+        # неудача UPDATE значит, что вопрос изменил кто-то другой, — перечитываем и решаем заново
+        while True:
+            question = await session.get(Question, question_id, populate_existing=True)
+            if question is None:
+                return None, None, None
+            previous_status, previous_assignee = question.status, question.assignee
+            if not force and previous_assignee not in (None, manager_id if caller is None else caller):
+                return question, previous_status, previous_assignee
+            status = previous_status if new_status is None else new_status
+            if take and previous_status == Status.NEW:
+                status = Status.IN_PROGRESS
+            result = await session.execute(
+                update(Question)
+                .where(
+                    Question.id == question_id,
+                    Question.status == previous_status,
+                    Question.assignee.is_(None) if previous_assignee is None else Question.assignee == previous_assignee
+                )
+                .values(status=status, assignee=manager_id)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                await session.commit()
+                break
+            await session.rollback()
+
+    question.status, question.assignee = status, manager_id
+    # нагрузка менеджера — его активные вопросы
+    if previous_assignee is not None and previous_status in ACTIVE_STATUSES:
+        workload.adjust(previous_assignee, -1)
+    if manager_id is not None and status in ACTIVE_STATUSES:
+        workload.adjust(manager_id, 1)
+    return question, previous_status, None
+
+
+async def sync_workload():
+    """Сверяет нагрузку менеджеров с базой: другие воркеры тоже назначают и закрывают вопросы."""
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(Question.assignee, func.count())
+            .where(Question.assignee.is_not(None), Question.status.in_(ACTIVE_STATUSES))
+            .group_by(Question.assignee)
+        )
+        workload.sync(dict(rows.all()))
+
+
+async def auto_assign(question: Question):
+    """При AUTO_ASSIGN назначает новый вопрос наименее загруженному менеджеру из MANAGERS."""
+    if not config.AUTO_ASSIGN or not len(workload):
+        return
+    if workload.stale():
+        await sync_workload()
+    manager_id = workload.pick()
+    assigned, _, holder = await update_assignment(question.id, manager_id)
+    if assigned is not None and holder is None:
+        question.assignee = manager_id
+        logger.info(f"Вопрос #{question.id} назначен менеджеру {manager_id}.")
+
+
+# колонки, которые нужны для текста списка вопросов
+QUESTION_LIST_COLUMNS = (Question.id, Question.status, Question.username, Question.created_at, Question.text)
+
+
+def _keyset_select(status_filter, id_condition, descending: bool, limit: int):
+    """
+    SELECT по индексу (status, id). Для нескольких статусов делаем UNION ALL
+    отдельных диапазонов — каждый читает из индекса не больше limit строк.
+    """
+    order = Question.id.desc() if descending else Question.id.asc()
+    # повторы в списке не показываем — они привязаны к оригиналу
+    not_duplicate = Question.duplicate_of.is_(None)
+    if not status_filter:
+        return select(*QUESTION_LIST_COLUMNS).where(id_condition, not_duplicate).order_by(order).limit(limit)
+    parts = [
+        select(*QUESTION_LIST_COLUMNS)
+        .where(Question.status == status, id_condition, not_duplicate)
+        .order_by(order)
+        .limit(limit)
+        .subquery()
+        for status in status_filter
+    ]
+    merged = union_all(*(select(part) for part in parts)).subquery()
+    merged_order = merged.c.id.desc() if descending else merged.c.id.asc()
+    return select(merged).order_by(merged_order).limit(limit)
 
-def get_questions(status_filter: list[str] = None):
-    with SessionLocal() as session:
-        q = session.query(Question)
+
+async def get_questions_page(
+    status_filter: list[int] = None,
+    after_id: int = None,
+    before_id: int = None,
+    limit: int = 8
+):
+    """
+    Keyset-пагинация: возвращает (rows, has_prev, has_next).
+    after_id — страница вперед (id > after_id), before_id — назад (id < before_id).
+    rows содержат только колонки из QUESTION_LIST_COLUMNS, отсортированы по id.
+    """
+    backward = before_id is not None
+    if backward:
+        id_condition = Question.id < before_id
+    else:
+        id_condition = Question.id > (after_id or 0)
+
+    async with SessionLocal() as session:
+        # берем на одну строку больше — так узнаем, есть ли следующая страница
+        rows = (await session.execute(_keyset_select(status_filter, id_condition, backward, limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        if not rows:
+            return [], False, False
+
+        # с другой стороны страницы достаточно EXISTS по индексу, без COUNT
+        other_side = Question.id > rows[-1].id if backward else Question.id < rows[0].id
+        condition = [other_side, Question.duplicate_of.is_(None)]
         if status_filter:
-            q = q.filter(Question.status.in_(status_filter))
-        return q.order_by(Question.id.asc()).all()
-    
-async def notify_user_status_change(question: Question):
-    try:
-        await bot.send_message(
-            question.user_id,
-            f"Ваш вопрос #{question.id} обновлён. Новый статус: {question.status}"
+            condition.append(Question.status.in_(status_filter))
+        has_other = await session.scalar(select(exists().where(*condition)))
+
+    if backward:
+        return rows, has_more, has_other
+    return rows, has_other, has_more
+
+
+def build_search_query(query: str) -> str:
+    """
+    Превращает ввод менеджера в безопасный запрос FTS5: каждое слово в кавычках,
+    слова через AND. Последнее слово ищется по префиксу ("прин"* найдет "принтер"):
+    префиксный поиск дороже, поэтому только там, где слово могло быть недописано.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return ""
+    return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+# ранжируем не больше стольких самых свежих совпадений: bm25 считается по каждой
+# строке-кандидату, и без ограничения частое слово стоило бы O(всех совпадений)
+SEARCH_CANDIDATES = 2000
+
+# совпадения ищутся в работе и в архиве (у каждой таблицы свой FTS-индекс, см. archive.py)
+SEARCH_SQL = text("""
+    SELECT id, status, username, created_at, text FROM (
+        SELECT questions.id, questions.status, questions.username, questions.created_at, questions.text, hits.rank
+        FROM (
+            SELECT rowid AS id, rank
+            FROM questions_fts
+            WHERE questions_fts MATCH :query
+            ORDER BY rowid DESC
+            LIMIT :candidates
+        ) AS hits
+        JOIN questions ON questions.id = hits.id
+        UNION ALL
+        SELECT questions_archive.id, questions_archive.status, questions_archive.username,
+               questions_archive.created_at, questions_archive.text, hits.rank
+        FROM (
+            SELECT rowid AS id, rank
+            FROM questions_archive_fts
+            WHERE questions_archive_fts MATCH :query
+            ORDER BY rowid DESC
+            LIMIT :candidates
+        ) AS hits
+        JOIN questions_archive ON questions_archive.id = hits.id
+    )
+    ORDER BY rank, id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(*QUESTION_LIST_COLUMNS)
+
+
+async def search_questions(query: str, offset: int = 0, limit: int = 8):
+    """
+    Полнотекстовый поиск по тексту вопроса и username (FTS5, ранжирование bm25
+    среди SEARCH_CANDIDATES самых свежих совпадений в работе и стольких же в архиве).
+    Возвращает (rows, has_prev, has_next) в том же формате, что get_questions_page.
+    """
+    fts_query = build_search_query(query)
+    if not fts_query:
+        return [], False, False
+
+    async with SessionLocal() as session:
+        result = await session.execute(SEARCH_SQL, {"query": fts_query, "candidates": SEARCH_CANDIDATES, "limit": limit + 1, "offset": offset})
+        rows = result.all()
+
+    return rows[:limit], offset > 0, len(rows) > limit
+
+
+# =========================
+# Обработчики смены статуса (выполняются в фоне, см. events.py)
+# =========================
+@status_events.subscribe
+async def notify_user_status_change(event: StatusChange):
+    if event.reverted:
+        return
+    question = event.question
+    # авторы повторов этого вопроса тоже ждут ответа
+    async with SessionLocal() as session:
+        duplicates = (await session.execute(
+            select(Question.id, Question.user_id).where(Question.duplicate_of == question.id)
+        )).all()
+
+    recipients = {question.user_id: question.id}
+    for duplicate_id, user_id in duplicates:
+        recipients.setdefault(user_id, duplicate_id)
+
+    for user_id, question_id in recipients.items():
+        try:
+            await send_queue.send(
+                user_id,
+                lambda user_id=user_id, question_id=question_id: bot.send_message(
+                    user_id,
+                    f"Ваш вопрос #{question_id} обновлён. Новый статус: {status_label(question.status)}"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при уведомлении пользователя: {e}")
+
+
+@status_events.subscribe
+async def update_status_cards(event: StatusChange):
+    question = event.question
+    text = render_question_card(question)
+    reply_markup = generate_status_buttons(question.id)
+    for chat_id, message_id in event.messages:
+        try:
+            await send_queue.send(
+                chat_id,
+                lambda chat_id=chat_id, message_id=message_id: bot.edit_message_text(
+                    text,
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    reply_markup=reply_markup
+                )
+            )
+        except TelegramBadRequest as e:
+            # статус вернулся к прежнему и карточка та же — остальные карточки все равно обновляем
+            if "message is not modified" not in str(e):
+                raise
+    if event.send_card:
+        # новая карточка — ответом на исходную, чтобы рядом были файлы вопроса
+        await send_user_question_to_managers(
+            text=text, media_list=[], reply_markup=reply_markup, reply_to=question.work_message_id
+        )
+
+
+@status_events.subscribe
+async def log_status_change(event: StatusChange):
+    if event.reverted:
+        logger.info(
+            f"Статус вопроса #{event.question.id} вернулся к '{status_label(event.previous_status)}', "
+            f"пользователь не уведомляется."
+        )
+        return
+    logger.info(
+        f"Статус вопроса #{event.question.id} изменён с '{status_label(event.previous_status)}' "
+        f"на '{status_label(event.question.status)}' менеджером {event.manager_id}."
+    )
+
+
+@status_events.subscribe
+async def forget_closed_duplicate(event: StatusChange):
+    # в индексе повторов только активные вопросы: повтор решенного вопроса — новый вопрос
+    if event.question.status not in ACTIVE_STATUSES:
+        duplicate_index.discard(event.question.id)
+
+
+async def find_duplicate(fingerprint: Fingerprint, user_id: int) -> tuple:
+    """
+    Похожий активный вопрос за окно DEDUP_WINDOW: (id, задан ли он тем же пользователем)
+    или (None, False). Свои вопросы пользователя проверяются первыми.
+    Поиск идет в памяти (закрытые вопросы убирает forget_closed_duplicate), к базе —
+    один запрос и только при находке: вопрос мог закрыть другой воркер. Такие
+    убираются из индекса, и поиск повторяется.
+    """
+    while True:
+        own_id = duplicate_index.find(fingerprint, user_id=user_id)
+        other_id = None if own_id is not None else duplicate_index.find(fingerprint)
+        found = own_id if own_id is not None else other_id
+        if found is None:
+            return None, False
+        async with SessionLocal() as session:
+            status = await session.scalar(select(Question.status).where(Question.id == found))
+        if status in ACTIVE_STATUSES:
+            return found, own_id is not None
+        duplicate_index.discard(found)
+
+
+async def warm_up_duplicate_index():
+    """Загружает в duplicate_index активные вопросы за окно DEDUP_WINDOW (после перезапуска)."""
+    since = datetime.utcnow() - timedelta(seconds=duplicate_index.window)
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(Question.id, Question.user_id, Question.text, Question.created_at)
+            .where(
+                Question.created_at >= since,
+                Question.duplicate_of.is_(None),
+                Question.status.in_(ACTIVE_STATUSES)
+            )
+            .order_by(Question.id.asc())
         )
-    except Exception as e:
-        logger.error(f"Ошибка при уведомлении пользователя: {e}")
\ No newline at end of file
+        for question_id, user_id, text, created_at in rows:
+            timestamp = created_at.replace(tzinfo=timezone.utc).timestamp()
+            duplicate_index.add(question_id, Fingerprint(text), timestamp, user_id=user_id)
+    logger.info(f"Индекс повторов загружен: {len(duplicate_index)} вопросов.")
\ No newline at end of file
@@ -1,36 +1,69 @@
+from functools import lru_cache
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters.callback_data import CallbackData
-from models import STATUSES
+from models import STATUSES, STATUS_LABELS, status_label
+from assignment import manager_label
+
+KEYBOARD_CACHE_SIZE = 1024
+MESSAGE_LIMIT = 4096  # максимальная длина текста сообщения Telegram (в UTF-16 символах)
+MIN_BODY_LENGTH = 120  # меньше этого текст вопроса на странице не обрезаем — лучше уменьшим страницу
+ELLIPSIS = "…"
 
 # =========================
 # Callback для смены статуса вопроса
 # =========================
 class StatusCallback(CallbackData, prefix="status"):
+    question_id: int
+    new_status: int  # числовой код Status
+
+
+class LegacyStatusCallback(CallbackData, prefix="status"):
+    """Кнопки, отправленные до перехода на числовые коды: буква ("w") или подпись статуса."""
     question_id: int
     new_status: str
 
+
+class TakeCallback(CallbackData, prefix="take"):
+    """Менеджер берет вопрос себе (см. assignment.py)."""
+    question_id: int
+
+
+def _payload_format(callback_cls, *fields) -> str:
+    """
+    Заранее собирает шаблон callback_data в формате CallbackData.pack(),
+    чтобы на горячем пути не создавать pydantic-модель ради одной строки.
+    """
+    sep = callback_cls.__separator__
+    return sep.join([callback_cls.__prefix__, *("{" + field + "}" for field in fields)])
+
+
+_STATUS_PAYLOAD = _payload_format(StatusCallback, "question_id", "new_status")
+_TAKE_PAYLOAD = _payload_format(TakeCallback, "question_id")
+# ряды кнопок статусов по 3: (подпись, шаблон callback_data с уже подставленным кодом статуса)
+_STATUS_ROWS = [
+    [
+        (STATUS_LABELS[status], _STATUS_PAYLOAD.replace("{new_status}", str(int(status))))
+        for status in STATUSES[i:i + 3]
+    ]
+    for i in range(0, len(STATUSES), 3)
+]
+
 # =========================
 # Кнопки для изменения статуса вопроса (для менеджера)
 # =========================
 def generate_status_buttons(question_id: int) -> InlineKeyboardMarkup:
     """
-    Создает inline-клавиатуру с кнопками для изменения статуса вопроса.
-    Располагаем кнопки по 3 в ряд.
+    Создает inline-клавиатуру: "Взять" первой строкой, под ней кнопки
+    статусов по 3 в ряд. Раскладка и подписи собраны заранее, в callback_data
+    подставляется только номер вопроса. Не кешируется: у каждой карточки свой
+    номер, кеш по нему почти всегда промахивался бы.
     """
-    keyboard_rows = []
-    row = []
-    for i, status in enumerate(STATUSES, 1):
-        btn = InlineKeyboardButton(
-            text=status,
-            callback_data=StatusCallback(question_id=question_id, new_status=status).pack()
-        )
-        row.append(btn)
-        if i % 3 == 0:
-            keyboard_rows.append(row)
-            row = []
-    if row:
-        keyboard_rows.append(row)
-
+    keyboard_rows = [[InlineKeyboardButton(text="🙋 Взять", callback_data=_TAKE_PAYLOAD.format(question_id=question_id))]]
+    for status_row in _STATUS_ROWS:
+        keyboard_rows.append([
+            InlineKeyboardButton(text=label, callback_data=payload.format(question_id=question_id))
+            for label, payload in status_row
+        ])
     return InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
 
 
@@ -51,7 +84,7 @@ def manager_main_keyboard() -> ReplyKeyboardMarkup:
     Клавиатура для менеджера
     """
     return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="📋 Список вопросов")]],
+        keyboard=[[KeyboardButton(text="📋 Список вопросов"), KeyboardButton(text="🔍 Поиск")]],
         resize_keyboard=True
     )
 
@@ -72,43 +105,169 @@ class QuestionCallback(CallbackData, prefix="question"):
 class PaginationCallback(CallbackData, prefix="page"):
     page: int
     filter_status: str = "active"  # активные по умолчанию
+    after_id: int = 0   # курсор вперед: вопросы с id > after_id
+    before_id: int = 0  # курсор назад: вопросы с id < before_id
+    offset: int = 0     # для результатов поиска: сдвиг в ранжированном списке
+    before_offset: int = 0  # поиск назад: страница заканчивается перед этим сдвигом (как before_id)
 
 class PageQuestionCallback(CallbackData, prefix="pq"):
-    page: int        # текущая страница
-    index: int       # индекс вопроса на странице (0..N-1)
+    page: int         # текущая страница
+    question_id: int  # id вопроса — выбираем по первичному ключу, а не по позиции
     filter_status: str = "active"
 
 
+# =========================
+# Тексты вопросов с учетом лимита длины сообщения
+# =========================
+def text_length(text: str) -> int:
+    """Длина так, как ее считает Telegram: в UTF-16 символах (эмодзи — 2)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def elide(text: str, limit: int) -> str:
+    """Обрезает текст до limit UTF-16 символов, заменяя хвост на многоточие."""
+    # длина префикса из limit + 1 символов уже достаточна, чтобы понять, влезает ли текст
+    if text_length(text[:limit + 1]) <= limit:
+        return text
+    if limit <= 0:
+        return ""
+    cut = text[:limit - 1]
+    # символы вне BMP (эмодзи) занимают по 2 UTF-16 единицы — досрезаем с конца
+    excess = text_length(cut) - (limit - 1)
+    end = len(cut)
+    while excess > 0:
+        end -= 1
+        excess -= 2 if ord(cut[end]) > 0xFFFF else 1
+    return cut[:end].rstrip() + ELLIPSIS
+
+
+def render_question_card(q, footer: str = "") -> str:
+    """Текст одного вопроса для чата менеджеров, не длиннее MESSAGE_LIMIT (footer — приписка в конце)."""
+    assignee = f" | 👤 {manager_label(q.assignee)}" if q.assignee else ""
+    header = f"#{q.id} | {status_label(q.status)} | @{q.username or 'пользователь'}{assignee}:\n"
+    return header + elide(q.text, MESSAGE_LIMIT - text_length(header) - text_length(footer)) + footer
+
+
+def render_question_page(questions, limit: int = MESSAGE_LIMIT):
+    """
+    Собирает текст страницы за один проход через список частей и "".join.
+    Сначала выбирает, сколько вопросов поместится (у каждого не меньше
+    MIN_BODY_LENGTH символов текста), затем делит оставшийся бюджет между
+    текстами: короткие берут сколько нужно, остаток достается длинным.
+    Возвращает (text, shown) — shown может быть меньше len(questions).
+    """
+    headers = [
+        f"{i}. #{q.id} | {status_label(q.status)} | @{q.username or 'пользователь'} | {q.created_at.strftime('%d.%m.%Y %H:%M')}\n   "
+        for i, q in enumerate(questions, 1)
+    ]
+    bodies = [q.text for q in questions]
+    separator = "\n\n"
+
+    # адаптивный размер страницы: сколько вопросов влезает с минимальным текстом
+    shown = len(questions)
+    fixed = [text_length(h) + len(separator) for h in headers]
+    body_lengths = [text_length(b[:limit + 1]) for b in bodies]
+    while shown > 1 and sum(fixed[:shown]) + sum(min(b, MIN_BODY_LENGTH) for b in body_lengths[:shown]) > limit:
+        shown -= 1
+
+    # распределяем бюджет: от самых коротких текстов к самым длинным
+    budget = limit - sum(fixed[:shown])
+    allowed = [0] * shown
+    order = sorted(range(shown), key=lambda i: body_lengths[i])
+    for position, i in enumerate(order):
+        share = budget // (shown - position)
+        allowed[i] = min(body_lengths[i], share)
+        budget -= allowed[i]
+
+    parts = []
+    for i in range(shown):
+        parts.append(headers[i])
+        parts.append(elide(bodies[i], allowed[i]))
+        parts.append(separator)
+    return "".join(parts), shown
+
+
 # =========================
 # Формирование текста страницы вопросов + кнопки пагинации
 # =========================
-def generate_question_list_page(questions, page=1, per_page=8, filter_status="active"):
+def generate_question_list_page(
+    questions,
+    page=1,
+    filter_status="active",
+    has_prev=False,
+    has_next=False,
+    offset=None,
+    backward=False
+):
     """
-    Формирует текст и клавиатуру для страницы вопросов с пагинацией.
-    filter_status: active / new / in_progress / all
+    Формирует текст и клавиатуру для уже выбранной страницы вопросов.
+    questions — строки страницы (см. get_questions_page), отсортированные по id.
+    has_prev / has_next — есть ли соседние страницы, курсоры берутся из id.
+    offset — для ранжированных результатов поиска: сдвиг первой строки, навигация идет по сдвигу.
+    Если все вопросы не помещаются в одно сообщение, страница укорачивается:
+    при переходе вперед не показанные вопросы уходят на следующую страницу,
+    при переходе назад (backward) — на предыдущую, чтобы ни в одну сторону
+    вопросы не пропускались.
     """
-    # фильтруем по статусу
-    if filter_status == "active":
-        questions = [q for q in questions if q.status in ["новый 🆕", "в работе ⚙️"]]
-    start = (page - 1) * per_page
-    end = start + per_page
-    page_questions = questions[start:end]
+    text, shown = render_question_page(questions)
+    if shown < len(questions):
+        if backward:
+            # оставляем вопросы, ближайшие к странице, с которой пришли
+            fetched = len(questions)
+            while shown < len(questions):
+                questions = questions[len(questions) - shown:]
+                text, shown = render_question_page(questions)
+            if offset is not None:
+                offset += fetched - shown
+            has_prev = True
+        else:
+            questions = questions[:shown]
+            has_next = True
+
+    ids = tuple(q.id for q in questions)
+    if offset is None:
+        return text, question_list_keyboard(ids, page, filter_status, has_prev, has_next)
+    # назад — страница, которая заканчивается перед этой; вперед — сразу за показанными
+    return text, question_list_keyboard(
+        ids, page, filter_status, has_prev, has_next,
+        prev_offset=offset,
+        next_offset=offset + shown
+    )
 
-    # формируем текст с небольшим отступом для лучшей читаемости
-    text = ""
-    for i, q in enumerate(page_questions, 1):
-        date_str = q.created_at.strftime("%d.%m.%Y %H:%M")
-        text += f"{i}. #{q.id} | {q.status} | @{q.username or 'пользователь'} | {date_str}\n"
-        text += f"   {q.text}\n\n"
 
+_PAGE_QUESTION_PAYLOAD = _payload_format(PageQuestionCallback, "page", "question_id", "filter_status")
+_PAGINATION_PAYLOAD = _payload_format(
+    PaginationCallback, "page", "filter_status", "after_id", "before_id", "offset", "before_offset"
+)
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def question_list_keyboard(
+    ids: tuple,
+    page: int,
+    filter_status: str,
+    has_prev: bool,
+    has_next: bool,
+    prev_offset: int = None,
+    next_offset: int = None
+) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы списка: номера вопросов и навигация.
+    Навигация по курсорам id, а если заданы prev_offset/next_offset — по сдвигу
+    (prev_offset — граница, перед которой заканчивается предыдущая страница).
+    Кешируется по всем аргументам.
+    """
+    by_offset = next_offset is not None
     # кнопки выбора конкретного вопроса на странице (по 4 в ряд)
     keyboard = []
     row = []
-    for i in range(len(page_questions)):
+    for i, question_id in enumerate(ids):
         row.append(
             InlineKeyboardButton(
                 text=str(i + 1),
-                callback_data=PageQuestionCallback(page=page, index=i, filter_status=filter_status).pack()
+                callback_data=_PAGE_QUESTION_PAYLOAD.format(
+                    page=page, question_id=question_id, filter_status=filter_status
+                )
             )
         )
         if len(row) == 4:
@@ -119,24 +278,30 @@ def generate_question_list_page(questions, page=1, per_page=8, filter_status="ac
 
     # кнопки навигации между страницами
     nav_buttons = []
-    if start > 0:
+    if has_prev and ids:
         nav_buttons.append(
             InlineKeyboardButton(
                 text="◀ Назад",
-                callback_data=PaginationCallback(page=page-1, filter_status=filter_status).pack()
+                callback_data=_PAGINATION_PAYLOAD.format(
+                    page=page-1, filter_status=filter_status,
+                    after_id=0, before_id=0 if by_offset else ids[0], offset=0, before_offset=prev_offset or 0
+                )
             )
         )
-    if end < len(questions):
+    if has_next and ids:
         nav_buttons.append(
             InlineKeyboardButton(
                 text="Вперед ▶",
-                callback_data=PaginationCallback(page=page+1, filter_status=filter_status).pack()
+                callback_data=_PAGINATION_PAYLOAD.format(
+                    page=page+1, filter_status=filter_status,
+                    after_id=0 if by_offset else ids[-1], before_id=0, offset=next_offset or 0, before_offset=0
+                )
             )
         )
     if nav_buttons:
         keyboard.append(nav_buttons)
 
-    return text, InlineKeyboardMarkup(inline_keyboard=keyboard)
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 # =========================
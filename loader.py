@@ -1,5 +1,165 @@
-from aiogram import Bot, Dispatcher
-from config import BOT_TOKEN
+"""
+Общие компоненты бота: from loader import bot, send_queue, ...
 
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+Компоненты создаются при первом обращении (module __getattr__), а не при
+импорте loader.py: CLI, миграции и бенчмарки, которым бот не нужен, за них
+не платят. Хендлеры подключаются к диспетчеру в create_app().
+"""
+import logging
+import config
+
+_app_created = False
+
+
+def _build_bot():
+    from aiogram import Bot
+    from metrics import RequestMetricsMiddleware
+
+    bot = Bot(token=config.BOT_TOKEN)
+    # время запросов к Bot API (см. metrics.py)
+    bot.session.middleware(RequestMetricsMiddleware())
+    return bot
+
+
+def _build_dispatcher():
+    from aiogram import Dispatcher
+    from metrics import HandlerMetricsMiddleware
+
+    dp = Dispatcher()
+    # время хендлеров; inner-middleware диспетчера действуют и на хендлеры подключенных роутеров
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+    return dp
+
+
+def _build_send_queue():
+    from sender import SendQueue
+
+    # все исходящие сообщения идут через общую очередь с учетом лимитов Telegram
+    return SendQueue(
+        global_rate=config.SEND_GLOBAL_RATE,
+        private_rate=config.SEND_PRIVATE_RATE,
+        group_rate=config.SEND_GROUP_RATE
+    )
+
+
+def _build_state_store():
+    from state_store import create_state_store
+
+    # кулдауны и части альбомов: в памяти или в общем SQLite-файле для нескольких процессов
+    if config.STATE_BACKEND == "sqlite":
+        return create_state_store("sqlite", path=config.STATE_DB)
+    return create_state_store("memory", max_size=config.STATE_MAX_SIZE)
+
+
+def _build_question_writer():
+    from database import SessionLocal
+    from writer import QuestionWriter
+
+    # новые вопросы пишутся в базу пачками (write-behind)
+    return QuestionWriter(SessionLocal, batch_size=config.WRITER_BATCH_SIZE, batch_delay=config.WRITER_BATCH_DELAY)
+
+
+def _build_duplicate_index():
+    from dedup import DuplicateIndex
+
+    # недавние вопросы для поиска повторов (заполняется при старте, см. warm_up_duplicate_index)
+    return DuplicateIndex()
+
+
+def _build_status_events():
+    from events import StatusEventBus
+
+    # побочные эффекты смены статуса (уведомления, карточки) выполняются в фоне
+    return StatusEventBus(delay=config.STATUS_COALESCE_DELAY)
+
+
+def _build_workload():
+    from assignment import WorkloadRouter
+
+    # нагрузка менеджеров для автоматического назначения (сверяется с базой, см. helpers.sync_workload)
+    return WorkloadRouter(config.MANAGERS)
+
+
+_BUILDERS = {
+    "bot": _build_bot,
+    "dp": _build_dispatcher,
+    "send_queue": _build_send_queue,
+    "state_store": _build_state_store,
+    "question_writer": _build_question_writer,
+    "duplicate_index": _build_duplicate_index,
+    "status_events": _build_status_events,
+    "workload": _build_workload,
+}
+
+
+def __getattr__(name: str):
+    builder = _BUILDERS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # дальше имя берется из globals() напрямую, __getattr__ больше не вызывается
+    component = globals()[name] = builder()
+    return component
+
+
+def get(name: str):
+    """Компонент по имени — для кода внутри модуля, где __getattr__ не срабатывает."""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+def collect_component_metrics() -> dict:
+    """Текущие значения очередей и счетчиков компонентов для эндпоинта метрик."""
+    queue = get("send_queue").stats()
+    question_writer, status_events = get("question_writer"), get("status_events")
+    return {
+        "bot_send_queue_depth": queue["queue_depth"],
+        "bot_send_queue_active_chats": queue["active_chats"],
+        "bot_messages_sent_total": queue["sent"],
+        "bot_messages_retried_total": queue["retries"],
+        "bot_messages_failed_total": queue["failed"],
+        "bot_questions_written_total": question_writer.written,
+        "bot_status_events_total": status_events.published,
+        "bot_status_events_coalesced_total": status_events.coalesced,
+        "bot_status_events_failed_total": status_events.failed,
+        "bot_duplicate_index_size": len(get("duplicate_index")),
+    }
+
+
+def apply_config(changes: dict):
+    """
+    Переносит новые значения config.json в уже созданные компоненты (см. config.reload).
+    Остальные настройки код читает как config.X при каждом использовании.
+    """
+    built = globals()
+    if changes.keys() & {"SEND_GLOBAL_RATE", "SEND_PRIVATE_RATE", "SEND_GROUP_RATE"} and "send_queue" in built:
+        built["send_queue"].set_rates(config.SEND_GLOBAL_RATE, config.SEND_PRIVATE_RATE, config.SEND_GROUP_RATE)
+    if "question_writer" in built:
+        built["question_writer"].batch_size = config.WRITER_BATCH_SIZE
+        built["question_writer"].batch_delay = config.WRITER_BATCH_DELAY
+    if "status_events" in built:
+        built["status_events"].delay = config.STATUS_COALESCE_DELAY
+    if "MANAGERS" in changes and "workload" in built:
+        built["workload"].set_managers(config.MANAGERS)
+    if "LOG_LEVEL" in changes:
+        logging.getLogger().setLevel(config.LOG_LEVEL)
+
+
+def create_app():
+    """
+    Фабрика приложения: подключает роутеры хендлеров к диспетчеру и метрики
+    компонентов. Повторный вызов возвращает тот же диспетчер.
+    """
+    global _app_created
+    dispatcher = get("dp")
+    if _app_created:
+        return dispatcher
+
+    from handlers import user, manager
+    from metrics import metrics
+
+    # порядок важен: общий хендлер личных сообщений в user — последний в своем роутере
+    dispatcher.include_routers(user.router, manager.router)
+    metrics.add_collector(collect_component_metrics)
+    config.subscribe(apply_config)
+    _app_created = True
+    return dispatcher
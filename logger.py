@@ -1,16 +1,98 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 from pathlib import Path
+import config
+
+# рядом с кодом, а не в текущей папке: бенчмарки и утилиты запускаются откуда угодно
+LOG_DIR = Path(__file__).resolve().parent / "logs"
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON (удобно для grep/jq и сборщиков логов)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Стандартный QueueHandler сразу форматирует запись и вклеивает traceback в текст.
+    Здесь подставляем только аргументы сообщения, а traceback сохраняем
+    отдельно в exc_text — оформляет запись уже форматтер в потоке слушателя.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def log_file(worker_id: int = None) -> Path:
+    """
+    Файл лога воркера: logs/bot.log у нулевого (единственного без супервизора),
+    logs/bot-<номер>.log у остальных. Один файл на процесс — иначе воркеры
+    ротируют его одновременно и теряют и перемешивают записи друг друга.
+    """
+    worker_id = config.WORKER_ID if worker_id is None else worker_id
+    return LOG_DIR / ("bot.log" if worker_id == 0 else f"bot-{worker_id}.log")
+
+
+def _file_handler() -> logging.Handler:
+    LOG_DIR.mkdir(exist_ok=True)
+    path = log_file()
+    if config.LOG_ROTATION == "time":
+        # новый файл каждую полночь, хранится LOG_BACKUP_COUNT последних
+        return TimedRotatingFileHandler(path, when="midnight", backupCount=config.LOG_BACKUP_COUNT, encoding="utf-8")
+    return RotatingFileHandler(path, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding="utf-8")
+
+
+def setup_logging() -> QueueListener:
+    """
+    Хендлеры пишут в очередь (QueueHandler — только put_nowait), а в файл
+    и консоль записи выводит отдельный поток QueueListener. Так запись на диск
+    и ротация не блокируют event loop.
+
+    Вызывает только процесс бота (bot.py): утилиты, которые импортируют
+    database и другие модули бота, файловые логи не настраивают.
+    """
+    formatter = JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [_file_handler()]
+    # в консоль — только при запуске из терминала; bot_cli перенаправляет stdout в отдельный файл
+    if sys.stderr.isatty():
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_QueueHandler(log_queue)]
+    root.setLevel(config.LOG_LEVEL)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # при выходе дописываем все, что осталось в очереди
+    atexit.register(listener.stop)
+    return listener
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_DIR / "bot.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,227 @@
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from sqlalchemy import event
+
+# границы корзин гистограмм задержки, сек (как у клиентов Prometheus по умолчанию)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами: observe — бинарный поиск и два сложения."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Счетчики и гистограммы в памяти процесса.
+    Ключ — имя метрики и кортеж меток: ("bot_handler_seconds", (("handler", "start_handler"),)).
+    Коллекторы — функции, которые при выгрузке возвращают текущие значения (глубина очередей и т.п.).
+    """
+
+    def __init__(self):
+        self.histograms: dict[tuple, Histogram] = {}
+        self.counters: dict[tuple, float] = {}
+        self._collectors: list[Callable[[], dict]] = []
+        self.started_at = time.time()
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(labels.items()))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_collector(self, collector: Callable[[], dict]):
+        """collector() -> {имя метрики: значение}, вызывается при каждой выгрузке."""
+        self._collectors.append(collector)
+
+    def gauges(self) -> dict:
+        values = {"bot_uptime_seconds": time.time() - self.started_at}
+        for collector in self._collectors:
+            values.update(collector())
+        return values
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for name, value in sorted(self.gauges().items()):
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Сводка для CLI: по каждой гистограмме число, среднее, p50 и p99,
+        а также сумма и счетчики корзин — чтобы CLI мог сложить гистограммы всех воркеров.
+        """
+        histograms = {}
+        for (name, labels), histogram in self.histograms.items():
+            histograms[f"{name}{_labels(labels)}"] = {
+                "count": histogram.count,
+                "avg": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50": histogram.quantile(0.5),
+                "p99": histogram.quantile(0.99),
+                "sum": histogram.sum,
+                "counts": histogram.counts,
+            }
+        return {
+            "buckets": LATENCY_BUCKETS,
+            "histograms": histograms,
+            "counters": {f"{name}{_labels(labels)}": value for (name, labels), value in self.counters.items()},
+            "gauges": self.gauges(),
+        }
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = Metrics()
+
+
+# =========================
+# Хендлеры aiogram
+# =========================
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner-middleware: время работы каждого хендлера и число ошибок.
+    Регистрируется на наблюдателях (dp.message, dp.callback_query), поэтому
+    в data уже есть выбранный хендлер.
+    """
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.registry.inc("bot_handler_errors_total", handler=name)
+            raise
+        finally:
+            self.registry.observe("bot_handler_seconds", time.perf_counter() - started, handler=name)
+
+
+# =========================
+# Запросы к Telegram Bot API
+# =========================
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время каждого метода Bot API и ошибки по типу."""
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+
+    async def __call__(self, make_request, bot, method):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            self.registry.inc("bot_api_errors_total", method=name, error=type(e).__name__)
+            raise
+        finally:
+            self.registry.observe("bot_api_seconds", time.perf_counter() - started, method=name)
+
+
+# =========================
+# Запросы к базе
+# =========================
+def instrument_engine(async_engine, registry: Metrics = metrics):
+    """Время SQL-запросов по событиям SQLAlchemy (по первому слову запроса: SELECT, INSERT...)."""
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        registry.observe("bot_db_seconds", time.perf_counter() - started, operation=operation)
+
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def _error(context):
+        registry.inc("bot_db_errors_total")
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+# =========================
+# HTTP-эндпоинт
+# =========================
+def create_metrics_app(registry: Metrics = metrics) -> "web.Application":
+    """
+    aiohttp-приложение с GET /metrics (текст Prometheus) и /metrics?format=json (сводка для CLI).
+    """
+    # aiohttp.web нужен только для эндпоинта — не импортируем его при METRICS_PORT = 0
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.query.get("format") == "json":
+            return web.json_response(registry.snapshot())
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    return app
+
+
+async def start_metrics_server(host: str, port: int, registry: Metrics = metrics) -> "web.AppRunner":
+    """Запускает эндпоинт метрик отдельно от webhook (слушает только локальный адрес)."""
+    from aiohttp import web
+
+    runner = web.AppRunner(create_metrics_app(registry), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
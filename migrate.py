@@ -0,0 +1,68 @@
+"""
+Миграция существующей базы вопросов на текущую схему.
+
+Делает резервную копию файла, затем выполняет те же шаги, что и бот при
+старте (database.init_db): добавляет недостающие колонки и индексы,
+переводит статусы из строк с эмодзи в числовые коды. Бот на время
+миграции лучше остановить.
+
+Запуск:
+    python migrate.py                     # questions.db рядом со скриптом
+    python migrate.py --db /path/questions.db --no-backup
+"""
+import argparse
+import asyncio
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from database import build_engine, init_db
+from models import status_label
+
+
+def backup(path: Path) -> Path:
+    """Копия через sqlite3 backup API — корректна и при включенном WAL."""
+    target = path.with_name(f"{path.stem}.{datetime.now():%Y%m%d-%H%M%S}.bak{path.suffix}")
+    with sqlite3.connect(path) as source, sqlite3.connect(target) as copy:
+        source.backup(copy)
+    return target
+
+
+def status_counts(path: Path) -> list:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT status, COUNT(*) FROM questions GROUP BY status ORDER BY status").fetchall()
+
+
+async def migrate(path: Path):
+    engine = build_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        await init_db(engine)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path("questions.db"))
+    parser.add_argument("--no-backup", action="store_true", help="не делать резервную копию")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"Файл {args.db} не найден — бот создаст базу сам при первом запуске.")
+        return
+
+    if not args.no_backup:
+        print(f"Резервная копия: {backup(args.db)}")
+    print("До миграции:")
+    for status, count in status_counts(args.db):
+        print(f"  {status!s:15} {count}")
+
+    asyncio.run(migrate(args.db))
+
+    print("После миграции:")
+    for status, count in status_counts(args.db):
+        print(f"  {status} ({status_label(status)}): {count}")
+
+
+if __name__ == "__main__":
+    main()
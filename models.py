@@ -1,10 +1,39 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, PrimaryKeyConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
+from enum import IntEnum
 
 Base = declarative_base()
 
-STATUSES = ["в работе ⚙️", "выполнено ✅", "отклонено ❌"]
+class Status(IntEnum):
+    """Статус вопроса. В базе и в callback_data хранится число, эмодзи-подпись — только для показа."""
+    NEW = 0
+    IN_PROGRESS = 1
+    DONE = 2
+    REJECTED = 3
+
+
+STATUS_LABELS = {
+    Status.NEW: "новый 🆕",
+    Status.IN_PROGRESS: "в работе ⚙️",
+    Status.DONE: "выполнено ✅",
+    Status.REJECTED: "отклонено ❌",
+}
+STATUS_BY_LABEL = {label: status for status, label in STATUS_LABELS.items()}
+# статусы, которые менеджер может выставить кнопками и командой /status
+STATUSES = [Status.IN_PROGRESS, Status.DONE, Status.REJECTED]
+# статусы, которые менеджер видит в списке по умолчанию
+ACTIVE_STATUSES = [Status.NEW, Status.IN_PROGRESS]
+# закрытые статусы: переход в них из активного — решение вопроса (см. stats.py)
+CLOSED_STATUSES = [Status.DONE, Status.REJECTED]
+# буквенные коды из callback_data старых кнопок, которые еще висят в рабочем чате
+LEGACY_STATUS_CODES = {"n": Status.NEW, "w": Status.IN_PROGRESS, "d": Status.DONE, "r": Status.REJECTED}
+
+
+def status_label(status) -> str:
+    """Подпись статуса для сообщений; неизвестный код показываем как есть."""
+    return STATUS_LABELS.get(status, str(status))
+
 
 class Question(Base):
     __tablename__ = "questions"
@@ -12,6 +41,79 @@ class Question(Base):
     user_id = Column(Integer, nullable=False)
     username = Column(String, nullable=True)
     text = Column(String, nullable=False)
-    media = Column(JSON, nullable=True)  # новое поле для фото/видео/документов
-    status = Column(String, default="новый 🆕")
+    # вложения: [{"type", "file_unique_id"}], сами файлы — в media_files (старые записи хранят file_id)
+    media = Column(JSON, nullable=True)
+    status = Column(Integer, nullable=False, default=Status.NEW, server_default=str(int(Status.NEW)))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # повтор ранее заданного вопроса: в чат менеджеров не пересылается, статус берется у оригинала
+    duplicate_of = Column(Integer, nullable=True, index=True)
+    # сообщение-карточка в рабочем чате: при повторном открытии отвечаем на него, а не шлем файлы заново
+    work_message_id = Column(Integer, nullable=True)
+    # менеджер (Telegram id), который ведет вопрос; ставится сравнением-с-обменом (см. assignment.py)
+    assignee = Column(Integer, nullable=True, index=True)
+
+    __table_args__ = (
+        # keyset-пагинация по статусу: WHERE status = ? AND id > ? ORDER BY id
+        Index("ix_questions_status_id", "status", "id"),
+    )
+
+
+class ArchivedQuestion(Base):
+    """
+    Закрытые вопросы, перенесенные из questions задачей архивации (см. archive.py).
+    Колонки те же, id сохраняется — вопрос находится по номеру и поиском.
+    """
+    __tablename__ = "questions_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    username = Column(String, nullable=True)
+    text = Column(String, nullable=False)
+    media = Column(JSON, nullable=True)
+    status = Column(Integer, nullable=False)
+    created_at = Column(DateTime)
+    duplicate_of = Column(Integer, nullable=True, index=True)
+    work_message_id = Column(Integer, nullable=True)
+    assignee = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class MediaFile(Base):
+    """
+    Реестр файлов по file_unique_id: одинаковый файл от разных пользователей хранится один раз.
+    file_id — последний полученный (по нему бот отправляет файл),
+    work_message_id — сообщение рабочего чата, где этот файл уже опубликован.
+    """
+    __tablename__ = "media_files"
+    file_unique_id = Column(String, primary_key=True)
+    file_id = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=True)
+    work_message_id = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StatusHistory(Base):
+    """
+    Смены статуса вопросов, пишутся триггерами (см. stats.py). Строка с old_status = NULL —
+    создание вопроса. Повторы (duplicate_of) сюда не попадают — у них нет своего статуса.
+    changed_at = NULL — время неизвестно (история восстановлена для старых вопросов).
+    """
+    __tablename__ = "status_history"
+    id = Column(Integer, primary_key=True)
+    question_id = Column(Integer, nullable=False, index=True)
+    old_status = Column(Integer, nullable=True)
+    new_status = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, nullable=True)
+
+
+class StatCounter(Base):
+    """
+    Счетчики для дашборда: (name, key) -> value, например ("status", "1") или ("created", "2024-05-01").
+    Обновляются триггерами на questions, пересчитываются по status_history (см. stats.py).
+    """
+    __tablename__ = "stat_counters"
+    name = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    value = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (PrimaryKeyConstraint("name", "key"),)
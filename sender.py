@@ -0,0 +1,209 @@
+import asyncio
+import time
+from collections import deque
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError
+from logger import logger
+
+# Лимиты Telegram Bot API
+GLOBAL_RATE = 30          # сообщений в секунду на всего бота
+PRIVATE_RATE = 1.0        # сообщений в секунду в личный чат
+GROUP_RATE = 20 / 60      # 20 сообщений в минуту в группу
+GROUP_BURST = 20
+MAX_RETRIES = 5
+WORKER_IDLE_TIMEOUT = 60  # секунды простоя, после которых воркер чата завершается
+
+
+class RateLimiter:
+    """
+    Не больше limit запросов за любые period секунд (скользящее окно).
+    Помнит время последних limit запросов: следующий ждет, пока самый старый
+    не выйдет из окна. В отличие от token bucket, в одно окно не попадают
+    «полная емкость + пополнение за окно», поэтому лимит не превышается
+    даже на стыке секунд. Ожидающие получают разрешение по очереди (FIFO).
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        self.set_rate(rate, burst)
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    def set_rate(self, rate: float, burst: int = None):
+        """rate запросов в секунду: burst штук за burst / rate сек (по умолчанию — окно в секунду)."""
+        self.limit = burst or max(1, round(rate))
+        self.period = self.limit / rate
+
+    @property
+    def rate(self) -> float:
+        return self.limit / self.period
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self._sent[0] + self.period - now)
+
+
+class SendQueue:
+    """
+    Центральная очередь исходящих сообщений.
+
+    У каждого чата своя очередь и свой воркер, поэтому сообщения одного вопроса
+    уходят строго по порядку, а медленный чат не задерживает остальные.
+    Перед каждым запросом ждем окно лимита чата и общего лимита бота.
+    TelegramRetryAfter ждет retry_after и повторяет тот же запрос.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        private_rate: float = PRIVATE_RATE,
+        group_rate: float = GROUP_RATE,
+        group_burst: int = GROUP_BURST,
+        max_retries: int = MAX_RETRIES
+    ):
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self._global = RateLimiter(global_rate)
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._buckets: dict[int, RateLimiter] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._latencies = deque(maxlen=1000)
+        self._pending = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    def set_rates(self, global_rate: float, private_rate: float, group_rate: float):
+        """Новые лимиты на лету: ожидающие запросы сверяются с окном заново."""
+        self._global.set_rate(global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        for chat_id, bucket in self._buckets.items():
+            if chat_id < 0:
+                bucket.set_rate(group_rate, self.group_burst)
+            else:
+                bucket.set_rate(private_rate, 1)
+
+    def _bucket_for(self, chat_id: int) -> RateLimiter:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # отрицательный chat_id — группа или канал: GROUP_BURST сообщений за минуту
+            if chat_id < 0:
+                bucket = RateLimiter(self.group_rate, self.group_burst)
+            else:
+                bucket = RateLimiter(self.private_rate, 1)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def submit(self, chat_id: int, *calls) -> asyncio.Future:
+        """
+        Ставит в очередь чата пачку запросов и сразу возвращает future.
+        calls — функции без аргументов, возвращающие корутину
+        (например, lambda: bot.send_message(...)); выполняются по порядку.
+        Результат future — список ответов Telegram.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        queue.put_nowait((calls, future, time.monotonic()))
+        self._pending += 1
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id, queue))
+        return future
+
+    async def send(self, chat_id: int, *calls) -> list:
+        """То же, что submit, но дожидается отправки всех сообщений пачки."""
+        return await self.submit(chat_id, *calls)
+
+    async def _worker(self, chat_id: int, queue: asyncio.Queue):
+        bucket = self._bucket_for(chat_id)
+        while True:
+            try:
+                calls, future, queued_at = await asyncio.wait_for(queue.get(), WORKER_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    # чат давно молчит — освобождаем его ресурсы
+                    del self._queues[chat_id]
+                    del self._workers[chat_id]
+                    self._buckets.pop(chat_id, None)
+                    return
+                continue
+
+            results = []
+            try:
+                for call in calls:
+                    results.append(await self._execute(chat_id, bucket, call))
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(results)
+            finally:
+                self._pending -= 1
+                self._latencies.append(time.monotonic() - queued_at)
+                queue.task_done()
+
+    async def _execute(self, chat_id: int, bucket: RateLimiter, call):
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self._global.acquire()
+            try:
+                result = await call()
+                self.sent += 1
+                return result
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"Flood control в чате {chat_id}: ждем {e.retry_after} сек.")
+                await asyncio.sleep(e.retry_after)
+            except TelegramNetworkError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"Сетевая ошибка при отправке в чат {chat_id}: {e}, повтор #{attempt}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+    def stats(self) -> dict:
+        """Глубина очереди и задержка от постановки в очередь до отправки (сек)."""
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            "queue_depth": self._pending,
+            "active_chats": len(self._workers),
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "latency_p50": percentile(0.5),
+            "latency_p99": percentile(0.99),
+        }
+
+    async def close(self):
+        """Дожидается отправки всего, что уже стоит в очереди, и останавливает воркеры."""
+        for queue in list(self._queues.values()):
+            await queue.join()
+        for task in list(self._workers.values()):
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        self._buckets.clear()
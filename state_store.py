@@ -0,0 +1,230 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import aiosqlite
+
+
+class StateStore(ABC):
+    """
+    Хранилище короткоживущего состояния бота (кулдауны, части альбомов).
+    Все значения — JSON-совместимые, у каждого ключа есть TTL в секундах.
+    """
+
+    @abstractmethod
+    async def get(self, key: str):
+        """Значение ключа или None, если его нет или истек TTL."""
+
+    @abstractmethod
+    async def set(self, key: str, value, ttl: float):
+        """Записывает значение с TTL."""
+
+    @abstractmethod
+    async def set_if_absent(self, key: str, value, ttl: float) -> bool:
+        """Атомарно записывает значение, только если ключа нет. True — если записали."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Удаляет ключ."""
+
+    @abstractmethod
+    async def append(self, key: str, item, ttl: float) -> int:
+        """Добавляет элемент в список ключа, продлевает TTL. Возвращает длину списка."""
+
+    @abstractmethod
+    async def pop_list(self, key: str) -> list:
+        """Атомарно забирает и удаляет весь список ключа (пустой список, если нечего забирать)."""
+
+    async def close(self):
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """
+    Хранилище в памяти процесса с TTL и ограничением по числу ключей.
+    Ключи лежат в OrderedDict в порядке последней записи: при переполнении
+    вытесняются самые старые, истекшие удаляются при обращении и при записи.
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def _alive(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _write(self, key: str, value, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        # сначала выбрасываем истекшие из начала, затем — лишние по размеру
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now and len(self._data) <= self.max_size:
+                break
+            del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+    async def get(self, key: str):
+        entry = self._alive(key)
+        return entry[1] if entry else None
+
+    async def set(self, key: str, value, ttl: float):
+        self._write(key, value, ttl)
+
+    async def set_if_absent(self, key: str, value, ttl: float) -> bool:
+        if self._alive(key):
+            return False
+        self._write(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def append(self, key: str, item, ttl: float) -> int:
+        entry = self._alive(key)
+        items = entry[1] if entry else []
+        items.append(item)
+        self._write(key, items, ttl)
+        return len(items)
+
+    async def pop_list(self, key: str) -> list:
+        entry = self._alive(key)
+        self._data.pop(key, None)
+        return entry[1] if entry else []
+
+
+class SqliteStateStore(StateStore):
+    """
+    Хранилище в отдельном файле SQLite (WAL), общее для нескольких процессов бота.
+    Операции атомарны: одиночные запросы в autocommit, append — в BEGIN IMMEDIATE.
+    Соединение одно на процесс, поэтому записи сериализует asyncio.Lock,
+    чтобы чужой запрос не попал внутрь транзакции append.
+    """
+
+    CLEANUP_EVERY = 1000  # раз в столько записей удаляем истекшие строки
+
+    def __init__(self, path: str = "state.db"):
+        self.path = path
+        self._conn: aiosqlite.Connection = None
+        self._writes = 0
+        self._lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._conn is not None:
+            return self._conn
+        async with self._lock:
+            if self._conn is not None:
+                return self._conn
+            conn = await aiosqlite.connect(self.path, isolation_level=None)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS lists (id INTEGER PRIMARY KEY, key TEXT, value TEXT, expires_at REAL)"
+            )
+            await conn.execute("CREATE INDEX IF NOT EXISTS ix_lists_key ON lists (key)")
+            self._conn = conn
+        return self._conn
+
+    async def _after_write(self, conn: aiosqlite.Connection):
+        self._writes += 1
+        if self._writes % self.CLEANUP_EVERY == 0:
+            now = time.time()
+            await conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+            await conn.execute("DELETE FROM lists WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str):
+        conn = await self._connection()
+        async with conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+        ) as cursor:
+            row = await cursor.fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def set(self, key: str, value, ttl: float):
+        conn = await self._connection()
+        async with self._lock:
+            await conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            await self._after_write(conn)
+
+    async def set_if_absent(self, key: str, value, ttl: float) -> bool:
+        conn = await self._connection()
+        now = time.time()
+        # вставка или перезапись только истекшего значения — одним запросом
+        async with self._lock:
+            cursor = await conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE kv.expires_at <= ?",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            written = cursor.rowcount > 0
+            await cursor.close()
+            await self._after_write(conn)
+        return written
+
+    async def delete(self, key: str):
+        conn = await self._connection()
+        async with self._lock:
+            await conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def append(self, key: str, item, ttl: float) -> int:
+        conn = await self._connection()
+        expires_at = time.time() + ttl
+        async with self._lock:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                await conn.execute(
+                    "INSERT INTO lists (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(item), expires_at)
+                )
+                await conn.execute("UPDATE lists SET expires_at = ? WHERE key = ?", (expires_at, key))
+                async with conn.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)) as cursor:
+                    (count,) = await cursor.fetchone()
+                await conn.execute("COMMIT")
+            except Exception:
+                await conn.execute("ROLLBACK")
+                raise
+            await self._after_write(conn)
+        return count
+
+    async def pop_list(self, key: str) -> list:
+        conn = await self._connection()
+        async with self._lock:
+            async with conn.execute(
+                "DELETE FROM lists WHERE key = ? AND expires_at > ? RETURNING id, value", (key, time.time())
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [json.loads(value) for _, value in sorted(rows)]
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+def create_state_store(backend: str = "memory", **kwargs) -> StateStore:
+    if backend == "memory":
+        return MemoryStateStore(**kwargs)
+    if backend == "sqlite":
+        return SqliteStateStore(**kwargs)
+    raise ValueError(f"Неизвестный STATE_BACKEND: {backend}")
@@ -0,0 +1,273 @@
+"""
+Сводка для менеджеров: вопросы по статусам и по дням, размер бэклога,
+время решения.
+
+Счетчики (stat_counters) и история смен статуса (status_history)
+обновляются триггерами SQLite на questions — в той же транзакции, что и
+запись вопроса или смена статуса, без лишних запросов из бота. Поэтому
+/stats читает несколько десятков строк счетчиков, а не всю таблицу
+questions. По истории счетчики можно пересчитать с нуля.
+
+Время решения — от создания вопроса до последнего перехода из активного
+статуса в закрытый; хранится гистограммой по RESOLUTION_BUCKETS, медиана
+оценивается по верхней границе корзины. Повторы (duplicate_of) не считаются.
+
+Запуск:
+    python stats.py              # отчет
+    python stats.py --rebuild    # пересчитать счетчики по истории
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from models import (
+    StatCounter,
+    Status,
+    ACTIVE_STATUSES,
+    CLOSED_STATUSES,
+    status_label
+)
+
+# границы корзин времени решения, сек: 5 мин ... 30 дней, последняя — больше 30 дней
+RESOLUTION_BUCKETS = (
+    300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 8 * 3600,
+    86400, 2 * 86400, 3 * 86400, 7 * 86400, 14 * 86400, 30 * 86400
+)
+REPORT_DAYS = 7  # сколько последних дней показывать по дням
+
+
+_ACTIVE = ", ".join(str(int(status)) for status in ACTIVE_STATUSES)
+_CLOSED = ", ".join(str(int(status)) for status in CLOSED_STATUSES)
+
+
+def _bucket_sql(seconds: str) -> str:
+    """SQL-выражение: корзина RESOLUTION_BUCKETS для числа секунд (NULL — время неизвестно)."""
+    cases = " ".join(f"WHEN {seconds} <= {bound} THEN '{bound}'" for bound in RESOLUTION_BUCKETS)
+    return f"CASE WHEN {seconds} IS NULL THEN NULL {cases} ELSE 'inf' END"
+
+
+def _bump(name: str, key: str, delta: str, where: str = None) -> str:
+    """INSERT-UPSERT счетчика для тела триггера."""
+    if where is None:
+        return (
+            f"INSERT INTO stat_counters (name, key, value) VALUES ('{name}', {key}, {delta}) "
+            f"ON CONFLICT (name, key) DO UPDATE SET value = value + excluded.value;"
+        )
+    # у INSERT ... SELECT перед ON CONFLICT обязателен WHERE (неоднозначность разбора в SQLite)
+    return (
+        f"INSERT INTO stat_counters (name, key, value) SELECT '{name}', {key}, {delta} WHERE {where} "
+        f"ON CONFLICT (name, key) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"  # формат DateTime SQLAlchemy, UTC как datetime.utcnow
+# последний переход вопроса new.id из активного статуса в закрытый
+_LAST_RESOLUTION = f"""
+    SELECT {_bucket_sql("(julianday(h.changed_at) - julianday(new.created_at)) * 86400")}
+    FROM status_history h
+    WHERE h.question_id = new.id AND (h.old_status IS NULL OR h.old_status IN ({_ACTIVE}))
+      AND h.new_status IN ({_CLOSED})
+    ORDER BY h.id DESC LIMIT 1
+"""
+
+# триггеры создаются вместе с FTS в database._migrate
+STATS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_stats_ai AFTER INSERT ON questions
+    WHEN new.duplicate_of IS NULL BEGIN
+        INSERT INTO status_history (question_id, old_status, new_status, changed_at)
+        VALUES (new.id, NULL, new.status, new.created_at);
+        {_bump("status", "CAST(new.status AS TEXT)", "1")}
+        {_bump("created", "date(new.created_at)", "1", "new.created_at IS NOT NULL")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS questions_stats_au AFTER UPDATE OF status ON questions
+    WHEN old.status != new.status AND new.duplicate_of IS NULL BEGIN
+        {_bump("status", "CAST(old.status AS TEXT)", "-1")}
+        {_bump("status", "CAST(new.status AS TEXT)", "1")}
+        -- вопрос снова открыт: прежнее решение убираем из гистограммы (до записи новой строки истории)
+        UPDATE stat_counters SET value = value - 1
+        WHERE name = 'resolution' AND old.status IN ({_CLOSED}) AND new.status NOT IN ({_CLOSED})
+          AND key = ({_LAST_RESOLUTION});
+        {_bump(
+            "resolution",
+            _bucket_sql("(julianday('now') - julianday(new.created_at)) * 86400"),
+            "1",
+            f"old.status NOT IN ({_CLOSED}) AND new.status IN ({_CLOSED}) AND new.created_at IS NOT NULL"
+        )}
+        INSERT INTO status_history (question_id, old_status, new_status, changed_at)
+        VALUES (new.id, old.status, new.status, {_NOW});
+    END
+    """,
+]
+
+
+# =========================
+# Чтение
+# =========================
+async def get_dashboard(session, days: int = REPORT_DAYS, today=None) -> dict:
+    """Сводка по счетчикам: число строк не зависит от числа вопросов."""
+    today = today or datetime.utcnow().date()
+    since = (today - timedelta(days=days - 1)).isoformat()
+    rows = (await session.execute(
+        select(StatCounter.name, StatCounter.key, StatCounter.value)
+        .where((StatCounter.name != "created") | (StatCounter.key >= since))
+    )).all()
+
+    statuses = {status: 0 for status in Status}
+    created = {(today - timedelta(days=i)).isoformat(): 0 for i in reversed(range(days))}
+    resolution = {}
+    for name, key, value in rows:
+        if name == "status":
+            statuses[Status(int(key))] = value
+        elif name == "created":
+            created[key] = value
+        elif name == "resolution":
+            resolution[key] = value
+    return {
+        "statuses": statuses,
+        "backlog": sum(statuses[status] for status in ACTIVE_STATUSES),
+        "total": sum(statuses.values()),
+        "created": created,
+        "resolved": sum(resolution.values()),
+        "median_resolution": _resolution_quantile(resolution, 0.5),
+        "p90_resolution": _resolution_quantile(resolution, 0.9),
+    }
+
+
+def _resolution_quantile(resolution: dict, q: float):
+    """Оценка квантиля по верхней границе корзины; None — решенных вопросов нет."""
+    total = sum(resolution.values())
+    if not total:
+        return None
+    seen = 0
+    for bound in RESOLUTION_BUCKETS:
+        seen += resolution.get(str(bound), 0)
+        if seen >= q * total:
+            return bound
+    return float("inf")
+
+
+def format_duration(seconds: float) -> str:
+    if seconds == float("inf"):
+        return f"больше {RESOLUTION_BUCKETS[-1] // 86400} дн."
+    if seconds < 3600:
+        return f"до {seconds // 60:.0f} мин"
+    if seconds < 86400:
+        return f"до {seconds // 3600:.0f} ч"
+    return f"до {seconds // 86400:.0f} дн."
+
+
+def format_dashboard(dashboard: dict) -> str:
+    lines = [f"📊 Вопросов всего: {dashboard['total']}, в работе и новых: {dashboard['backlog']}", ""]
+    for status, count in dashboard["statuses"].items():
+        lines.append(f"{status_label(status)}: {count}")
+    lines.append("")
+    lines.append("Новые вопросы по дням:")
+    for day, count in dashboard["created"].items():
+        lines.append(f"  {day}: {count}")
+    lines.append("")
+    if dashboard["median_resolution"] is None:
+        lines.append("Решенных вопросов пока нет.")
+    else:
+        lines.append(f"Решено: {dashboard['resolved']}")
+        lines.append(f"Медиана времени решения: {format_duration(dashboard['median_resolution'])}")
+        lines.append(f"90% решены: {format_duration(dashboard['p90_resolution'])}")
+    return "\n".join(lines)
+
+
+# =========================
+# Пересчет по истории
+# =========================
+# история для вопросов, у которых ее нет (база до появления status_history):
+# создание — по created_at, текущий статус — с неизвестным временем
+BACKFILL_SQL = f"""
+INSERT INTO status_history (question_id, old_status, new_status, changed_at)
+SELECT id, old_status, new_status, changed_at FROM (
+    SELECT id, NULL AS old_status, {int(Status.NEW)} AS new_status, created_at AS changed_at, 0 AS step
+    FROM questions q
+    WHERE duplicate_of IS NULL AND NOT EXISTS (SELECT 1 FROM status_history h WHERE h.question_id = q.id)
+    UNION ALL
+    SELECT id, {int(Status.NEW)}, status, NULL, 1
+    FROM questions q
+    WHERE duplicate_of IS NULL AND status != {int(Status.NEW)}
+      AND NOT EXISTS (SELECT 1 FROM status_history h WHERE h.question_id = q.id)
+)
+ORDER BY id, step
+"""
+
+# текущий статус вопроса — последняя строка его истории
+CURRENT_STATUS_SQL = """
+SELECT h.question_id, h.new_status FROM status_history h
+WHERE h.id = (SELECT MAX(id) FROM status_history WHERE question_id = h.question_id)
+"""
+
+REBUILD_SQL = [
+    "DELETE FROM stat_counters",
+    f"""
+    INSERT INTO stat_counters (name, key, value)
+    SELECT 'status', CAST(new_status AS TEXT), COUNT(*) FROM ({CURRENT_STATUS_SQL}) GROUP BY new_status
+    """,
+    """
+    INSERT INTO stat_counters (name, key, value)
+    SELECT 'created', date(changed_at), COUNT(*) FROM status_history
+    WHERE old_status IS NULL AND changed_at IS NOT NULL GROUP BY date(changed_at)
+    """,
+    # для закрытых сейчас вопросов — последний переход из активного статуса в закрытый
+    f"""
+    INSERT INTO stat_counters (name, key, value)
+    SELECT 'resolution', bucket, COUNT(*) FROM (
+        SELECT {_bucket_sql("(julianday(h.changed_at) - julianday(c.changed_at)) * 86400")} AS bucket
+        FROM ({CURRENT_STATUS_SQL}) cur
+        JOIN status_history h ON h.id = (
+            SELECT MAX(id) FROM status_history
+            WHERE question_id = cur.question_id
+              AND (old_status IS NULL OR old_status IN ({_ACTIVE})) AND new_status IN ({_CLOSED})
+        )
+        JOIN status_history c ON c.question_id = cur.question_id AND c.old_status IS NULL
+        WHERE cur.new_status IN ({_CLOSED})
+    )
+    WHERE bucket IS NOT NULL GROUP BY bucket
+    """,
+]
+
+
+def rebuild_counters(sync_conn) -> int:
+    """
+    Пересчитывает stat_counters по status_history (в транзакции вызывающего).
+    Возвращает число вопросов в истории.
+    """
+    sync_conn.execute(text(BACKFILL_SQL))
+    for statement in REBUILD_SQL:
+        sync_conn.execute(text(statement))
+    return sync_conn.execute(text("SELECT COUNT(DISTINCT question_id) FROM status_history")).scalar()
+
+
+# =========================
+# CLI
+# =========================
+async def _report(rebuild: bool):
+    from database import SessionLocal, engine, init_db
+
+    try:
+        await init_db()
+        if rebuild:
+            async with engine.begin() as conn:
+                questions = await conn.run_sync(rebuild_counters)
+            print(f"Счетчики пересчитаны по истории ({questions} вопросов).\n")
+        async with SessionLocal() as session:
+            print(format_dashboard(await get_dashboard(session)))
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="пересчитать счетчики по status_history")
+    args = parser.parse_args()
+    asyncio.run(_report(args.rebuild))
+
+
+if __name__ == "__main__":
+    main()
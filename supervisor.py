@@ -0,0 +1,203 @@
+"""
+Супервизор процессов бота.
+
+Запускает WORKERS процессов bot.py (больше одного — только в режиме webhook:
+они делят порт через reuse_port), следит за ними и перезапускает упавшие
+или зависшие с экспоненциальной паузой. Зависание определяется по heartbeat:
+каждый воркер раз в HEARTBEAT_INTERVAL обновляет свой файл в run/, и если
+event loop заблокирован, файл перестает обновляться.
+
+Остановка (SIGTERM/SIGINT): воркерам отправляется SIGTERM, они дорабатывают
+принятые апдейты и очереди; кто не успел за STOP_TIMEOUT — получает SIGKILL.
+SIGHUP (bot_cli.py после изменения настройки) передается воркерам — они
+перечитывают config.json без перезапуска. Число воркеров так не меняется.
+
+Состояние воркеров (pid, время старта, число перезапусков) пишется в
+run/supervisor.json — его показывает bot_cli.py.
+
+Запуск обычно через bot_cli.py, вручную:
+    python supervisor.py
+"""
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import config
+from logger import LOG_DIR
+
+# все пути — от папки бота, как config.CONFIG_FILE и logger.LOG_DIR: супервизор запускают откуда угодно
+BASE_DIR = Path(__file__).resolve().parent
+BOT_SCRIPT = BASE_DIR / "bot.py"
+RUN_DIR = BASE_DIR / "run"
+STATUS_FILE = RUN_DIR / "supervisor.json"
+CONSOLE_LOG_FILE = LOG_DIR / "console.log"
+
+HEARTBEAT_INTERVAL = 5   # как часто воркер обновляет heartbeat, сек
+HEARTBEAT_TIMEOUT = 60   # heartbeat старше — воркер завис (с запасом на долгий старт)
+BACKOFF_BASE = 1         # пауза перед первым перезапуском, дальше удваивается
+BACKOFF_MAX = 300
+STABLE_AFTER = 60        # проработал дольше — счетчик неудач сбрасывается
+STOP_TIMEOUT = 35        # больше DRAIN_TIMEOUT в webhook.py
+POLL_INTERVAL = 1
+
+
+def heartbeat_file(worker_id: int) -> Path:
+    return RUN_DIR / f"worker-{worker_id}.heartbeat"
+
+
+class Worker:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process: subprocess.Popen = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0        # неудачные запуски подряд — от них зависит пауза
+        self.next_start = 0.0
+        self.last_exit = None
+
+    def start(self):
+        env = {
+            **os.environ,
+            "BOT_WORKER_ID": str(self.worker_id),
+            "BOT_HEARTBEAT_FILE": str(heartbeat_file(self.worker_id)),
+        }
+        heartbeat_file(self.worker_id).unlink(missing_ok=True)
+        with open(CONSOLE_LOG_FILE, "a") as console:
+            # рабочая папка воркера — папка бота: там же база и state.db
+            self.process = subprocess.Popen(
+                [sys.executable, str(BOT_SCRIPT)], env=env, cwd=BASE_DIR, stdout=console, stderr=subprocess.STDOUT
+            )
+        self.started_at = time.time()
+        log(f"воркер {self.worker_id} запущен, pid {self.process.pid}")
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def heartbeat_age(self) -> float:
+        """Секунды с последнего heartbeat (с момента старта, если его еще не было)."""
+        try:
+            last = heartbeat_file(self.worker_id).stat().st_mtime
+        except FileNotFoundError:
+            last = self.started_at
+        return time.time() - max(last, self.started_at)
+
+    def schedule_restart(self, reason: str):
+        self.last_exit = reason
+        if time.time() - self.started_at >= STABLE_AFTER:
+            self.failures = 0
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** self.failures)
+        self.failures += 1
+        self.restarts += 1
+        self.next_start = time.time() + delay
+        self.process = None
+        log(f"воркер {self.worker_id}: {reason}, перезапуск через {delay} сек")
+
+    def status(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "pid": self.process.pid if self.alive() else None,
+            "started_at": self.started_at if self.alive() else None,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+        }
+
+
+def log(message: str):
+    print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} [supervisor] {message}", flush=True)
+
+
+def terminate(workers: list[Worker], timeout: float = STOP_TIMEOUT):
+    """SIGTERM всем, ждем до timeout, оставшимся — SIGKILL."""
+    running = [w for w in workers if w.alive()]
+    for worker in running:
+        worker.process.terminate()
+    deadline = time.time() + timeout
+    for worker in running:
+        try:
+            worker.process.wait(max(0, deadline - time.time()))
+        except subprocess.TimeoutExpired:
+            log(f"воркер {worker.worker_id} не остановился за {timeout} сек, SIGKILL")
+            worker.process.kill()
+            worker.process.wait()
+
+
+def write_status(workers: list[Worker]):
+    status = {
+        "pid": os.getpid(),
+        "updated_at": time.time(),
+        "workers": [worker.status() for worker in workers],
+    }
+    tmp = STATUS_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(status))
+    tmp.replace(STATUS_FILE)  # атомарно — CLI не прочитает файл наполовину
+
+
+def main():
+    RUN_DIR.mkdir(exist_ok=True)
+    CONSOLE_LOG_FILE.parent.mkdir(exist_ok=True)
+    # config.json прочитан при импорте config: нет файла — значения по умолчанию
+    count = max(1, config.WORKERS)
+    if count > 1 and config.MODE != "webhook":
+        log("несколько воркеров возможны только в режиме webhook, запускаем один")
+        count = 1
+    if count > 1 and config.STATE_BACKEND != "sqlite":
+        log("WORKERS > 1 с STATE_BACKEND = memory: кулдауны и альбомы не будут общими")
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    workers = [Worker(i) for i in range(count)]
+
+    def forward_reload(signum, frame):
+        for worker in workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.send_signal(signal.SIGHUP)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, forward_reload)
+
+    for worker in workers:
+        worker.start()
+
+    while not stopping:
+        now = time.time()
+        for worker in workers:
+            if worker.process is None:
+                if now >= worker.next_start:
+                    worker.start()
+                continue
+            code = worker.process.poll()
+            if code is not None:
+                worker.schedule_restart(f"завершился с кодом {code}")
+            elif worker.heartbeat_age() > HEARTBEAT_TIMEOUT:
+                log(f"воркер {worker.worker_id} не отвечает {worker.heartbeat_age():.0f} сек")
+                terminate([worker])
+                worker.schedule_restart("нет heartbeat")
+        write_status(workers)
+        time.sleep(POLL_INTERVAL)
+
+    log("остановка: ждем завершения воркеров")
+    terminate(workers)
+    STATUS_FILE.unlink(missing_ok=True)
+    for worker in workers:
+        heartbeat_file(worker.worker_id).unlink(missing_ok=True)
+    log("остановлен")
+
+
+if __name__ == "__main__":
+    if platform.system() == "Windows":
+        # без сигналов POSIX аккуратно остановить воркеры нельзя — запускаем бота напрямую
+        os.chdir(BASE_DIR)
+        os.execv(sys.executable, [sys.executable, str(BOT_SCRIPT)])
+    main()
@@ -0,0 +1,47 @@
+"""
+Общая подготовка для тестов: корень проекта в sys.path, фиктивный токен
+и временная база вместо questions.db (как benchmarks/_bootstrap.py).
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import config  # noqa: E402
+
+# Bot() проверяет формат токена при создании (первое обращение к loader.bot)
+config.BOT_TOKEN = config.BOT_TOKEN or "123456:TEST"
+
+
+class TempDatabase:
+    """Временная база: database.SessionLocal перенаправлен на нее, схема создана."""
+
+    def __init__(self, path: Path):
+        import database
+
+        self.path = path
+        self.engine = database.build_engine(f"sqlite+aiosqlite:///{path}")
+        database.SessionLocal.configure(bind=self.engine)
+        self.run(database.init_db(self.engine))
+
+    def run(self, coro):
+        """Выполняет корутину в новом цикле событий и закрывает соединения пула в нем же."""
+        async def main():
+            try:
+                return await coro
+            finally:
+                await self.engine.dispose()
+
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def db(tmp_path):
+    import database
+
+    yield TempDatabase(tmp_path / "questions.db")
+    database.SessionLocal.configure(bind=database.engine)
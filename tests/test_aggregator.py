@@ -0,0 +1,63 @@
+"""
+Сборка альбомов (aggregator.MediaGroupAggregator) несколькими воркерами с общим
+SqliteStateStore: части одного альбома в разных процессах сбрасываются одним
+вызовом on_flush — после тишины по последней части, кто бы ее ни получил.
+"""
+import asyncio
+
+from aggregator import MAX_MEDIA_GROUP_SIZE, MediaGroupAggregator
+from state_store import SqliteStateStore
+
+KEY = "album:1:100"
+
+
+def make_workers(path, count: int = 2, quiet: float = 0.15):
+    flushed = []
+
+    async def on_flush(meta, parts):
+        flushed.append((meta, [part["n"] for part in parts]))
+
+    workers = [
+        MediaGroupAggregator(SqliteStateStore(str(path)), on_flush, min_quiet=quiet, max_quiet=quiet)
+        for _ in range(count)
+    ]
+    return workers, flushed
+
+
+async def close_all(workers):
+    for worker in workers:
+        await worker.close()
+        await worker.store.close()
+
+
+def test_album_split_between_workers_is_flushed_once(tmp_path):
+    workers, flushed = make_workers(tmp_path / "state.db")
+
+    async def run():
+        try:
+            # части по очереди в разные воркеры; у первого тишина наступает раньше, чем у второго
+            for n in range(4):
+                await workers[n % 2].add(KEY, {"n": n}, meta=f"worker{n % 2}")
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(0.5)
+        finally:
+            await close_all(workers)
+
+    asyncio.run(run())
+    assert [parts for _, parts in flushed] == [[0, 1, 2, 3]]
+
+
+def test_full_album_is_flushed_immediately_by_one_worker(tmp_path):
+    workers, flushed = make_workers(tmp_path / "state.db", quiet=5)
+
+    async def run():
+        try:
+            for n in range(MAX_MEDIA_GROUP_SIZE):
+                await workers[n % 2].add(KEY, {"n": n}, meta=f"worker{n % 2}")
+            await asyncio.sleep(0.1)
+        finally:
+            # таймеры первого воркера при остановке ничего не сбрасывают повторно
+            await asyncio.wait_for(close_all(workers), 1)
+
+    asyncio.run(run())
+    assert flushed == [("worker1", list(range(MAX_MEDIA_GROUP_SIZE)))]
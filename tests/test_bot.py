@@ -0,0 +1,28 @@
+"""
+Остановка в режиме polling (bot.drain_polling): обработчики уже полученных
+апдейтов дожидаются до drain(), зависшие — не дольше таймаута.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import bot
+import loader
+
+
+def test_drain_polling_waits_for_running_handlers(monkeypatch):
+    finished = []
+
+    async def handler(i: int, delay: float):
+        await asyncio.sleep(delay)
+        finished.append(i)
+
+    async def run():
+        tasks = {asyncio.create_task(handler(i, 0.05)) for i in range(3)}
+        stuck = asyncio.create_task(handler(99, 60))
+        monkeypatch.setattr(loader, "dp", SimpleNamespace(_handle_update_tasks=tasks | {stuck}), raising=False)
+        await asyncio.wait_for(bot.drain_polling(timeout=0.3), 1)
+        assert not stuck.done()
+        stuck.cancel()
+
+    asyncio.run(run())
+    assert sorted(finished) == [0, 1, 2]
@@ -0,0 +1,34 @@
+"""
+Перечитывание config.json (config.reload): о правке ключа, которому нужен
+перезапуск, сообщается один раз, а не при каждом следующем reload.
+"""
+import json
+
+import config
+
+
+def write_config(path, **overrides):
+    values = {name: getattr(config, name) for name in config.DEFAULTS}
+    path.write_text(json.dumps({**values, **overrides}), encoding="utf-8")
+
+
+def test_pending_restart_key_is_reported_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "_mtime", None)
+    monkeypatch.setattr(config, "_reported_pending", {})
+    path = tmp_path / "config.json"
+    workers = config.WORKERS
+
+    write_config(path, WORKERS=workers + 1)
+    assert config.reload(path) == ({}, {"WORKERS": workers + 1}, [])
+    # живое значение не изменилось, но правка уже отмечена
+    assert config.WORKERS == workers
+    assert config.reload(path) == ({}, {}, [])
+
+    write_config(path, WORKERS=workers + 2)
+    assert config.reload(path)[1] == {"WORKERS": workers + 2}
+
+    # вернули как было, затем снова поменяли — это новая правка
+    write_config(path)
+    assert config.reload(path)[1] == {}
+    write_config(path, WORKERS=workers + 2)
+    assert config.reload(path)[1] == {"WORKERS": workers + 2}
@@ -0,0 +1,119 @@
+"""
+Поиск повторов (dedup.DuplicateIndex и helpers.find_duplicate): короткие и
+пустые тексты не склеиваются, разные номера — разные вопросы, повтор своего
+вопроса привязывается, чужой похожий — нет, закрытый оригинал не держит повтор.
+"""
+import sqlite3
+from datetime import datetime
+
+from dedup import DuplicateIndex, Fingerprint
+from models import Status
+
+QUESTION = "Как вернуть товар, купленный вчера в интернет-магазине?"
+
+
+def test_short_texts_are_not_duplicates():
+    index = DuplicateIndex()
+    for question_id, text in enumerate(["Здравствуйте", "помогите", "Добрый день"], start=1):
+        index.add(question_id, Fingerprint(text), user_id=question_id)
+    assert len(index) == 0
+    assert index.find(Fingerprint("Здравствуйте!")) is None
+    assert index.find(Fingerprint("Помогите"), user_id=2) is None
+
+
+def test_empty_normalized_text_never_matches():
+    index = DuplicateIndex()
+    index.add(1, Fingerprint("🙂🙂🙂"), user_id=1)
+    index.add(2, Fingerprint("?!..."), user_id=2)
+    assert not Fingerprint("👍").matchable
+    assert len(index) == 0
+    assert index.find(Fingerprint("🙂🙂🙂"), user_id=1) is None
+
+
+def test_different_numbers_are_different_questions():
+    index = DuplicateIndex()
+    index.add(1, Fingerprint("Как вернуть товар номер 5?"), user_id=1)
+    assert index.find(Fingerprint("Как вернуть товар номер 7?")) is None
+    assert index.find(Fingerprint("как вернуть товар номер 5"), user_id=1) == 1
+
+
+def test_near_duplicate_scoped_to_user():
+    index = DuplicateIndex()
+    index.add(1, Fingerprint(QUESTION), user_id=10)
+    index.add(2, Fingerprint(QUESTION), user_id=20)
+    near = Fingerprint("как вернуть товар купленный вчера в интернет магазине")
+    assert index.find(near, user_id=10) == 1
+    assert index.find(near, user_id=20) == 2
+    assert index.find(near, user_id=30) is None
+    # без user_id — самый ранний у любого пользователя
+    assert index.find(near) == 1
+
+
+def test_discard_removes_question():
+    index = DuplicateIndex()
+    index.add(1, Fingerprint(QUESTION), user_id=10)
+    index.add(2, Fingerprint(QUESTION), user_id=10)
+    index.discard(1)
+    assert index.find(Fingerprint(QUESTION), user_id=10) == 2
+    index.discard(2)
+    index.discard(2)
+    assert len(index) == 0 and index.find(Fingerprint(QUESTION)) is None
+
+
+def insert_question(path, user_id: int, status: Status) -> int:
+    with sqlite3.connect(path) as conn:
+        cursor = conn.execute(
+            "INSERT INTO questions (user_id, username, text, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, f"user{user_id}", QUESTION, int(status), datetime.utcnow()),
+        )
+        return cursor.lastrowid
+
+
+def test_find_duplicate_checks_original_status(db, monkeypatch):
+    import helpers
+
+    duplicate_index = DuplicateIndex()
+    monkeypatch.setattr(helpers, "duplicate_index", duplicate_index)
+    done = insert_question(db.path, 10, Status.DONE)
+    active = insert_question(db.path, 10, Status.IN_PROGRESS)
+    other = insert_question(db.path, 20, Status.NEW)
+    for question_id, user_id in ((done, 10), (active, 10), (other, 20)):
+        duplicate_index.add(question_id, Fingerprint(QUESTION), user_id=user_id)
+
+    fingerprint = Fingerprint(QUESTION + "!")
+    # закрытый оригинал пропускается и выбрасывается из индекса, привязка — к активному своему
+    assert db.run(helpers.find_duplicate(fingerprint, 10)) == (active, True)
+    assert duplicate_index.find(fingerprint, user_id=10) == active
+    # у нового пользователя своих вопросов нет — только пометка "похож" на чужой активный
+    assert db.run(helpers.find_duplicate(fingerprint, 30)) == (active, False)
+
+    with sqlite3.connect(db.path) as conn:
+        conn.execute("UPDATE questions SET status = ? WHERE id IN (?, ?)", (int(Status.REJECTED), active, other))
+    assert db.run(helpers.find_duplicate(fingerprint, 10)) == (None, False)
+    assert len(duplicate_index) == 0
+
+
+def test_lookup_stays_in_memory_until_a_hit(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    import helpers
+    from events import StatusChange
+
+    duplicate_index = DuplicateIndex()
+    monkeypatch.setattr(helpers, "duplicate_index", duplicate_index)
+    queries = []
+
+    def session_local():
+        queries.append(1)
+        raise AssertionError("промах не должен обращаться к базе")
+
+    monkeypatch.setattr(helpers, "SessionLocal", session_local)
+    duplicate_index.add(1, Fingerprint(QUESTION), user_id=10)
+    assert asyncio.run(helpers.find_duplicate(Fingerprint("Совсем другой вопрос про доставку заказа"), 10)) == (None, False)
+
+    # закрытие вопроса через шину событий убирает его из индекса
+    question = SimpleNamespace(id=1, status=Status.DONE)
+    asyncio.run(helpers.forget_closed_duplicate(StatusChange(question, Status.NEW)))
+    assert asyncio.run(helpers.find_duplicate(Fingerprint(QUESTION), 10)) == (None, False)
+    assert queries == []
@@ -0,0 +1,173 @@
+"""
+Фоновая обработка смены статуса (events.StatusEventBus): склейка быстрых
+смен, возврат к исходному статусу (карточки — да, уведомление — нет), порядок
+событий одного вопроса, повторы упавших обработчиков, close().
+"""
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText
+
+from events import StatusChange, StatusEventBus
+from models import Status
+
+
+def change(question_id: int, previous: Status, status: Status, message=None) -> StatusChange:
+    return StatusChange(SimpleNamespace(id=question_id, status=status), previous, manager_id=1, message=message)
+
+
+def test_publish_does_not_wait_and_coalesces_quick_changes():
+    seen = []
+
+    async def run():
+        bus = StatusEventBus(delay=0.05, retry_delay=0)
+
+        @bus.subscribe
+        async def handler(event):
+            seen.append((event.question.id, event.previous_status, event.question.status, event.messages))
+
+        bus.publish(change(1, Status.NEW, Status.IN_PROGRESS, message=(10, 100)))
+        bus.publish(change(1, Status.IN_PROGRESS, Status.DONE, message=(10, 101)))
+        bus.publish(change(2, Status.NEW, Status.REJECTED))
+        # publish только ставит событие в очередь
+        assert seen == []
+        await asyncio.sleep(0.2)
+        return bus
+
+    bus = asyncio.run(run())
+    assert sorted(seen) == [
+        (1, Status.NEW, Status.DONE, [(10, 100), (10, 101)]),
+        (2, Status.NEW, Status.REJECTED, []),
+    ]
+    assert (bus.published, bus.coalesced, bus.failed) == (3, 1, 0)
+
+
+def test_change_and_back_still_reaches_handlers():
+    seen = []
+
+    async def run():
+        bus = StatusEventBus(delay=0.05)
+
+        @bus.subscribe
+        async def handler(event):
+            seen.append((event.reverted, event.messages))
+
+        # взял в работу и вернул: карточку все равно надо перерисовать (исполнитель сменился)
+        bus.publish(change(1, Status.NEW, Status.IN_PROGRESS, message=(10, 100)))
+        bus.publish(change(1, Status.IN_PROGRESS, Status.NEW, message=(10, 100)))
+        await bus.close()
+
+    asyncio.run(run())
+    assert seen == [(True, [(10, 100)])]
+
+
+def test_reverted_change_does_not_notify_user(monkeypatch):
+    import helpers
+
+    sent = []
+
+    async def send(chat_id, request):
+        sent.append(chat_id)
+
+    monkeypatch.setattr(helpers, "send_queue", SimpleNamespace(send=send))
+    event = change(1, Status.NEW, Status.IN_PROGRESS).merge(change(1, Status.IN_PROGRESS, Status.NEW))
+    assert event.reverted
+    asyncio.run(helpers.notify_user_status_change(event))
+    assert sent == []
+
+
+def test_events_of_one_question_run_in_order():
+    log = []
+
+    async def run():
+        bus = StatusEventBus(delay=0.01)
+
+        @bus.subscribe
+        async def handler(event):
+            log.append(("start", event.question.status))
+            # первое событие обрабатывается дольше, чем приходит второе
+            await asyncio.sleep(0.1 if event.question.status == Status.IN_PROGRESS else 0)
+            log.append(("end", event.question.status))
+
+        bus.publish(change(1, Status.NEW, Status.IN_PROGRESS))
+        await asyncio.sleep(0.03)
+        bus.publish(change(1, Status.IN_PROGRESS, Status.DONE))
+        await bus.close()
+
+    asyncio.run(run())
+    assert log == [
+        ("start", Status.IN_PROGRESS), ("end", Status.IN_PROGRESS),
+        ("start", Status.DONE), ("end", Status.DONE),
+    ]
+
+
+def test_failed_handler_is_retried():
+    calls = {"flaky": 0, "broken": 0, "bad_request": 0}
+
+    async def run():
+        bus = StatusEventBus(delay=0, max_retries=3, retry_delay=0.001)
+
+        @bus.subscribe
+        async def flaky(event):
+            calls["flaky"] += 1
+            if calls["flaky"] < 3:
+                raise ConnectionError("сеть")
+
+        @bus.subscribe
+        async def broken(event):
+            calls["broken"] += 1
+            raise RuntimeError("всегда падает")
+
+        @bus.subscribe
+        async def bad_request(event):
+            # сообщение удалено — повтор не поможет
+            calls["bad_request"] += 1
+            raise TelegramBadRequest(EditMessageText(text=""), "message to edit not found")
+
+        bus.publish(change(1, Status.NEW, Status.DONE))
+        await bus.close()
+        return bus
+
+    bus = asyncio.run(run())
+    assert calls == {"flaky": 3, "broken": 3, "bad_request": 1}
+    assert bus.failed == 1
+
+
+def test_close_runs_pending_events_immediately():
+    seen = []
+
+    async def run():
+        bus = StatusEventBus(delay=60)
+
+        @bus.subscribe
+        async def handler(event):
+            seen.append(event.question.id)
+
+        for question_id in range(5):
+            bus.publish(change(question_id, Status.NEW, Status.IN_PROGRESS))
+        await asyncio.wait_for(bus.close(), 1)
+
+    asyncio.run(run())
+    assert sorted(seen) == list(range(5))
+
+
+def test_unchanged_card_does_not_stop_other_edits(monkeypatch):
+    import helpers
+
+    edited = []
+
+    async def send(chat_id, request):
+        if chat_id == 10:
+            raise TelegramBadRequest(EditMessageText(text=""), "Bad Request: message is not modified")
+        edited.append(chat_id)
+
+    monkeypatch.setattr(helpers, "send_queue", SimpleNamespace(send=send))
+    question = SimpleNamespace(
+        id=1, status=Status.NEW, user_id=5, username="user5", text="вопрос", media=None,
+        created_at=None, assignee=None, work_message_id=None,
+    )
+    event = StatusChange(question, Status.NEW, manager_id=1, message=(10, 100))
+    event.messages.append((20, 200))
+    asyncio.run(helpers.update_status_cards(event))
+    assert edited == [20]
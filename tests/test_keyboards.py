@@ -0,0 +1,70 @@
+"""
+Навигация по укороченным страницам (keyboards.generate_question_list_page):
+если страница не влезла в сообщение целиком, переходы вперед и назад по
+кнопкам все равно проходят все вопросы без пропусков.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from keyboards import PaginationCallback, generate_question_list_page
+from models import Status
+
+PER_PAGE = 8
+
+
+def make_rows(count: int) -> list:
+    # у каждого третьего вопроса огромная подпись: на странице помещается меньше PER_PAGE вопросов
+    return [
+        SimpleNamespace(
+            id=1000 - i, status=Status.NEW, username=("u" * 1300) if i % 3 == 0 else f"user{i}",
+            created_at=datetime(2024, 1, 1), text=f"вопрос {i} " * 50,
+        )
+        for i in range(count)
+    ]
+
+
+def search_page(rows: list, callback: PaginationCallback):
+    """Как paginate_questions для результатов поиска: выборка по сдвигу и рендер страницы."""
+    backward = bool(callback.before_offset)
+    offset, limit = callback.offset, PER_PAGE
+    if backward:
+        offset = max(0, callback.before_offset - limit)
+        limit = callback.before_offset - offset
+    page = rows[offset:offset + limit]
+    has_next = offset + limit < len(rows)
+    _, markup = generate_question_list_page(
+        page, callback.page, "s_test", offset > 0, has_next, offset=offset, backward=backward
+    )
+    shown = [int(button.callback_data.split(":")[2]) for row in markup.inline_keyboard for button in row
+             if button.callback_data.startswith("pq:")]
+    navigation = {
+        button.text: PaginationCallback.unpack(button.callback_data)
+        for row in markup.inline_keyboard for button in row if button.callback_data.startswith("page:")
+    }
+    return shown, navigation
+
+
+def test_search_pages_have_no_gaps_in_both_directions():
+    rows = make_rows(40)
+    expected = [row.id for row in rows]
+
+    callback = PaginationCallback(page=1, filter_status="s_test")
+    forward = []
+    while True:
+        shown, navigation = search_page(rows, callback)
+        assert 0 < len(shown) <= PER_PAGE
+        forward.append(shown)
+        if "Вперед ▶" not in navigation:
+            break
+        callback = navigation["Вперед ▶"]
+    assert [question_id for page in forward for question_id in page] == expected
+    # страницы действительно укорачивались
+    assert any(len(page) < PER_PAGE for page in forward[:-1])
+
+    backward = []
+    while "◀ Назад" in navigation:
+        callback = navigation["◀ Назад"]
+        shown, navigation = search_page(rows, callback)
+        backward.append(shown)
+    # назад: все вопросы до последней страницы, без пропусков и повторов
+    assert [question_id for page in reversed(backward) for question_id in page] == expected[:-len(forward[-1])]
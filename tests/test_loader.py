@@ -0,0 +1,63 @@
+"""
+Ленивые компоненты (loader.py): импорт loader и утилит, которым бот не нужен,
+ничего не создает; компонент строится при первом обращении и один раз,
+create_app() повторно ничего не пересоздает.
+
+Проверка идет в отдельном процессе: в процессе pytest компоненты уже могли
+создать другие тесты.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, sys
+import config
+config.BOT_TOKEN = config.BOT_TOKEN or "123456:TEST"
+
+import loader
+
+built = []
+for name, builder in list(loader._BUILDERS.items()):
+    def spy(name=name, builder=builder):
+        built.append(name)
+        return builder()
+    loader._BUILDERS[name] = spy
+
+report = {"heavy_after_import": sorted(m for m in ("aiogram", "sqlalchemy", "database") if m in sys.modules)}
+
+# утилиты без бота: отчеты, выгрузка, архивация
+import stats, transfer, archive
+report["after_tools"] = list(built)
+
+queue = loader.send_queue
+report["after_first_access"] = list(built)
+report["same_object"] = loader.send_queue is queue and loader.get("send_queue") is queue
+
+dp = loader.create_app()
+report["same_dispatcher"] = loader.create_app() is dp
+report["after_create_app"] = list(built)
+report["builders"] = list(loader._BUILDERS)
+print(json.dumps(report))
+"""
+
+
+def test_components_are_built_on_first_access_only():
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # import loader не тянет aiogram, SQLAlchemy и движок базы
+    assert report["heavy_after_import"] == []
+    # утилиты компоненты бота не создают
+    assert report["after_tools"] == []
+    assert report["after_first_access"] == ["send_queue"]
+    assert report["same_object"]
+    assert report["same_dispatcher"]
+    # create_app создает остальное (хендлеры импортируют компоненты), каждый — ровно один раз
+    assert sorted(report["after_create_app"]) == sorted(report["builders"])
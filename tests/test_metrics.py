@@ -0,0 +1,160 @@
+"""
+Метрики (metrics.py): гистограммы и текстовый формат Prometheus, middleware
+хендлеров и Bot API, время SQL-запросов, эндпоинт /metrics.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import text
+
+from metrics import (
+    Histogram,
+    Metrics,
+    HandlerMetricsMiddleware,
+    RequestMetricsMiddleware,
+    create_metrics_app,
+    instrument_engine,
+)
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+    # граница корзины включается в нее (le)
+    assert histogram.counts == [2, 2, 1]
+    assert histogram.count == 5 and histogram.sum == pytest.approx(4.35)
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.99) == float("inf")
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_render_prometheus_text():
+    registry = Metrics()
+    registry.inc("bot_handler_errors_total", handler="start")
+    registry.inc("bot_handler_errors_total", handler="start")
+    registry.observe("bot_api_seconds", 0.02, method="SendMessage")
+    registry.observe("bot_api_seconds", 20, method="SendMessage")
+    registry.add_collector(lambda: {"bot_send_queue_depth": 3})
+
+    lines = registry.render().splitlines()
+    assert 'bot_handler_errors_total{handler="start"} 2' in lines
+    assert 'bot_api_seconds_bucket{method="SendMessage",le="0.01"} 0' in lines
+    assert 'bot_api_seconds_bucket{method="SendMessage",le="0.025"} 1' in lines
+    # корзины накопительные, +Inf равна count
+    assert 'bot_api_seconds_bucket{method="SendMessage",le="10.0"} 1' in lines
+    assert 'bot_api_seconds_bucket{method="SendMessage",le="+Inf"} 2' in lines
+    assert 'bot_api_seconds_count{method="SendMessage"} 2' in lines
+    assert "bot_send_queue_depth 3" in lines
+    assert any(line.startswith("bot_uptime_seconds ") for line in lines)
+
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"]['bot_api_seconds{method="SendMessage"}']["count"] == 2
+    assert snapshot["counters"]['bot_handler_errors_total{handler="start"}'] == 2
+
+
+
+def test_cli_merges_worker_snapshots_like_one_registry():
+    from bot_cli import merge_stats
+
+    combined, workers = Metrics(), [Metrics(), Metrics()]
+    for i, value in enumerate([0.003, 0.02, 0.02, 0.3, 0.3, 0.3, 4.0]):
+        for registry in (combined, workers[i % 2]):
+            registry.observe("bot_api_seconds", value, method="SendMessage")
+            registry.inc("bot_handler_errors_total", handler="start")
+
+    # CLI получает сводки через JSON
+    merged = merge_stats([json.loads(json.dumps(registry.snapshot())) for registry in workers])
+    expected = combined.snapshot()
+    name = 'bot_api_seconds{method="SendMessage"}'
+    for field in ("count", "counts", "p50", "p99"):
+        assert merged["histograms"][name][field] == expected["histograms"][name][field]
+    assert merged["histograms"][name]["avg"] == pytest.approx(expected["histograms"][name]["avg"])
+    assert merged["counters"] == expected["counters"]
+
+def test_handler_middleware_times_and_counts_errors():
+    registry = Metrics()
+    middleware = HandlerMetricsMiddleware(registry)
+
+    async def start_handler(event, data):
+        return "ok"
+
+    async def broken_handler(event, data):
+        raise RuntimeError("сбой")
+
+    async def run():
+        ok = await middleware(start_handler, None, {"handler": SimpleNamespace(callback=start_handler)})
+        with pytest.raises(RuntimeError):
+            await middleware(broken_handler, None, {"handler": SimpleNamespace(callback=broken_handler)})
+        return ok
+
+    assert asyncio.run(run()) == "ok"
+    assert registry.histograms[("bot_handler_seconds", (("handler", "start_handler"),))].count == 1
+    assert registry.histograms[("bot_handler_seconds", (("handler", "broken_handler"),))].count == 1
+    assert registry.counters == {("bot_handler_errors_total", (("handler", "broken_handler"),)): 1}
+
+
+def test_request_middleware_records_method_and_error_type():
+    registry = Metrics()
+    middleware = RequestMetricsMiddleware(registry)
+
+    class SendMessage:
+        pass
+
+    async def fail(bot, method):
+        raise TimeoutError()
+
+    async def run():
+        assert await middleware(lambda bot, method: asyncio.sleep(0, "sent"), None, SendMessage()) == "sent"
+        with pytest.raises(TimeoutError):
+            await middleware(fail, None, SendMessage())
+
+    asyncio.run(run())
+    assert registry.histograms[("bot_api_seconds", (("method", "SendMessage"),))].count == 2
+    assert registry.counters == {("bot_api_errors_total", (("method", "SendMessage"), ("error", "TimeoutError"))): 1}
+
+
+def test_engine_queries_are_timed(tmp_path):
+    from database import build_engine
+
+    registry = Metrics()
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+    instrument_engine(engine, registry)
+
+    async def run():
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+                await conn.execute(text("INSERT INTO t VALUES (1)"))
+                await conn.execute(text("SELECT x FROM t"))
+            async with engine.connect() as conn:
+                with pytest.raises(Exception):
+                    await conn.execute(text("SELECT * FROM missing"))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    operations = {dict(labels)["operation"] for name, labels in registry.histograms if name == "bot_db_seconds"}
+    assert {"CREATE", "INSERT", "SELECT"} <= operations
+    assert registry.counters[("bot_db_errors_total", ())] == 1
+
+
+def test_metrics_endpoint():
+    registry = Metrics()
+    registry.inc("bot_updates_total")
+
+    async def run():
+        async with TestClient(TestServer(create_metrics_app(registry))) as client:
+            response = await client.get("/metrics")
+            body = await response.text()
+            summary = await (await client.get("/metrics", params={"format": "json"})).json()
+        return response.status, response.content_type, body, summary
+
+    status, content_type, body, summary = asyncio.run(run())
+    assert (status, content_type) == (200, "text/plain")
+    assert "bot_updates_total 1" in body.splitlines()
+    assert summary["counters"] == {"bot_updates_total": 1}
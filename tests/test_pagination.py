@@ -0,0 +1,148 @@
+"""
+Keyset-пагинация списка вопросов (helpers.get_questions_page) на большой
+таблице со смешанными статусами: проход вперед и назад должен давать ровно
+тот же порядок, что и перебор всей таблицы, — без пропусков и повторов.
+Кнопка выбора вопроса (PageQuestionCallback) открывает показанный вопрос,
+даже если список успел сдвинуться между показом страницы и нажатием.
+"""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from models import Status, ACTIVE_STATUSES
+
+ROWS = 20_000
+
+
+def seed(path, rows: int = ROWS) -> list[tuple[int, int, bool]]:
+    """Наполняет questions; возвращает [(id, status, повтор)] для проверки перебором."""
+    rng = random.Random(1)
+    started = datetime(2024, 1, 1)
+    data = []
+    status = Status.NEW
+    for i in range(rows):
+        # статусы идут сериями разной длины: диапазоны UNION ALL по статусам перемежаются неравномерно
+        if rng.random() < 0.1:
+            status = rng.choice(list(Status))
+        duplicate_of = 1 if i > 0 and rng.random() < 0.05 else None
+        data.append((i % 500, f"user{i % 500}", f"Вопрос {i}", int(status), started + timedelta(seconds=i), duplicate_of))
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO questions (user_id, username, text, status, created_at, duplicate_of) VALUES (?, ?, ?, ?, ?, ?)",
+            data,
+        )
+    return seed_rows(path)
+
+
+def seed_rows(path) -> list[tuple[int, int, bool]]:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT id, status, duplicate_of IS NOT NULL FROM questions ORDER BY id").fetchall()
+
+
+async def walk(status_filter, limit: int):
+    """Все страницы вперед от начала, затем назад от последней. Возвращает (вперед, назад) — списки страниц."""
+    from helpers import get_questions_page
+
+    forward = []
+    rows, has_prev, has_next = await get_questions_page(status_filter=status_filter, limit=limit)
+    assert not has_prev
+    while True:
+        forward.append([row.id for row in rows])
+        assert 0 < len(rows) <= limit
+        if not has_next:
+            break
+        rows, has_prev, has_next = await get_questions_page(
+            status_filter=status_filter, after_id=rows[-1].id, limit=limit
+        )
+        assert has_prev
+
+    backward = [forward[-1]]
+    first_id = forward[-1][0]
+    has_prev = len(forward) > 1
+    while has_prev:
+        rows, has_prev, has_next = await get_questions_page(status_filter=status_filter, before_id=first_id, limit=limit)
+        assert has_next
+        backward.append([row.id for row in rows])
+        first_id = rows[0].id
+    return forward, backward
+
+
+@pytest.mark.parametrize("status_filter, limit", [
+    (ACTIVE_STATUSES, 50),
+    ([Status.DONE], 37),
+    ([Status.REJECTED, Status.NEW, Status.DONE], 64),
+    (None, 100),
+])
+def test_pages_match_brute_force(db, status_filter, limit):
+    rows = seed(db.path)
+    expected = [
+        question_id for question_id, status, duplicate in rows
+        if not duplicate and (status_filter is None or status in status_filter)
+    ]
+
+    forward, backward = db.run(walk(status_filter, limit))
+
+    # вперед: ровно ожидаемый порядок, полные страницы везде, кроме последней
+    assert [question_id for page in forward for question_id in page] == expected
+    assert all(len(page) == limit for page in forward[:-1])
+    # назад от последней страницы до первого вопроса: тот же порядок целиком;
+    # неполной может быть только самая первая страница (границы страниц сдвинуты)
+    assert [question_id for page in reversed(backward) for question_id in page] == expected
+    assert all(len(page) == limit for page in backward[1:-1])
+
+
+def test_empty_filter_result(db):
+    seed(db.path, rows=100)
+    # страниц нет — и флаги навигации выключены
+    from helpers import get_questions_page
+
+    assert db.run(get_questions_page(status_filter=[Status.IN_PROGRESS], after_id=10**9)) == ([], False, False)
+
+
+def test_selection_button_opens_shown_question_after_list_shifts(db, monkeypatch):
+    from handlers import manager
+    from helpers import get_questions_page
+    from keyboards import PageQuestionCallback, generate_question_list_page
+
+    seed(db.path, rows=300)
+    opened = []
+
+    async def post_question_to_managers(question, text, reply_markup=None):
+        opened.append(question)
+
+    async def answer(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(manager, "post_question_to_managers", post_question_to_managers)
+    callback = SimpleNamespace(from_user=SimpleNamespace(id=1), answer=answer)
+
+    async def second_page():
+        first, _, _ = await get_questions_page(status_filter=ACTIVE_STATUSES, limit=8)
+        return first, await get_questions_page(status_filter=ACTIVE_STATUSES, after_id=first[-1].id, limit=8)
+
+    first, (rows, has_prev, has_next) = db.run(second_page())
+    _, markup = generate_question_list_page(rows, 2, "active", has_prev, has_next)
+    buttons = {button.text: button.callback_data for row in markup.inline_keyboard for button in row}
+
+    # между показом и нажатием: закрыты вопрос с первой страницы и первые два на этой, пришел новый
+    with sqlite3.connect(db.path) as conn:
+        conn.execute(
+            "UPDATE questions SET status = ? WHERE id IN (?, ?, ?)",
+            (int(Status.DONE), first[0].id, rows[0].id, rows[1].id),
+        )
+        conn.execute(
+            "INSERT INTO questions (user_id, username, text, status, created_at) VALUES (1, 'user1', 'новый', ?, ?)",
+            (int(Status.NEW), datetime(2024, 1, 2)),
+        )
+    shifted = [question_id for question_id, status, duplicate in seed_rows(db.path)
+               if not duplicate and status in ACTIVE_STATUSES][8:16]
+    # по позиции та же кнопка теперь указывала бы на другой вопрос
+    assert shifted[2] != rows[2].id
+
+    for number in ("1", "3", str(len(rows))):
+        db.run(manager.select_question_callback(callback, PageQuestionCallback.unpack(buttons[number])))
+    assert [question.id for question in opened] == [rows[0].id, rows[2].id, rows[-1].id]
+    assert opened[0].status == Status.DONE
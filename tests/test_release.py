@@ -0,0 +1,60 @@
+"""
+Команда /release (handlers.manager.release_command): свой вопрос снимается
+сразу, чужой — только с явным force.
+"""
+import sqlite3
+from datetime import datetime
+from types import SimpleNamespace
+
+import config
+from models import Status
+
+CHAT_ID = -100
+
+
+def insert_question(path, assignee: int) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "INSERT INTO questions (user_id, username, text, status, created_at, assignee) VALUES (1, 'u', 'вопрос', ?, ?, ?)",
+            (int(Status.IN_PROGRESS), datetime(2024, 1, 1), assignee),
+        ).lastrowid
+
+
+def assignee_of(path, question_id: int):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT assignee FROM questions WHERE id = ?", (question_id,)).fetchone()[0]
+
+
+def release(db, user_id: int, args: str) -> list:
+    from handlers import manager
+
+    answers = []
+
+    async def answer(text, **kwargs):
+        answers.append(text)
+
+    message = SimpleNamespace(chat=SimpleNamespace(id=CHAT_ID), from_user=SimpleNamespace(id=user_id), answer=answer)
+    db.run(manager.release_command(message, SimpleNamespace(args=args)))
+    return answers
+
+
+def test_release_own_and_foreign_question(db, monkeypatch):
+    monkeypatch.setattr(config, "WORK_CHAT_ID", CHAT_ID)
+    question_id = insert_question(db.path, assignee=10)
+
+    # чужой вопрос без force не снимается
+    answers = release(db, 20, str(question_id))
+    assert "force" in answers[-1]
+    assert assignee_of(db.path, question_id) == 10
+
+    # свой — снимается
+    release(db, 10, str(question_id))
+    assert assignee_of(db.path, question_id) is None
+    assert "и так ничей" in release(db, 10, str(question_id))[-1]
+
+    # чужой с force — снимается
+    other_id = insert_question(db.path, assignee=10)
+    release(db, 20, f"{other_id} force")
+    assert assignee_of(db.path, other_id) is None
+
+    assert release(db, 20, f"{other_id} please")[-1].startswith("Использование")
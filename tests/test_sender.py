@@ -0,0 +1,90 @@
+"""
+Очередь отправки (sender.SendQueue) на фейковом Bot: лимиты не превышаются
+ни в одном окне, порядок сообщений внутри пачки сохраняется.
+"""
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from sender import RateLimiter, SendQueue
+
+
+def max_in_window(times: list[float], period: float) -> int:
+    times = sorted(times)
+    best, left = 0, 0
+    for right, t in enumerate(times):
+        while t - times[left] >= period:
+            left += 1
+        best = max(best, right - left + 1)
+    return best
+
+
+def test_burst_and_refill_do_not_share_a_window():
+    # 5 запросов за 0.1 с: token bucket той же емкости пропустил бы 5 сразу и еще 5 пополнением
+    limiter = RateLimiter(rate=50, burst=5)
+
+    async def run():
+        times = []
+        for _ in range(25):
+            await limiter.acquire()
+            times.append(time.monotonic())
+        return times
+
+    times = asyncio.run(run())
+    assert max_in_window(times, limiter.period) <= 5
+    # и не медленнее лимита: 25 запросов — четыре полных окна ожидания
+    assert times[-1] - times[0] < 5 * limiter.period
+
+
+def test_set_rate_applies_to_waiting_requests():
+    limiter = RateLimiter(rate=1)
+    limiter.set_rate(100)
+    assert (limiter.limit, limiter.period) == (100, 1.0)
+    limiter.set_rate(20 / 60, 20)
+    assert limiter.limit == 20 and abs(limiter.period - 60) < 1e-9
+
+
+class FakeBot:
+    def __init__(self, flood_every: int = 0):
+        self.flood_every = flood_every
+        self.requests = []  # время каждого запроса, в том числе отбитого
+        self.delivered = []
+
+    async def send_message(self, chat_id, text):
+        self.requests.append(time.monotonic())
+        await asyncio.sleep(0.001)
+        if self.flood_every and len(self.requests) % self.flood_every == 0:
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Too Many Requests", 0)
+        self.delivered.append((chat_id, text))
+        return text
+
+
+def test_queue_keeps_order_and_global_limit():
+    bot = FakeBot(flood_every=7)
+
+    async def run():
+        queue = SendQueue(global_rate=40, private_rate=1000)
+        futures = [
+            queue.submit(chat_id, *[
+                (lambda chat_id=chat_id, text=f"{question}:{part}": bot.send_message(chat_id, text))
+                for part in range(3)
+            ])
+            for question in range(2)
+            for chat_id in range(1, 16)
+        ]
+        results = await asyncio.gather(*futures)
+        stats = queue.stats()
+        await queue.close()
+        return results, stats
+
+    results, stats = asyncio.run(run())
+
+    assert stats["failed"] == 0 and stats["retries"] > 0
+    assert all(result == [f"{result[0][0]}:{part}" for part in range(3)] for result in results)
+    for chat_id in range(1, 16):
+        assert [text for chat, text in bot.delivered if chat == chat_id] == [
+            f"{question}:{part}" for question in range(2) for part in range(3)
+        ]
+    assert max_in_window(bot.requests, 1.0) <= 40
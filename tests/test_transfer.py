@@ -0,0 +1,42 @@
+"""
+Загрузка выгрузки (transfer.import_questions): номер, который уже есть в
+рабочей таблице или в архиве, пропускается — вопрос не раздваивается.
+"""
+import json
+import sqlite3
+
+from transfer import import_questions
+
+ARCHIVED_AT = "2026-01-01 00:00:00.000000"
+
+
+def record(question_id: int, archived: bool) -> dict:
+    return {
+        "id": question_id, "user_id": 10, "username": "user10", "text": f"вопрос {question_id}",
+        "media": None, "status": 2, "created_at": "2025-12-01 00:00:00.000000",
+        "archived_at": ARCHIVED_AT if archived else None,
+    }
+
+
+def ids(path, table: str) -> list:
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY id")]
+
+
+def test_import_skips_ids_present_in_the_other_table(tmp_path):
+    path = tmp_path / "questions.db"
+    source = tmp_path / "questions.jsonl"
+
+    # в базе: вопрос 1 в рабочей таблице, вопрос 2 уже в архиве
+    source.write_text(json.dumps(record(1, False)) + "\n" + json.dumps(record(2, True)) + "\n")
+    assert import_questions(path, source, "jsonl") == (2, 2)
+
+    # в файле они же, но в другом состоянии, плюс два новых
+    rows = [record(1, True), record(2, False), record(3, False), record(4, True)]
+    source.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    assert import_questions(path, source, "jsonl") == (4, 2)
+    assert ids(path, "questions") == [1, 3]
+    assert ids(path, "questions_archive") == [2, 4]
+
+    # повторный запуск ничего не добавляет
+    assert import_questions(path, source, "jsonl") == (4, 0)
@@ -0,0 +1,362 @@
+"""
+Выгрузка и загрузка вопросов потоком: JSONL, CSV и Parquet.
+
+Выгрузка читает базу через отдельное соединение только для чтения в одной
+транзакции: все порции берутся из одного снимка (WAL), бот тем временем
+продолжает писать. Строки идут порциями по CHUNK_ROWS в порядке id
+(keyset, WHERE id > последний), так что память не зависит от размера
+таблицы. Пока снимок открыт, WAL-файл не сбрасывается в базу полностью —
+на больших выгрузках он подрастает и сжимается после.
+
+Вопросы выгружаются вместе с архивом (колонка archived_at не пустая у
+архивных), история статусов — отдельной таблицей history. После каждой
+порции рядом с файлом пишется <файл>.progress: если выгрузка прервалась,
+--resume обрезает файл до последней целой порции и продолжает с нее.
+Для Parquet (нужен pyarrow) продолжение не поддерживается.
+
+Загрузка пишет вопросы пачками по CHUNK_ROWS строк, одна транзакция на
+пачку; вопросы с уже существующим номером (в рабочей таблице или в
+архиве) пропускаются, поэтому
+прерванную загрузку можно просто запустить заново. FTS-индексы и счетчики
+/stats обновляются триггерами, как при обычной записи.
+
+Запуск (или python bot_cli.py export|import ...):
+    python transfer.py export questions.jsonl
+    python transfer.py export questions.csv --since 2026-01-01
+    python transfer.py export history.parquet --table history
+    python transfer.py export questions.jsonl --resume
+    python transfer.py import questions.jsonl --db test.db
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+CHUNK_ROWS = 5000
+FORMATS = ("jsonl", "csv", "parquet")
+
+QUESTION_COLUMNS = (
+    "id", "user_id", "username", "text", "media", "status",
+    "created_at", "duplicate_of", "work_message_id", "assignee", "archived_at"
+)
+HISTORY_COLUMNS = ("id", "question_id", "old_status", "new_status", "changed_at")
+INTEGER_COLUMNS = {
+    "id", "user_id", "status", "duplicate_of", "work_message_id", "assignee",
+    "question_id", "old_status", "new_status"
+}
+JSON_COLUMNS = {"media"}
+
+# таблица выгрузки: (колонки, источник строк, колонка времени для --since)
+TABLES = {
+    "questions": (QUESTION_COLUMNS, "questions", "created_at"),
+    "history": (HISTORY_COLUMNS, "status_history", "changed_at"),
+}
+
+
+def format_of(path: Path, fmt: str = None) -> str:
+    fmt = fmt or path.suffix.lstrip(".").lower()
+    if fmt not in FORMATS:
+        sys.exit(f"Неизвестный формат {fmt!r}, нужен один из: {', '.join(FORMATS)} (--format)")
+    return fmt
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Для Parquet нужен pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+# =========================
+# Выгрузка
+# =========================
+def open_snapshot(path: Path) -> sqlite3.Connection:
+    """Соединение только для чтения с открытой транзакцией — один снимок на всю выгрузку."""
+    if not path.exists():
+        sys.exit(f"Файл {path} не найден")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("BEGIN")
+    # снимок фиксируется первым чтением, а не BEGIN
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    return conn
+
+
+def _sources(conn: sqlite3.Connection, table: str) -> list[str]:
+    """Таблицы и списки колонок, из которых собирается выгрузка."""
+    columns, source, _ = TABLES[table]
+    if table != "questions":
+        return [f"SELECT {', '.join(columns)} FROM {source}"]
+    hot = ", ".join("NULL AS archived_at" if name == "archived_at" else name for name in columns)
+    sources = [f"SELECT {hot} FROM questions"]
+    has_archive = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_archive'"
+    ).fetchone()
+    if has_archive:
+        sources.append(f"SELECT {', '.join(columns)} FROM questions_archive")
+    return sources
+
+
+def iter_chunks(conn: sqlite3.Connection, table: str, after_id: int = 0, since: str = None, chunk_rows: int = CHUNK_ROWS):
+    """Порции строк (кортежи в порядке колонок таблицы) с id > after_id."""
+    time_column = TABLES[table][2]
+    where = "id > ?"
+    params = []
+    if since:
+        # время хранится строкой 'YYYY-MM-DD HH:MM:SS.ffffff' — сравнение строк корректно
+        where += f" AND {time_column} >= ?"
+        params.append(since)
+    # LIMIT в каждой части: сортируется не больше порции с каждой таблицы, а не весь остаток
+    parts = [f"SELECT * FROM ({source} WHERE {where} ORDER BY id LIMIT ?)" for source in _sources(conn, table)]
+    sql = f"{' UNION ALL '.join(parts)} ORDER BY id LIMIT ?"
+    while True:
+        rows = conn.execute(sql, [after_id, *params, chunk_rows] * len(parts) + [chunk_rows]).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+class JsonlWriter:
+    def __init__(self, path: Path, columns: tuple, append: bool):
+        self.columns = columns
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, rows: list):
+        lines = []
+        for row in rows:
+            record = dict(zip(self.columns, row))
+            for name in JSON_COLUMNS & record.keys():
+                if record[name] is not None:
+                    record[name] = json.loads(record[name])
+            lines.append(json.dumps(record, ensure_ascii=False))
+        self.file.write("\n".join(lines) + "\n")
+
+    def flush(self) -> int:
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, path: Path, columns: tuple, append: bool):
+        self.file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        if not append:
+            self.writer.writerow(columns)
+
+    def write(self, rows: list):
+        # JSON-колонки остаются строкой JSON, NULL — пустая ячейка
+        self.writer.writerows(rows)
+
+    def flush(self) -> int:
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Каждая порция — отдельная row group: в памяти не больше одной порции."""
+
+    def __init__(self, path: Path, columns: tuple, append: bool):
+        pa = self.pa = _require_pyarrow()
+        self.schema = pa.schema([
+            (name, pa.int64() if name in INTEGER_COLUMNS else pa.string()) for name in columns
+        ])
+        self.writer = pa.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: list):
+        arrays = [self.pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def flush(self) -> int:
+        return 0
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def _progress_path(path: Path) -> Path:
+    return path.with_name(path.name + ".progress")
+
+
+def export(db: Path, output: Path, table: str, fmt: str, since: str = None, after_id: int = 0, resume: bool = False) -> tuple[int, int]:
+    """Выгружает таблицу в файл. Возвращает (число строк, последний id)."""
+    progress_file = _progress_path(output)
+    params = {"table": table, "format": fmt, "since": since}
+    rows_total = 0
+    append = False
+    if resume:
+        if fmt == "parquet":
+            sys.exit("Продолжение выгрузки в Parquet не поддерживается — запустите выгрузку заново")
+        if not progress_file.exists():
+            sys.exit(f"Нет {progress_file}: выгрузка завершена или не начиналась")
+        progress = json.loads(progress_file.read_text())
+        if {key: progress[key] for key in params} != params:
+            sys.exit(f"Прерванная выгрузка была с другими параметрами: {progress}")
+        # хвост после последней записанной порции мог остаться недописанным
+        os.truncate(output, progress["offset"])
+        after_id, rows_total, append = progress["last_id"], progress["rows"], True
+
+    columns = TABLES[table][0]
+    conn = open_snapshot(db)
+    writer = WRITERS[fmt](output, columns, append)
+    try:
+        for rows in iter_chunks(conn, table, after_id, since):
+            writer.write(rows)
+            after_id = rows[-1][0]
+            rows_total += len(rows)
+            offset = writer.flush()
+            if fmt != "parquet":
+                progress_file.write_text(json.dumps({**params, "last_id": after_id, "rows": rows_total, "offset": offset}))
+    finally:
+        writer.close()
+        conn.close()
+    progress_file.unlink(missing_ok=True)
+    return rows_total, after_id
+
+
+# =========================
+# Загрузка
+# =========================
+def _from_text(name: str, value: str):
+    """Значение из CSV-ячейки: пустая ячейка — NULL."""
+    if value == "":
+        return None
+    if name in INTEGER_COLUMNS:
+        return int(value)
+    return value
+
+
+def read_records(path: Path, fmt: str, chunk_rows: int = CHUNK_ROWS):
+    """Порции словарей из файла выгрузки."""
+    if fmt == "parquet":
+        pq = _require_pyarrow().parquet
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pylist()
+        return
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            records = ({name: _from_text(name, value) for name, value in row.items()} for row in csv.DictReader(f))
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _media_value(value):
+    """media хранится как JSON-текст; в JSONL это объект, в CSV и Parquet — уже строка."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+async def _prepare(db: Path):
+    from database import build_engine, init_db
+
+    engine = build_engine(f"sqlite+aiosqlite:///{db}")
+    try:
+        await init_db(engine)
+    finally:
+        await engine.dispose()
+
+
+def import_questions(db: Path, source: Path, fmt: str) -> tuple[int, int]:
+    """
+    Загружает вопросы из файла выгрузки: архивные (archived_at задан) — в
+    questions_archive, остальные — в questions. Возвращает (прочитано, добавлено).
+    """
+    # схема, FTS и триггеры — как у бота
+    asyncio.run(_prepare(db))
+
+    hot_columns = [name for name in QUESTION_COLUMNS if name != "archived_at"]
+    # номер общий для обеих таблиц: вопрос, который уже лежит в архиве (или еще в
+    # рабочей таблице), второй копией в другую не добавляется; id — последний параметр
+    hot_sql = (
+        f"INSERT OR IGNORE INTO questions ({', '.join(hot_columns)}) "
+        f"SELECT {', '.join('?' * len(hot_columns))} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM questions_archive WHERE id = ?)"
+    )
+    archive_sql = (
+        f"INSERT OR IGNORE INTO questions_archive ({', '.join(QUESTION_COLUMNS)}) "
+        f"SELECT {', '.join('?' * len(QUESTION_COLUMNS))} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM questions WHERE id = ?)"
+    )
+    read = inserted = 0
+    with sqlite3.connect(db, isolation_level=None) as conn:
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for records in read_records(source, fmt):
+            hot, archived = [], []
+            for record in records:
+                row = [_media_value(record.get(name)) if name in JSON_COLUMNS else record.get(name) for name in QUESTION_COLUMNS]
+                if row[-1] is None:
+                    hot.append(row[:-1] + row[:1])
+                else:
+                    archived.append(row + row[:1])
+            conn.execute("BEGIN IMMEDIATE")
+            # rowcount не учитывает строки, записанные триггерами, и пропущенные повторы номеров
+            inserted += conn.executemany(hot_sql, hot).rowcount
+            inserted += conn.executemany(archive_sql, archived).rowcount
+            conn.execute("COMMIT")
+            read += len(records)
+    return read, inserted
+
+
+# =========================
+# CLI
+# =========================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="выгрузить таблицу в файл")
+    export_parser.add_argument("output", type=Path)
+    export_parser.add_argument("--db", type=Path, default=Path("questions.db"))
+    export_parser.add_argument("--table", choices=TABLES, default="questions")
+    export_parser.add_argument("--format", choices=FORMATS, help="по умолчанию — по расширению файла")
+    export_parser.add_argument("--since", help="только строки не раньше даты (YYYY-MM-DD или 'YYYY-MM-DD HH:MM:SS', UTC)")
+    export_parser.add_argument("--after-id", type=int, default=0, help="только строки с id больше (продолжение прошлой выгрузки)")
+    export_parser.add_argument("--resume", action="store_true", help="продолжить прерванную выгрузку")
+
+    import_parser = commands.add_parser("import", help="загрузить вопросы из файла выгрузки")
+    import_parser.add_argument("source", type=Path)
+    import_parser.add_argument("--db", type=Path, default=Path("questions.db"))
+    import_parser.add_argument("--format", choices=FORMATS, help="по умолчанию — по расширению файла")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        rows, last_id = export(
+            args.db, args.output, args.table, format_of(args.output, args.format),
+            since=args.since, after_id=args.after_id, resume=args.resume
+        )
+        print(f"Выгружено строк: {rows}, последний id: {last_id} (для следующей выгрузки: --after-id {last_id})")
+    else:
+        if not args.source.exists():
+            sys.exit(f"Файл {args.source} не найден")
+        read, inserted = import_questions(args.db, args.source, format_of(args.source, args.format))
+        print(f"Прочитано: {read}, добавлено: {inserted}, пропущено (номер уже есть): {read - inserted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+import signal
+import platform
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from logger import logger
+
+DRAIN_TIMEOUT = 30  # секунды на завершение уже принятых апдейтов при остановке
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """
+    Принимает апдейт, сразу отвечает Telegram 200 и обрабатывает его в фоне.
+    При остановке сервера дожидается фоновых обработчиков (drain).
+    """
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT):
+        if not self.in_flight:
+            return
+        logger.info(f"Ждем завершения {self.in_flight} обработчиков...")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # пока ждем, сервер еще может принять апдейт — его обработчик тоже дожидаемся
+        while self.in_flight:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"{self.in_flight} обработчиков не успели завершиться за {timeout} сек.")
+                return
+            await asyncio.wait(set(self._background_feed_update_tasks), timeout=remaining)
+
+
+def create_webhook_app(
+    dp: Dispatcher,
+    bot: Bot,
+    path: str,
+    secret_token: str = None,
+    on_drained=None
+) -> web.Application:
+    """
+    Создает aiohttp-приложение с webhook-эндпоинтом.
+    on_drained — корутина, вызываемая после drain и до закрытия сессии бота
+    (например, чтобы дослать очередь сообщений).
+    """
+    app = web.Application()
+    handler = DrainingRequestHandler(dispatcher=dp, bot=bot, secret_token=secret_token or None)
+
+    async def drain_on_shutdown(app: web.Application):
+        await handler.drain()
+        if on_drained:
+            await on_drained()
+
+    # drain регистрируем раньше handler.register — тот закрывает сессию бота
+    app.on_shutdown.append(drain_on_shutdown)
+    handler.register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    app["webhook_handler"] = handler
+    return app
+
+
+async def run_webhook(
+    app: web.Application,
+    host: str,
+    port: int,
+    bot: Bot = None,
+    url: str = None,
+    secret_token: str = None
+):
+    """
+    Запускает webhook-сервер и ждет SIGINT/SIGTERM.
+    Если передан url — регистрирует webhook в Telegram. За балансировщиком
+    это делает только один экземпляр, остальные запускаются без url.
+    reuse_port позволяет нескольким процессам слушать один порт.
+    Webhook при остановке не удаляется: Telegram копит апдейты, пока бот
+    перезапускается, и ничего не теряется.
+    """
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, reuse_port=platform.system() == "Linux")
+    await site.start()
+    logger.info(f"Webhook-сервер слушает {host}:{port}")
+
+    if bot and url:
+        await bot.set_webhook(url, secret_token=secret_token or None, drop_pending_updates=False)
+        logger.info(f"Webhook зарегистрирован: {url}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    if platform.system() != "Windows":
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Останавливаем webhook-сервер...")
+        await runner.cleanup()
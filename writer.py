@@ -0,0 +1,99 @@
+import asyncio
+import time
+from logger import logger
+from models import Question
+
+BATCH_SIZE = 100       # максимум вопросов в одной транзакции
+BATCH_DELAY = 0.02     # сколько ждать добора пачки после первого вопроса, сек
+
+
+class QuestionWriter:
+    """
+    Write-behind очередь для новых вопросов.
+
+    Вопросы копятся и записываются одной транзакцией по BATCH_SIZE штук или
+    спустя BATCH_DELAY после первого вопроса пачки — один fsync на пачку
+    вместо одного на вопрос. add() возвращает вопрос уже с id, как только
+    пачка закоммичена, поэтому номер пользователю сообщается сразу после записи.
+    """
+
+    def __init__(self, session_factory, batch_size: int = BATCH_SIZE, batch_delay: float = BATCH_DELAY):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+        self._closing = False
+        self.batches = 0
+        self.written = 0
+
+    async def add(self, **fields) -> Question:
+        if self._closing:
+            raise RuntimeError("QuestionWriter остановлен")
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((Question(**fields), future))
+        return await future
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_delay
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+            if stop:
+                return
+
+    async def _write(self, batch: list):
+        try:
+            async with self.session_factory() as session:
+                session.add_all([question for question, _ in batch])
+                await session.commit()
+        except Exception as e:
+            # пачка не записалась — пишем по одному, чтобы плохая строка не утянула остальные
+            logger.error(f"Ошибка при записи пачки из {len(batch)} вопросов: {e}")
+            for question, future in batch:
+                try:
+                    async with self.session_factory() as session:
+                        session.add(question)
+                        await session.commit()
+                except Exception as row_error:
+                    if not future.done():
+                        future.set_exception(row_error)
+                else:
+                    self.written += 1
+                    if not future.done():
+                        future.set_result(question)
+            return
+
+        self.batches += 1
+        self.written += len(batch)
+        for question, future in batch:
+            if not future.done():
+                future.set_result(question)
+
+    async def close(self):
+        """Дописывает все, что уже в очереди, и останавливает воркер."""
+        self._closing = True
+        if self._worker is not None:
+            self._queue.put_nowait(None)
+            await self._worker
+            self._worker = None